@@ -0,0 +1,73 @@
+# Measures implicit-flow id_token creation (sign, then encrypt for the
+# audience client) with the client's PEM parsed on every token versus the
+# parsed-key cache used by EncryptionKey.encrypt_args.
+#
+#   PYTHONPATH=. python benchmarks/implicit_token.py [--iterations N]
+
+from Crypto.PublicKey import RSA
+from ptero_auth.implementation import models
+import argparse
+import jot
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--iterations', type=int, default=500,
+            help='Number of tokens to create')
+
+    return parser.parse_args()
+
+
+def create_token(signature_key, encrypt_args):
+    now = int(time.time())
+    token = jot.Token(claims={
+        'iss': 'https://auth.ptero.gsc.wustl.edu',
+        'sub': 'benchmark-sub',
+        'aud': ['benchmark-client'],
+        'exp': now + 600,
+        'iat': now,
+    })
+    jws = token.sign_with(signature_key, alg='RS256', kid='benchmark')
+    return jws.encrypt_with(**encrypt_args).compact_serialize()
+
+
+def measure(name, iterations, func):
+    func()
+
+    start = time.time()
+    for _ in xrange(iterations):
+        func()
+    elapsed = time.time() - start
+
+    print '%-8s %10.2f ms/token' % (name, 1e3 * elapsed / iterations)
+    return elapsed
+
+
+def main(iterations):
+    signature_key = RSA.generate(2048)
+    public_key = {
+        'kid': 'benchmark-kid',
+        'key': RSA.generate(2048).publickey().exportKey(),
+        'alg': 'RSA1_5',
+        'enc': 'A128CBC-HS256',
+    }
+
+    def before():
+        args = dict(public_key)
+        args['key'] = RSA.importKey(public_key['key'])
+        return create_token(signature_key, args)
+
+    def after():
+        return create_token(signature_key,
+                models.EncryptionKey.encrypt_args(**public_key))
+
+    old = measure('before', iterations, before)
+    new = measure('after', iterations, after)
+    print 'speedup: %.2fx' % (old / new)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args.iterations)
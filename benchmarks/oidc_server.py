@@ -0,0 +1,80 @@
+# Compares building the OIDC server graph on every request (the old
+# behaviour of Backend.__init__) with reusing one server per process.
+#
+#   PYTHONPATH=. python benchmarks/oidc_server.py [--iterations N]
+
+from Crypto.PublicKey import RSA
+from ptero_auth.implementation.backend import Backend
+from ptero_auth.implementation.oidc.factory import create_server
+from ptero_auth.implementation.user_info_providers.static import \
+        StaticUserInfoProvider
+import argparse
+import gc
+import sqlalchemy
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--iterations', type=int, default=10000,
+            help='Number of simulated requests')
+
+    return parser.parse_args()
+
+
+def per_request(Session, provider, signature_key):
+    server = create_server(Session, provider, signature_key)
+    return Backend(Session, oidc_server=server, user_info_provider=provider,
+            admin_role='pteroadmin')
+
+
+def process_wide(Session, provider, signature_key, _server=[]):
+    if not _server:
+        _server.append(create_server(Session, provider, signature_key))
+    return Backend(Session, oidc_server=_server[0],
+            user_info_provider=provider, admin_role='pteroadmin')
+
+
+def measure(name, func, iterations, *args):
+    func(*args)
+
+    gc.collect()
+    gc.disable()
+    before = len(gc.get_objects())
+    kept = [func(*args) for _ in xrange(min(iterations, 1000))]
+    objects = float(len(gc.get_objects()) - before) / len(kept)
+    del kept
+    gc.enable()
+
+    start = time.time()
+    for _ in xrange(iterations):
+        func(*args)
+    elapsed = time.time() - start
+
+    print '%-14s %10.2f us/request %8.1f objects/request' % (
+            name, 1e6 * elapsed / iterations, objects)
+    return elapsed
+
+
+def main(iterations):
+    engine = sqlalchemy.create_engine('sqlite://')
+    Session = sqlalchemy.orm.scoped_session(
+            sqlalchemy.orm.sessionmaker(bind=engine))
+    provider = StaticUserInfoProvider({})
+    signature_key = {
+        'signature_alg': 'RS256',
+        'signature_key': RSA.generate(2048),
+        'signature_kid': 'benchmark',
+    }
+
+    old = measure('per-request', per_request, iterations,
+            Session, provider, signature_key)
+    new = measure('process-wide', process_wide, iterations,
+            Session, provider, signature_key)
+    print 'speedup: %.1fx' % (old / new)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args.iterations)
@@ -0,0 +1,105 @@
+# Measures client-side id_token verification throughput with
+# ptero_auth.verifier: cold (every signature checked) on one thread and in
+# the thread pool, and warm (memoized until exp).
+#
+#   PYTHONPATH=. python benchmarks/verify_tokens.py [--tokens N] [--workers N]
+
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import RSA
+from Crypto.Signature import PKCS1_v1_5
+from ptero_auth.implementation.discovery import Discovery, ISSUER
+from ptero_auth.implementation.keyring import Keyring
+from ptero_auth.verifier import JwksClient, TokenVerifier
+import argparse
+import base64
+import json
+import multiprocessing
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--tokens', type=int, default=500,
+            help='Number of distinct tokens to verify')
+    parser.add_argument('--workers', type=int,
+            default=multiprocessing.cpu_count(),
+            help='Thread pool size for batch verification')
+
+    return parser.parse_args()
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip('=')
+
+
+def create_tokens(key, count):
+    signer = PKCS1_v1_5.new(key)
+    now = int(time.time())
+    header = _b64(json.dumps({'alg': 'RS256', 'kid': 'benchmark'}))
+
+    tokens = []
+    for i in xrange(count):
+        signing_input = '%s.%s' % (header, _b64(json.dumps({
+            'iss': ISSUER,
+            'sub': 'benchmark-sub-%d' % i,
+            'aud': ['benchmark-client'],
+            'exp': now + 600,
+            'iat': now,
+        })))
+        tokens.append('%s.%s' % (signing_input,
+            _b64(signer.sign(SHA256.new(signing_input)))))
+    return tokens
+
+
+class StaticJwks(object):
+    def __init__(self, body):
+        self.body = body
+
+    def __call__(self, request, timeout=None):
+        return self
+
+    def read(self):
+        return self.body
+
+    def info(self):
+        return {}
+
+
+def create_verifier(key, workers):
+    jwks = Discovery(Keyring.from_signature_key({
+        'signature_alg': 'RS256',
+        'signature_key': key,
+        'signature_kid': 'benchmark',
+    }), base_url='http://localhost').jwks
+
+    return TokenVerifier(JwksClient('http://localhost/v1/jwks',
+        urlopen=StaticJwks(jwks.body)), audience='benchmark-client',
+        workers=workers)
+
+
+def measure(name, tokens, func):
+    start = time.time()
+    func(tokens)
+    elapsed = time.time() - start
+
+    print '%-14s %10.0f tokens/s' % (name, len(tokens) / elapsed)
+
+
+def main(count, workers):
+    key = RSA.generate(2048)
+    tokens = create_tokens(key, count)
+
+    verifier = create_verifier(key, workers)
+    measure('cold serial', tokens, lambda ts: [verifier.verify(t) for t in ts])
+    measure('warm serial', tokens, lambda ts: [verifier.verify(t) for t in ts])
+
+    verifier = create_verifier(key, workers)
+    measure('cold pool(%d)' % workers, tokens, verifier.verify_many)
+    measure('warm pool(%d)' % workers, tokens, verifier.verify_many)
+    verifier.close()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args.tokens, args.workers)
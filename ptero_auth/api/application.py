@@ -1,4 +1,5 @@
 from . import v1
+from . import well_known
 from ..implementation.factory import Factory
 import flask
 
@@ -6,19 +7,49 @@ import flask
 __all__ = ['create_app']
 
 
-def _get_user_info_provider(user_data):
+def _get_user_info_provider(settings, user_data):
     if user_data:
         from ..implementation.user_info_providers import static
         return static.StaticUserInfoProvider(user_data)
 
     else:
         from ..implementation.user_info_providers import posix
-        return posix.PosixUserInfoProvider()
+        return posix.PosixUserInfoProvider(
+                credential_cache=_get_credential_cache(settings),
+                auth_pool=_get_auth_pool(settings),
+                group_index=_get_group_index(settings))
+
+
+def _get_credential_cache(settings):
+    size = settings.get('credential_cache_size', 0)
+    if not size:
+        return None
+
+    from ..implementation.user_info_providers import credential_cache
+    return credential_cache.CredentialCache(max_size=size,
+            ttl=settings.get('credential_cache_ttl', 300))
+
+
+def _get_auth_pool(settings):
+    size = settings.get('auth_pool_size', 0)
+    if not size:
+        return None
+
+    from ..implementation.user_info_providers import auth_pool, posix
+    return auth_pool.AuthenticationPool(posix.check_login, size,
+            max_pending=settings.get('auth_pool_max_pending'),
+            timeout=settings.get('auth_pool_timeout', 10))
+
+
+def _get_group_index(settings):
+    from ..implementation.user_info_providers import group_index
+    return group_index.GroupIndex(
+            refresh_interval=settings.get('group_index_refresh_interval', 300))
 
 
 def create_app(settings, user_data=None):
     factory = Factory(settings=settings,
-            user_info_provider=_get_user_info_provider(user_data))
+            user_info_provider=_get_user_info_provider(settings, user_data))
 
     app = _create_app_from_blueprints()
 
@@ -30,6 +61,7 @@ def create_app(settings, user_data=None):
 def _create_app_from_blueprints():
     app = flask.Flask('PTero Auth Service')
     app.register_blueprint(v1.blueprint, url_prefix='/v1')
+    app.register_blueprint(well_known.blueprint, url_prefix='/.well-known')
 
     return app
 
@@ -38,7 +70,18 @@ def _attach_factory_to_app(factory, app):
     @app.before_request
     def before_request():
         flask.g.backend = factory.create_backend()
+        flask.g.backend.begin(flask.request.endpoint)
+
+    @app.after_request
+    def after_request(response):
+        # Commits before the response is sent, so a failed commit is a 500.
+        backend = getattr(flask.g, 'backend', None)
+        if backend is not None:
+            backend.finish()
+        return response
 
     @app.teardown_request
     def teardown_request(exception):
-        flask.g.backend.cleanup()
+        backend = getattr(flask.g, 'backend', None)
+        if backend is not None:
+            backend.cleanup(exception)
@@ -11,6 +11,13 @@ api = Api(default_mediatype='application/json')
 api.add_resource(views.AuthorizeView, '/authorize', endpoint='authorize')
 api.add_resource(views.TokenView, '/tokens', endpoint='tokens')
 
+# OAuth 2.0 Token Introspection
+api.add_resource(views.IntrospectView, '/introspect', endpoint='introspect')
+
+# OpenID Connect Discovery (the configuration is served from the root, see
+# ptero_auth.api.well_known)
+api.add_resource(views.JwksView, '/jwks', endpoint='jwks')
+
 # Application-specific endpoints
 api.add_resource(views.ApiKeyListView, '/api-keys', endpoint='api-key-list')
 api.add_resource(views.ApiKeyView, '/api-keys/<string:api_key>',
@@ -20,3 +27,6 @@ api.add_resource(views.ClientView, '/clients/<string:client_id>',
         endpoint='client')
 api.add_resource(views.UserListView, '/users', endpoint='user-list')
 api.add_resource(views.UserView, '/users/<string:user_name>', endpoint='user')
+
+# Operational endpoints
+api.add_resource(views.StatsView, '/stats', endpoint='stats')
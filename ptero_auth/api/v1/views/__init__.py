@@ -1,4 +1,7 @@
 from .api import *
 from .client import *
+from .discovery import *
+from .introspect import *
 from .oidc import *
+from .stats import *
 from .user import *
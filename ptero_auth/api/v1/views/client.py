@@ -1,6 +1,6 @@
 from . import common
 from ptero_auth import exceptions
-from flask import g, request, url_for
+from flask import Response, g, request, url_for
 from flask.ext.restful import Resource
 import json
 import logging
@@ -9,9 +9,61 @@ import logging
 __all__ = ['ClientListView', 'ClientView']
 
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
 class ClientListView(Resource):
     def get(self):
-        pass
+        user = g.backend.get_user_from_authorization(request.authorization)
+        if not user:
+            return common.require_authorization()
+
+        if not g.backend.is_user_admin(user):
+            return None, 403
+
+        try:
+            limit = self._get_limit()
+            clients, next_cursor = g.backend.list_clients(limit,
+                    after=request.args.get('after'),
+                    active=self._get_active(),
+                    name=request.args.get('name'))
+        except exceptions.InvalidPaginationParameter as e:
+            return {'error': str(e)}, 400
+
+        headers = {}
+        if next_cursor:
+            args = request.args.to_dict()
+            args.update(after=next_cursor, limit=limit)
+            next_url = url_for('client-list', _external=True, **args)
+            headers['Link'] = '<%s>; rel="next"' % next_url
+        else:
+            next_url = None
+
+        return Response(_stream_client_list(clients, next_url),
+                mimetype='application/json', headers=headers)
+
+    def _get_limit(self):
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise exceptions.InvalidPaginationParameter('Invalid limit')
+
+        if not 0 < limit <= MAX_PAGE_SIZE:
+            raise exceptions.InvalidPaginationParameter(
+                    'limit must be between 1 and %d' % MAX_PAGE_SIZE)
+        return limit
+
+    def _get_active(self):
+        active = request.args.get('active')
+        if active is None:
+            return None
+
+        if active.lower() in ('true', '1'):
+            return True
+        elif active.lower() in ('false', '0'):
+            return False
+        raise exceptions.InvalidPaginationParameter('Invalid active filter')
 
     def post(self):
         user = g.backend.get_user_from_authorization(request.authorization)
@@ -21,7 +73,11 @@ class ClientListView(Resource):
         if not g.backend.is_user_admin(user):
             return None, 403
 
-        client_data = g.backend.register_client(user, json.loads(request.data))
+        try:
+            client_data = g.backend.register_client(user,
+                    json.loads(request.data))
+        except exceptions.InvalidClientData as e:
+            return {'error': str(e)}, 400
 
         return client_data, 201, {
             'Location': url_for('client', client_id=client_data['client_id']),
@@ -36,4 +92,27 @@ class ClientView(Resource):
             return client_data
 
     def patch(self, client_id):
-        pass
+        user = g.backend.get_user_from_authorization(request.authorization)
+        if not user:
+            return common.require_authorization()
+
+        if not g.backend.is_user_admin(user):
+            return None, 403
+
+        # XXX Only deactivation is supported.
+        client_data = g.backend.deactivate_client(user, client_id)
+        if not client_data:
+            return None, 404
+
+        return client_data
+
+
+# The page is fully loaded before the response starts (the session is closed
+# at teardown); only the serialization is streamed.
+def _stream_client_list(clients, next_url):
+    yield '{"clients": ['
+    for i, client in enumerate(clients):
+        if i:
+            yield ', '
+        yield json.dumps(client)
+    yield '], "next": %s}' % json.dumps(next_url)
@@ -0,0 +1,28 @@
+from flask import Response, g, request
+from flask.views import MethodView
+
+
+__all__ = ['JwksView', 'OpenIDConfigurationView']
+
+
+def _static_response(document, max_age):
+    response = Response(document.body, mimetype='application/json')
+    response.set_etag(document.etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+
+    # Turns the response into a bodyless 304 when If-None-Match matches.
+    return response.make_conditional(request)
+
+
+class JwksView(MethodView):
+    def get(self):
+        discovery = g.backend.discovery
+        return _static_response(discovery.jwks, discovery.max_age)
+
+
+class OpenIDConfigurationView(MethodView):
+    def get(self):
+        discovery = g.backend.discovery
+        return _static_response(discovery.openid_configuration,
+                discovery.max_age)
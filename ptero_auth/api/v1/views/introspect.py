@@ -0,0 +1,48 @@
+from . import common
+from flask import g, request
+from flask.ext.restful import Resource
+import json
+
+
+__all__ = ['IntrospectView']
+
+
+_HEADERS = {'Cache-Control': 'no-store', 'Pragma': 'no-cache'}
+
+
+class IntrospectView(Resource):
+    def post(self):
+        client = g.backend.get_client_from_authorization(request.authorization)
+        if not client:
+            return common.require_authorization()
+
+        # A single form-encoded token per RFC 7662, or a JSON batch:
+        # {"tokens": [...]} -> {"results": [...]}
+        token = request.form.get('token')
+        if token:
+            return (g.backend.introspect_tokens(client, [token])[0], 200,
+                    _HEADERS)
+
+        tokens = self._get_batch()
+        if tokens is None:
+            return {'error': 'invalid_request'}, 400
+
+        if len(tokens) > g.backend.introspector.max_batch:
+            return {'error': 'invalid_request',
+                    'error_description': 'At most %d tokens per request.'
+                        % g.backend.introspector.max_batch}, 400
+
+        return ({'results': g.backend.introspect_tokens(client, tokens)}, 200,
+                _HEADERS)
+
+    def _get_batch(self):
+        try:
+            tokens = json.loads(request.data)['tokens']
+        except (ValueError, KeyError, TypeError):
+            return None
+
+        if not isinstance(tokens, list) or not all(
+                isinstance(t, basestring) and t for t in tokens):
+            return None
+
+        return tokens
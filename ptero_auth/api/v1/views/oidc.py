@@ -54,10 +54,7 @@ class AuthorizeView(MethodView):
             return scope.split(' ')
 
     def _get_default_scopes(self):
-        client = g.backend.get_client(request.args.get('client_id'))
-        if not client:
-            return []
-        return client['default_scopes']
+        return g.backend.get_default_scopes(request.args.get('client_id'))
 
 
 class TokenView(MethodView):
@@ -0,0 +1,19 @@
+from . import common
+from flask import g, request
+from flask.ext.restful import Resource
+
+
+__all__ = ['StatsView']
+
+
+class StatsView(Resource):
+    def get(self):
+        # Stats include pool internals and the client ids callers probe.
+        user = g.backend.get_user_from_authorization(request.authorization)
+        if not user:
+            return common.require_authorization()
+
+        if not g.backend.is_user_admin(user):
+            return None, 403
+
+        return g.backend.get_stats()
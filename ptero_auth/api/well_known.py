@@ -0,0 +1,14 @@
+from .v1.views import OpenIDConfigurationView
+import flask
+
+
+__all__ = ['blueprint']
+
+
+# OpenID Connect Discovery requires the configuration at
+# {issuer}/.well-known/openid-configuration, outside of the versioned API.
+# That holds when OIDC_ISSUER is set to the service's own URL.
+blueprint = flask.Blueprint('well_known', __name__)
+
+blueprint.add_url_rule('/openid-configuration',
+        view_func=OpenIDConfigurationView.as_view('openid-configuration'))
@@ -1,2 +1,4 @@
 class NoApiKey(Exception): pass
 class InvalidFieldName(ValueError): pass
+class InvalidClientData(ValueError): pass
+class InvalidPaginationParameter(ValueError): pass
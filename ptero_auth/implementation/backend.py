@@ -1,38 +1,105 @@
-from .oidc.factory import create_server
 from . import models
-import sqlalchemy.exc
+from . import unit_of_work
+from .models.util import insert_ignore
+from .pagination import decode_cursor, encode_cursor
+from .unit_of_work import after_commit, commit
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload, selectinload
+import datetime
+import functools
 
 
 class Backend(object):
-    def __init__(self, session, signature_key, user_info_provider, admin_role):
+    def __init__(self, session, oidc_server, user_info_provider, admin_role,
+            user_cache=None, api_key_cache=None, key_usage=None,
+            audience_cache=None, discovery=None, introspector=None,
+            client_cache=None, client_registry=None, unknown_audiences=None,
+            key_revocations=None, commit_stats=None, unit_of_work=False,
+            get_stats=None):
         self.session = session
-        self.oidc_server = create_server(session, user_info_provider,
-                signature_key)
+        self.oidc_server = oidc_server
         self.user_info_provider = user_info_provider
         self.admin_role = admin_role
+        self.user_cache = user_cache
+        self.api_key_cache = api_key_cache
+        self.key_usage = key_usage
+        self.audience_cache = audience_cache
+        self.discovery = discovery
+        self.introspector = introspector
+        self.client_cache = client_cache
+        self.client_registry = client_registry
+        self.unknown_audiences = unknown_audiences
+        self.key_revocations = key_revocations
+        self.commit_stats = commit_stats
+        self.unit_of_work = unit_of_work
+        self._get_stats = get_stats
 
-    def cleanup(self):
-        pass
+    def begin(self, endpoint=None):
+        unit_of_work.begin(self.session, endpoint=endpoint,
+                unit_of_work=self.unit_of_work)
+        if self.commit_stats is not None:
+            self.commit_stats.request(endpoint)
+
+    def finish(self):
+        unit_of_work.finish(self.session)
+
+    def cleanup(self, exception=None):
+        try:
+            if exception is not None:
+                self.session.rollback()
+
+        finally:
+            # Closes the session and returns its connection to the pool.
+            self.session.remove()
+
+    def get_stats(self):
+        if self._get_stats:
+            return self._get_stats()
+        return {}
 
     def get_user_from_authorization(self, authorization):
         if not authorization:
             return
 
-        user = models.User.create_or_get(self.session, authorization.username)
+        user = models.User.create_or_get(self.session, authorization.username,
+                cache=self.user_cache)
 
         if self.user_info_provider.validate_password(user,
                 authorization.password):
             return user
 
     def get_user_from_api_key(self, api_key):
-        key = self.session.query(models.Key).filter_by(key=api_key).first()
-        if key:
-            return key.user
+        if self.key_revocations is not None:
+            self.key_revocations.check(self.session)
+
+        cached = None
+        if self.api_key_cache is not None:
+            cached = self.api_key_cache.get(api_key)
+
+        if cached is None:
+            key = self.session.query(models.Key
+                    ).options(joinedload(models.Key.user)
+                    ).filter_by(key=api_key, active=True).first()
+            if not key:
+                return
+
+            key_id, user = key.key_id, key.user
+            if self.api_key_cache is not None:
+                self.api_key_cache.set(api_key, (key_id, user.record))
+
+        else:
+            key_id, user_record = cached
+            user = models.User.from_record(self.session, user_record)
+
+        if self.key_usage is not None:
+            self.key_usage.record(key_id)
+
+        return user
 
     def create_api_key_for_user(self, user):
         key = models.Key(user=user)
         self.session.add(key)
-        self.session.commit()
+        commit(self.session)
 
         return key
 
@@ -42,8 +109,17 @@ class Backend(object):
 
     def deactivate_api_key(self, key):
         key.active = False
+        key.deactivated_at = datetime.datetime.utcnow()
         self.session.add(key)
-        self.session.commit()
+        commit(self.session)
+        after_commit(self.session, functools.partial(
+            self._invalidate_api_key, key.key))
+
+    def _invalidate_api_key(self, api_key):
+        if self.api_key_cache is not None:
+            self.api_key_cache.invalidate(api_key)
+        if self.introspector is not None:
+            self.introspector.invalidate(api_key)
 
     def is_user_admin(self, user):
         user_info = self.user_info_provider.get_user_data(user, ['roles'])
@@ -51,6 +127,9 @@ class Backend(object):
         return self.admin_role in user_info['roles']
 
     def register_client(self, user, client_data):
+        models.ConfidentialClient.validate_redirect_uri_regex(
+                client_data.get('redirect_uri_regex'))
+
         scope_dict = self._create_or_get_scopes(
                 self._get_used_client_scopes(client_data))
 
@@ -82,7 +161,10 @@ class Backend(object):
                     enc=client_data['public_key']['enc'])
 
         self.session.add(client)
-        self.session.commit()
+        self.session.add(models.ClientChange(client=client))
+        commit(self.session)
+        after_commit(self.session, functools.partial(
+            self._client_registered, client.client_id))
 
         result = client.as_dict
         result['client_secret'] = client.client_secret
@@ -90,22 +172,24 @@ class Backend(object):
         return result
 
     def _create_or_get_scopes(self, scope_values):
-        result = {}
-        for scope_value in scope_values:
-            scope = models.Scope(value=scope_value)
-            try:
-                self.session.add(scope)
-                self.session.commit()
-
-            except sqlalchemy.exc.IntegrityError:
-                self.session.rollback()
-                scope = self.session.query(models.Scope
-                        ).filter_by(value=scope_value).one()
+        scope_values = set(scope_values)
+        result = self._get_scopes(scope_values)
 
-            result[scope_value] = scope
+        missing = scope_values.difference(result)
+        if missing:
+            insert_ignore(self.session, models.Scope.__table__,
+                    [{'value': sv} for sv in missing])
+            result.update(self._get_scopes(missing))
 
         return result
 
+    def _get_scopes(self, scope_values):
+        if not scope_values:
+            return {}
+
+        return dict((s.value, s) for s in self.session.query(models.Scope
+                ).filter(models.Scope.value.in_(scope_values)))
+
     def _get_used_client_scopes(self, client_data):
         result = set()
         result.update(client_data.get('allowed_scopes', []))
@@ -114,9 +198,114 @@ class Backend(object):
             result.add(client_data['audience_for'])
         return result
 
+    def get_client_from_authorization(self, authorization):
+        if not authorization:
+            return
+
+        client = self.session.query(models.ConfidentialClient
+                ).filter_by(client_id=authorization.username).first()
+        if client and client.authenticate(authorization.password):
+            return client
+
+    def introspect_tokens(self, client, tokens):
+        if self.key_revocations is not None:
+            self.key_revocations.check(self.session)
+        return self.introspector.introspect(self.session, client.client_id,
+                tokens)
+
+    def _query_clients(self):
+        # Loads everything as_dict needs in a constant number of queries.
+        CC = models.ConfidentialClient
+        return self.session.query(CC).options(
+                joinedload(CC.created_by),
+                joinedload(CC.audience_for),
+                joinedload(CC.public_key),
+                selectinload(CC.allowed_scopes),
+                selectinload(CC.default_scopes),
+                selectinload(CC.audience_claims))
+
+    def list_clients(self, limit, after=None, active=None, name=None):
+        CC = models.ConfidentialClient
+        query = self._query_clients()
+
+        if active is not None:
+            query = query.filter(CC.active == active)
+        if name is not None:
+            query = query.filter(CC.client_name == name)
+
+        if after is not None:
+            created_at, client_pk = decode_cursor(after)
+            query = query.filter(or_(CC.created_at > created_at,
+                and_(CC.created_at == created_at, CC.client_pk > client_pk)))
+
+        # One extra row tells whether there is a next page.
+        clients = query.order_by(CC.created_at, CC.client_pk
+                ).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(clients) > limit:
+            clients = clients[:limit]
+            next_cursor = encode_cursor(clients[-1].created_at,
+                    clients[-1].client_pk)
+
+        return [c.as_dict for c in clients], next_cursor
+
     def get_client(self, client_id):
+        snapshot = self._get_client_snapshot(client_id)
+        if snapshot:
+            return snapshot.data
+
+    def get_default_scopes(self, client_id):
+        snapshot = self._get_client_snapshot(client_id)
+        if snapshot:
+            return sorted(snapshot.default_scopes)
+        return []
+
+    def deactivate_client(self, user, client_id):
         client = self.session.query(models.ConfidentialClient
                 ).filter_by(client_id=client_id).first()
+        if not client:
+            return
+
+        if client.active:
+            client.active = False
+            client.deactivated_at = datetime.datetime.utcnow()
+            client.deactivated_by = user
+            self.session.add(models.ClientChange(client=client))
+            commit(self.session)
+            after_commit(self.session, functools.partial(
+                self._invalidate_client, client_id))
+
+        return client.as_dict
+
+    def _get_client_snapshot(self, client_id):
+        if self.client_cache is not None:
+            snapshot = self.client_cache.get(client_id)
+            if snapshot is not None:
+                return snapshot
+
+        client = self._query_clients().filter(
+                models.ConfidentialClient.client_id == client_id).first()
+        if not client:
+            return
+
+        snapshot = client.snapshot
+        if self.client_cache is not None:
+            self.client_cache.set(client_id, snapshot)
+        return snapshot
+
+    def _client_registered(self, client_id):
+        # Client ids are generated here, so only audiences can have been
+        # cached as missing before.
+        if self.unknown_audiences is not None:
+            self.unknown_audiences.clear()
+        self._invalidate_client(client_id)
 
-        if client:
-            return client.as_dict
+    def _invalidate_client(self, client_id):
+        # Cached audiences embed client data, so any client change clears them.
+        if self.audience_cache is not None:
+            self.audience_cache.clear()
+        if self.client_cache is not None:
+            self.client_cache.invalidate(client_id)
+        if self.client_registry is not None:
+            self.client_registry.mark_stale()
@@ -0,0 +1,213 @@
+from . import models
+from .models.clients import ClientInterface
+from .models.redirect_uris import is_valid_redirect_uri
+from ptero_auth.utils import safe_compare
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, selectinload
+import collections
+import logging
+import threading
+import time
+
+
+LOG = logging.getLogger(__name__)
+
+
+__all__ = ['ClientRegistry', 'RegisteredClient']
+
+
+class RegisteredKey(collections.namedtuple('RegisteredKey',
+        ['kid', 'key', 'alg', 'enc'])):
+    def jot_encrypt_args(self):
+        return models.EncryptionKey.encrypt_args(**self._asdict())
+
+
+# Detached, read-only stand-in for a ConfidentialClient row, with everything
+# the OIDC validator needs precomputed.
+class RegisteredClient(ClientInterface):
+    requires_authentication = True
+    requires_id_token_encryption = False
+
+    def __init__(self, client):
+        self.client_pk = client.client_pk
+        self.client_id = client.client_id
+        self.client_secret = client.client_secret
+        self.redirect_uri_regex = client.redirect_uri_regex
+        self.default_redirect_uri = client.default_redirect_uri
+        self.active = client.active
+        self.allowed_scope_set = frozenset(client.allowed_scope_set)
+        self.default_scope_set = frozenset(client.default_scope_set)
+        self.audience_scope = (client.audience_for.value
+                if client.audience_for else None)
+        self.public_key = (RegisteredKey(**client.public_key.as_dict)
+                if client.public_key else None)
+
+    def is_valid_scope_set(self, scope_set):
+        return scope_set.issubset(self.allowed_scope_set)
+
+    def authenticate(self, client_secret=None):
+        return self.active and safe_compare(self.client_secret, client_secret)
+
+    def is_valid_grant_type(self, grant_type):
+        return grant_type in models.ConfidentialClient._VALID_GRANT_TYPES
+
+    def is_valid_response_type(self, response_type):
+        return response_type == 'code'
+
+    def is_valid_redirect_uri(self, redirect_uri):
+        return is_valid_redirect_uri(self.client_pk, self.redirect_uri_regex,
+                redirect_uri)
+
+    def get_default_redirect_uri(self):
+        return self.default_redirect_uri
+
+
+_Snapshot = collections.namedtuple('_Snapshot',
+        ['version', 'seen', 'by_client_id', 'by_audience_scope'])
+
+
+_EMPTY = _Snapshot(version=None, seen=frozenset(), by_client_id={},
+        by_audience_scope={})
+
+
+# NOTE Each worker keeps every confidential client in memory, versioned by
+# the ClientChange pks it has seen.  At most every refresh_interval seconds
+# one request reads the change pks above version - lookback and reloads only
+# the clients with changes it has not seen.  Re-reading that window catches
+# changes that commit out of pk order; a full reload every
+# full_reload_interval seconds catches anything older.  Readers never block;
+# a refresh builds new dicts and swaps the snapshot in one assignment.
+class ClientRegistry(object):
+    def __init__(self, refresh_interval=5, min_refresh_interval=1,
+            lookback=100, full_reload_interval=300, clock=time.time):
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.lookback = lookback
+        self.full_reload_interval = full_reload_interval
+        self._clock = clock
+
+        self._snapshot = _EMPTY
+        self._next_check = 0
+        self._next_full_load = 0
+        self._last_check = None
+        self._lock = threading.Lock()
+
+        self.full_loads = 0
+        self.incremental_loads = 0
+        self.checks = 0
+
+    def get_client(self, session, client_id):
+        return self.find_client(session, client_id)[0]
+
+    # Also returns whether a miss was checked against the database.  It was
+    # not if the check was throttled or left to another thread, and then the
+    # client may have been registered moments ago by another worker.
+    def find_client(self, session, client_id):
+        snapshot, checked = self._current(session)
+        client = snapshot.by_client_id.get(client_id)
+        if client is None and not checked:
+            # Misses check at most once per min_refresh_interval, whatever
+            # the id.
+            snapshot, checked = self._current(session, force=True)
+            client = snapshot.by_client_id.get(client_id)
+        return client, client is not None or checked
+
+    def get_audience_client(self, session, scope):
+        return self._current(session)[0].by_audience_scope.get(scope)
+
+    def mark_stale(self):
+        self._next_check = 0
+
+    @property
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'version': snapshot.version,
+            'clients': len(snapshot.by_client_id),
+            'full_loads': self.full_loads,
+            'incremental_loads': self.incremental_loads,
+            'checks': self.checks,
+        }
+
+    def _current(self, session, force=False):
+        now = self._clock()
+        if force and self._last_check is not None:
+            force = now - self._last_check >= self.min_refresh_interval
+
+        checked = False
+        if force or now >= self._next_check:
+            if self._snapshot.version is None:
+                # Nothing to serve yet, so wait for the first load.
+                with self._lock:
+                    self._refresh(session)
+                checked = True
+            elif self._lock.acquire(False):
+                try:
+                    self._refresh(session)
+                finally:
+                    self._lock.release()
+                checked = True
+
+        return self._snapshot, checked
+
+    def _refresh(self, session):
+        self._last_check = self._clock()
+        self._next_check = self._last_check + self.refresh_interval
+        self.checks += 1
+
+        snapshot = self._snapshot
+        if (snapshot.version is None
+                or self._last_check >= self._next_full_load):
+            self._full_load(session)
+            return
+
+        changes = self._query_changes(session, snapshot.version)
+        unseen = [(c, pk) for c, pk in changes if c not in snapshot.seen]
+        if not unseen:
+            return
+
+        clients = self._query_clients(session).filter(
+                models.ConfidentialClient.client_pk.in_(
+                    set(pk for c, pk in unseen))).all()
+        version = max(snapshot.version, max(c for c, pk in unseen))
+        self.incremental_loads += 1
+        self._swap(version, changes, dict(snapshot.by_client_id), clients)
+
+    def _full_load(self, session):
+        self._next_full_load = self._last_check + self.full_reload_interval
+
+        # Changes are read before the clients, so a change committed in
+        # between is seen as unseen and reloaded by the next check.
+        version = session.query(func.max(models.ClientChange.change_pk)
+                ).scalar() or 0
+        changes = self._query_changes(session, version)
+        clients = self._query_clients(session).all()
+        self.full_loads += 1
+        self._swap(version, changes, {}, clients)
+
+    def _query_changes(self, session, version):
+        return session.query(models.ClientChange.change_pk,
+                models.ClientChange.client_pk).filter(
+                models.ClientChange.change_pk > version - self.lookback).all()
+
+    def _swap(self, version, changes, by_client_id, clients):
+        for client in clients:
+            by_client_id[client.client_id] = RegisteredClient(client)
+
+        by_audience_scope = dict((c.audience_scope, c)
+                for c in by_client_id.itervalues() if c.audience_scope)
+        seen = frozenset(c for c, pk in changes
+                if c > version - self.lookback)
+
+        self._snapshot = _Snapshot(version=version, seen=seen,
+                by_client_id=by_client_id, by_audience_scope=by_audience_scope)
+        LOG.debug('Client registry at version %d with %d clients', version,
+                len(by_client_id))
+
+    def _query_clients(self, session):
+        CC = models.ConfidentialClient
+        return session.query(CC).options(
+                joinedload(CC.audience_for),
+                joinedload(CC.public_key),
+                selectinload(CC.allowed_scopes),
+                selectinload(CC.default_scopes))
@@ -0,0 +1,87 @@
+from Crypto.Util.number import long_to_bytes
+import base64
+import collections
+import hashlib
+import json
+import threading
+
+
+__all__ = ['Discovery', 'ISSUER', 'StaticDocument']
+
+
+ISSUER = 'https://auth.ptero.gsc.wustl.edu'
+
+
+class StaticDocument(collections.namedtuple('StaticDocument',
+        ['body', 'etag'])):
+    @classmethod
+    def from_data(cls, data):
+        body = json.dumps(data, sort_keys=True, separators=(',', ':'))
+        return cls(body=body, etag=hashlib.sha256(body).hexdigest()[:32])
+
+
+# The JWKS and the discovery document only change with the signing keys, so
+# they are serialized ahead of time and served as-is with a strong ETag.  The
+# JWKS is rebuilt whenever the keyring reports a new version.
+class Discovery(object):
+    def __init__(self, keyring, base_url, signature_alg='RS256', max_age=3600,
+            issuer=ISSUER):
+        self.keyring = keyring
+        self.base_url = base_url.rstrip('/')
+        self.signature_alg = signature_alg
+        self.max_age = max_age
+        self.issuer = issuer
+
+        self._lock = threading.Lock()
+        self._jwks = self._build_jwks(keyring.current())
+        self.openid_configuration = StaticDocument.from_data(
+                self._openid_configuration_data())
+
+    @property
+    def jwks(self):
+        key_set = self.keyring.current()
+        version, document = self._jwks
+        if version != key_set.version:
+            with self._lock:
+                if self._jwks[0] != key_set.version:
+                    self._jwks = self._build_jwks(key_set)
+                version, document = self._jwks
+        return document
+
+    def _build_jwks(self, key_set):
+        return key_set.version, StaticDocument.from_data({'keys': [
+            public_jwk(kid, key, self.signature_alg)
+            for kid, key in key_set.keys.iteritems()]})
+
+    def _openid_configuration_data(self):
+        return {
+            'issuer': self.issuer,
+            'authorization_endpoint': self._url('authorize'),
+            'token_endpoint': self._url('tokens'),
+            'jwks_uri': self._url('jwks'),
+            'response_types_supported': ['code', 'token', 'id_token token'],
+            'grant_types_supported': ['authorization_code', 'implicit',
+                'refresh_token'],
+            'subject_types_supported': ['public'],
+            'id_token_signing_alg_values_supported': [self.signature_alg],
+            'token_endpoint_auth_methods_supported': ['client_secret_basic'],
+        }
+
+    def _url(self, path):
+        return '%s/v1/%s' % (self.base_url, path)
+
+
+def public_jwk(kid, key, alg='RS256'):
+    public_key = key.publickey()
+    return {
+        'kty': 'RSA',
+        'use': 'sig',
+        'alg': alg,
+        'kid': kid,
+        'n': _base64url_uint(public_key.n),
+        'e': _base64url_uint(public_key.e),
+    }
+
+
+def _base64url_uint(value):
+    return base64.urlsafe_b64encode(long_to_bytes(value)).rstrip('=')
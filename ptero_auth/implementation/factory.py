@@ -1,5 +1,17 @@
 from . import backend
 from . import models
+from .cache import LRUCache
+from .client_registry import ClientRegistry
+from .discovery import Discovery, ISSUER
+from .introspection import TokenIntrospector
+from .key_revocations import KeyRevocations
+from .key_usage import KeyUsageTracker
+from .keyring import Keyring
+from .negative_cache import NegativeCache
+from .oidc.factory import create_server
+from .pool_metrics import MeteredQueuePool, PoolMetrics
+from .unit_of_work import CommitStats
+from .write_behind import WriteBehindQueue
 import sqlalchemy
 
 
@@ -14,21 +26,176 @@ class Factory(object):
         self._initialized = False
         self._engine = None
         self._Session = None
+        self._oidc_server = None
+
+        # The iss claim and the discovery document's issuer.  Relying parties
+        # check both, so it only changes when OIDC_ISSUER is set.
+        self.issuer = (settings.get('oidc_issuer') or ISSUER).rstrip('/')
+
+        self.pool_metrics = PoolMetrics()
+        self.user_cache = LRUCache(settings.get('user_cache_size', 10000),
+                ttl=settings.get('user_cache_ttl', 300))
+        self.api_key_cache = LRUCache(settings.get('api_key_cache_size', 10000),
+                ttl=settings.get('api_key_cache_ttl', 60))
+        self.audience_cache = LRUCache(
+                settings.get('audience_cache_size', 1024),
+                ttl=settings.get('audience_cache_ttl', 300))
+        self.key_usage = KeyUsageTracker(
+                flush_interval=settings.get('api_key_usage_flush_interval', 30))
+        self.write_behind = WriteBehindQueue([self.key_usage],
+                check_interval=settings.get('write_behind_check_interval', 1))
+        self.commit_stats = CommitStats()
+        self.client_cache = LRUCache(settings.get('client_cache_size', 1024),
+                ttl=settings.get('client_cache_ttl', 300))
+        self.client_registry = ClientRegistry(
+                refresh_interval=settings.get(
+                    'client_registry_refresh_interval', 5),
+                min_refresh_interval=settings.get(
+                    'client_registry_min_refresh_interval', 1),
+                lookback=settings.get('client_registry_lookback', 100),
+                full_reload_interval=settings.get(
+                    'client_registry_full_reload_interval', 300))
+        self.unknown_clients = self._create_negative_cache()
+        self.unknown_audiences = self._create_negative_cache()
+        self.keyring = self._create_keyring()
+        self.discovery = self._create_discovery()
+        self.introspection_cache = LRUCache(
+                settings.get('introspection_cache_size', 10000))
+        self.introspector = TokenIntrospector(self.keyring,
+                cache=self.introspection_cache,
+                ttl=settings.get('introspection_cache_ttl', 30),
+                negative_ttl=settings.get('introspection_negative_ttl', 5),
+                max_batch=settings.get('introspection_max_batch', 100),
+                issuer=self.issuer,
+                resource_servers=settings.get(
+                    'introspection_resource_servers', ()))
+        self.key_revocations = KeyRevocations(
+                [self.api_key_cache.invalidate, self.introspector.invalidate],
+                check_interval=settings.get(
+                    'api_key_revocation_check_interval', 5),
+                lookback=settings.get('api_key_revocation_lookback', 60))
 
     def create_backend(self):
         self._initialize()
-        return backend.Backend(self._Session(),
-                signature_key=self.settings['signature_key'],
+        return backend.Backend(self._Session,
+                oidc_server=self._oidc_server,
                 user_info_provider=self.user_info_provider,
-                admin_role=self.settings['admin_role'])
+                admin_role=self.settings['admin_role'],
+                user_cache=self.user_cache,
+                api_key_cache=self.api_key_cache,
+                key_usage=self.key_usage,
+                audience_cache=self.audience_cache,
+                discovery=self.discovery,
+                introspector=self.introspector,
+                client_cache=self.client_cache,
+                client_registry=self.client_registry,
+                unknown_audiences=self.unknown_audiences,
+                key_revocations=self.key_revocations,
+                commit_stats=self.commit_stats,
+                unit_of_work=self.settings.get('unit_of_work', False),
+                get_stats=self.get_stats)
+
+    def get_stats(self):
+        return {
+            'database_pool': self.pool_metrics.stats,
+            'user_cache': self.user_cache.stats,
+            'api_key_cache': self.api_key_cache.stats,
+            'api_key_usage': self.key_usage.stats,
+            'api_key_revocations': self.key_revocations.stats,
+            'write_behind': self.write_behind.stats,
+            'commits': self.commit_stats.stats,
+            'audience_cache': self.audience_cache.stats,
+            'client_cache': self.client_cache.stats,
+            'client_registry': self.client_registry.stats,
+            'unknown_clients': self.unknown_clients.stats,
+            'unknown_audiences': self.unknown_audiences.stats,
+            'keyring': self.keyring.stats,
+            'introspection_cache': self.introspection_cache.stats,
+            'user_info_provider': self.user_info_provider.stats,
+        }
+
+    def _create_keyring(self):
+        directory = self.settings.get('signature_key_dir')
+        if directory:
+            # Verifiers may cache the JWKS for the discovery max-age.
+            return Keyring(directory=directory, reload_interval=
+                    self.settings.get('signature_key_reload_interval', 30),
+                    activation_delay=self.settings.get('discovery_max_age',
+                        3600))
+        return Keyring.from_signature_key(self.settings['signature_key'])
+
+    def _create_negative_cache(self):
+        return NegativeCache(
+                max_size=self.settings.get('negative_cache_size', 10000),
+                ttl=self.settings.get('negative_cache_ttl', 10),
+                tracked_keys=self.settings.get(
+                    'negative_cache_tracked_keys', 1000),
+                max_key_length=self.settings.get(
+                    'negative_cache_max_key_length', 256))
+
+    def _create_discovery(self):
+        signature_key = self.settings['signature_key']
+        return Discovery(self.keyring,
+                base_url=self.settings.get('auth_url', ISSUER),
+                signature_alg=signature_key['signature_alg'],
+                max_age=self.settings.get('discovery_max_age', 3600),
+                issuer=self.issuer)
 
     def _initialize(self):
         # Lazy initialize to be pre-fork friendly.
         if not self._initialized:
             self._initialize_sqlalchemy()
+            # Started here, after any fork, so each worker has its thread.
+            self.write_behind.start(self._engine)
+            self._initialize_oidc_server()
             self._initialized = True
 
     def _initialize_sqlalchemy(self):
-        self._engine = sqlalchemy.create_engine(self.settings['database_url'])
+        self._engine = sqlalchemy.create_engine(self.settings['database_url'],
+                **self._get_engine_options())
+        self.pool_metrics.attach(self._engine)
         models.Base.metadata.create_all(self._engine)
-        self._Session = sqlalchemy.orm.sessionmaker(bind=self._engine)
+        # The scoped session hands each request thread its own session, so
+        # the long-lived OIDC server can share one registry across requests.
+        session_factory = sqlalchemy.orm.sessionmaker(bind=self._engine)
+        self.commit_stats.attach(session_factory)
+        self._Session = sqlalchemy.orm.scoped_session(session_factory)
+
+    _POOL_SETTINGS = {
+        'database_pool_size': 'pool_size',
+        'database_max_overflow': 'max_overflow',
+        'database_pool_timeout': 'pool_timeout',
+        'database_pool_recycle': 'pool_recycle',
+        'database_pool_pre_ping': 'pool_pre_ping',
+    }
+    def _get_engine_options(self):
+        url = sqlalchemy.engine.url.make_url(self.settings['database_url'])
+        if url.get_backend_name() == 'sqlite':
+            # SQLite uses its own single-connection pools.
+            return {}
+
+        options = {'poolclass': MeteredQueuePool}
+        for setting_name, option_name in self._POOL_SETTINGS.iteritems():
+            value = self.settings.get(setting_name)
+            if value is not None:
+                options[option_name] = value
+
+        return options
+
+    def _initialize_oidc_server(self):
+        self._oidc_server = create_server(self._Session,
+                self.user_info_provider, self.settings['signature_key'],
+                audience_cache=self.audience_cache,
+                stateless_codes=self.settings.get(
+                    'stateless_authorization_codes', False),
+                code_lifetime=self.settings.get(
+                    'authorization_code_lifetime', 600),
+                jwt_access_tokens=self.settings.get('jwt_access_tokens',
+                    False),
+                access_token_lifetime=self.settings.get(
+                    'access_token_lifetime', 3600),
+                keyring=self.keyring,
+                client_registry=self.client_registry,
+                unknown_clients=self.unknown_clients,
+                unknown_audiences=self.unknown_audiences,
+                issuer=self.issuer)
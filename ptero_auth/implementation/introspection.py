@@ -0,0 +1,178 @@
+from . import models
+from .discovery import ISSUER
+from sqlalchemy.orm import joinedload
+import calendar
+import datetime
+import jot
+import logging
+import time
+
+
+LOG = logging.getLogger(__name__)
+
+
+__all__ = ['TokenIntrospector']
+
+
+_INACTIVE = {'active': False}
+
+
+# NOTE Results are cached by token digest, so the cache never holds usable
+# tokens.  Positive results are never cached past the token's own expiry.
+#
+# A client only sees its own refresh tokens and the access tokens issued to
+# or for it.  The clients in resource_servers see every token and are the
+# only ones API keys are looked up for, so their results are cached apart.
+# id_tokens are not access credentials and are never active.
+class TokenIntrospector(object):
+    def __init__(self, keyring, cache=None, ttl=30, negative_ttl=5,
+            max_batch=100, issuer=ISSUER, resource_servers=(),
+            clock=time.time):
+        self.keyring = keyring
+        self.issuer = issuer
+        self.resource_servers = frozenset(resource_servers)
+        self.max_batch = max_batch
+        self.cache = cache
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+
+    def introspect(self, session, client_id, tokens):
+        if client_id in self.resource_servers:
+            return self._introspect(session, tokens, api_keys=True)
+        return [_visible_to(client_id, r) for r in
+                self._introspect(session, tokens, api_keys=False)]
+
+    def _introspect(self, session, tokens, api_keys):
+        results = {}
+        opaque = {}
+        for token in set(tokens):
+            digest = models.RefreshToken.digest(token)
+            cached = self._get_cached(digest, api_keys)
+            if cached is not None:
+                results[token] = cached
+
+            elif token.count('.') == 2:
+                results[token] = self._remember(digest, api_keys,
+                        self._introspect_jwt(token))
+
+            else:
+                opaque[token] = digest
+
+        if opaque:
+            found = self._introspect_opaque(session, opaque, api_keys)
+            for token, digest in opaque.iteritems():
+                results[token] = self._remember(digest, api_keys,
+                        found.get(token, _INACTIVE))
+
+        return [results[token] for token in tokens]
+
+    def invalidate(self, token):
+        if self.cache is not None:
+            digest = models.RefreshToken.digest(token)
+            self.cache.invalidate((digest, True))
+            self.cache.invalidate((digest, False))
+
+    def _get_cached(self, digest, api_keys):
+        if self.cache is not None:
+            return self.cache.get((digest, api_keys))
+
+    def _remember(self, digest, api_keys, result):
+        if self.cache is not None:
+            if result['active']:
+                ttl = self.ttl
+                if 'exp' in result:
+                    ttl = min(ttl, result['exp'] - self._clock())
+            else:
+                ttl = self.negative_ttl
+
+            if ttl > 0:
+                self.cache.set((digest, api_keys), result, ttl=ttl)
+
+        return result
+
+    def _introspect_opaque(self, session, tokens, api_keys):
+        found = {}
+
+        by_digest = dict((d, t) for t, d in tokens.iteritems())
+        for rt in session.query(models.RefreshToken
+                ).options(joinedload(models.RefreshToken.user),
+                    joinedload(models.RefreshToken.client),
+                    joinedload(models.RefreshToken.scopes)
+                ).filter(models.RefreshToken.token.in_(by_digest),
+                    models.RefreshToken.active == True,
+                    models.RefreshToken.expires_at >
+                        datetime.datetime.utcnow()):
+            found[by_digest[rt.token]] = {
+                'active': True,
+                'token_type': 'refresh_token',
+                'client_id': rt.client.client_id,
+                'sub': rt.user.oidc_sub,
+                'username': rt.user.name,
+                'scope': ' '.join(s.value for s in rt.scopes),
+                'iat': _timestamp(rt.created_at),
+                'exp': _timestamp(rt.expires_at),
+            }
+
+        remaining = [t for t in tokens if t not in found]
+        if api_keys and remaining:
+            for key in session.query(models.Key
+                    ).options(joinedload(models.Key.user)
+                    ).filter(models.Key.key.in_(remaining),
+                        models.Key.active == True):
+                found[key.key] = {
+                    'active': True,
+                    'token_type': 'api_key',
+                    'sub': key.user.oidc_sub,
+                    'username': key.user.name,
+                    'iat': _timestamp(key.created_at),
+                }
+
+        return found
+
+    def _introspect_jwt(self, token):
+        claims = self._verify(token)
+        if (claims is None or claims.get('iss') != self.issuer
+                or claims.get('exp', 0) <= self._clock()
+                or 'scope' not in claims):
+            return _INACTIVE
+
+        result = {
+            'active': True,
+            'token_type': 'access_token',
+        }
+        for name in ('sub', 'aud', 'scope', 'iat', 'exp', 'jti', 'iss'):
+            if name in claims:
+                result[name] = claims[name]
+        if 'azp' in claims:
+            result['client_id'] = claims['azp']
+        return result
+
+    def _verify(self, token):
+        try:
+            jws = jot.deserialize(token)
+        except Exception:
+            LOG.debug('Could not deserialize token.', exc_info=True)
+            return None
+
+        for key in self.keyring.current().keys.itervalues():
+            try:
+                if jws.verify_with(key.publickey()):
+                    return jws.payload.claims
+            except Exception:
+                LOG.debug('Could not verify token.', exc_info=True)
+
+
+def _visible_to(client_id, result):
+    if not result['active'] or result.get('client_id') == client_id:
+        return result
+
+    aud = result.get('aud')
+    if client_id in (aud if isinstance(aud, list) else [aud]):
+        return result
+
+    return _INACTIVE
+
+
+def _timestamp(dt):
+    return calendar.timegm(dt.utctimetuple())
@@ -0,0 +1,62 @@
+from . import models
+import datetime
+import logging
+import threading
+import time
+
+
+LOG = logging.getLogger(__name__)
+
+
+__all__ = ['KeyRevocations']
+
+
+# API keys deactivated in another worker must leave this worker's caches
+# well before their TTL.  At most every check_interval seconds one request
+# reads the keys deactivated since the previous check and evicts them.  The
+# window reaches lookback seconds further back, to catch deactivations that
+# committed late or were stamped by a worker with a slower clock.
+class KeyRevocations(object):
+    def __init__(self, invalidators, check_interval=5, lookback=60,
+            clock=time.time):
+        self.invalidators = list(invalidators)
+        self.check_interval = check_interval
+        self.lookback = lookback
+        self._clock = clock
+
+        # Keys deactivated before this worker started were never cached.
+        self._last_check = clock()
+        self._next_check = self._last_check + check_interval
+        self._lock = threading.Lock()
+
+        self.checks = 0
+        self.revocations = 0
+
+    def check(self, session):
+        now = self._clock()
+        if now < self._next_check or not self._lock.acquire(False):
+            return
+
+        try:
+            since = datetime.datetime.utcfromtimestamp(
+                    self._last_check - self.lookback)
+            self._last_check = now
+            self._next_check = now + self.check_interval
+            self.checks += 1
+
+            keys = [key for key, in session.query(models.Key.key).filter(
+                models.Key.deactivated_at >= since)]
+            for key in keys:
+                for invalidate in self.invalidators:
+                    invalidate(key)
+            self.revocations += len(keys)
+
+        finally:
+            self._lock.release()
+
+    @property
+    def stats(self):
+        return {
+            'checks': self.checks,
+            'revocations': self.revocations,
+        }
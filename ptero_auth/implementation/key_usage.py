@@ -0,0 +1,33 @@
+from . import models
+from .write_behind import WriteBehindBuffer
+from sqlalchemy import bindparam, func
+import datetime
+
+
+__all__ = ['KeyUsageTracker']
+
+
+class KeyUsageTracker(WriteBehindBuffer):
+    name = 'api_key_usage'
+
+    def record(self, key_id, when=None):
+        if when is None:
+            when = datetime.datetime.utcnow()
+        self.add(key_id, (1, when))
+
+    def merge(self, current, value):
+        return current[0] + value[0], max(current[1], value[1])
+
+    def write(self, connection, pending):
+        table = models.Key.__table__
+        statement = table.update().where(
+                table.c.key_id == bindparam('b_key_id')).values(
+                usage_count=func.coalesce(table.c.usage_count, 0)
+                    + bindparam('b_count'),
+                last_used=bindparam('b_last_used'))
+
+        connection.execute(statement, [{
+            'b_key_id': key_id,
+            'b_count': count,
+            'b_last_used': last_used,
+        } for key_id, (count, last_used) in pending.iteritems()])
@@ -0,0 +1,199 @@
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import RSA
+import collections
+import glob
+import logging
+import os
+import threading
+import time
+
+
+LOG = logging.getLogger(__name__)
+
+
+__all__ = ['Keyring', 'KeySet', 'fingerprint']
+
+
+ACTIVE_KEY_FILENAME = 'active.pem'
+
+
+def fingerprint(public_key):
+    return SHA256.new(
+            public_key.exportKey(format='DER', pkcs=8)).hexdigest()[:8]
+
+
+class KeySet(collections.namedtuple('KeySet',
+        ['version', 'active_kid', 'keys'])):
+    @property
+    def active(self):
+        return self.active_kid, self.keys[self.active_kid]
+
+    def get(self, kid):
+        return self.keys.get(kid)
+
+
+# NOTE The key set is replaced, never mutated, so readers only ever see a
+# complete snapshot.  In a directory, active.pem signs new tokens and every
+# other *.pem is published for verification until it is removed.
+#
+# Verifiers cache the JWKS for up to its max-age, so a key must be published
+# before it signs.  Rotate in two steps: add the next key as another *.pem,
+# then, at least activation_delay seconds later, make it active.pem.  If the
+# new active key was published more recently than that, the previous active
+# key keeps signing (while it is still in the directory) until the delay has
+# passed.  Keys present at startup count as already published.
+class Keyring(object):
+    def __init__(self, directory=None, key_set=None, reload_interval=30,
+            activation_delay=0, clock=time.time):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self.activation_delay = activation_delay
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._signature = None
+        self._next_check = 0
+        self._published_at = {}
+        self._pending_kid = None
+
+        self.reloads = 0
+        self.reload_errors = 0
+
+        if key_set is None:
+            self._key_set = None
+            self.reload()
+        else:
+            self._key_set = key_set
+
+    @classmethod
+    def from_signature_key(cls, signature_key):
+        keys = collections.OrderedDict([(signature_key['signature_kid'],
+            signature_key['signature_key'])])
+        return cls(key_set=KeySet(version=1,
+            active_kid=signature_key['signature_kid'], keys=keys))
+
+    def current(self):
+        if self.directory is not None and self._clock() >= self._next_check:
+            # Non-blocking: while one thread checks the directory, the others
+            # keep using the current key set.
+            if self._lock.acquire(False):
+                try:
+                    self._reload_if_changed()
+                finally:
+                    self._lock.release()
+
+        return self._key_set
+
+    @property
+    def active(self):
+        return self.current().active
+
+    @property
+    def version(self):
+        return self.current().version
+
+    def reload(self):
+        with self._lock:
+            self._signature = None
+            self._reload_if_changed()
+
+        if self._key_set is None:
+            raise RuntimeError('No signing keys could be loaded from %s'
+                    % self.directory)
+
+    @property
+    def stats(self):
+        key_set = self._key_set
+        return {
+            'version': key_set.version if key_set else None,
+            'active_kid': key_set.active_kid if key_set else None,
+            'kids': list(key_set.keys) if key_set else [],
+            'pending_kid': self._pending_kid,
+            'reloads': self.reloads,
+            'reload_errors': self.reload_errors,
+        }
+
+    def _reload_if_changed(self):
+        self._next_check = self._clock() + self.reload_interval
+
+        try:
+            paths = sorted(glob.glob(os.path.join(self.directory, '*.pem')))
+            signature = [(p, os.stat(p).st_mtime, os.stat(p).st_size)
+                    for p in paths]
+            if signature == self._signature:
+                self._activate_if_due()
+                return
+
+            keys, active_kid = self._load(paths)
+
+        except Exception:
+            # Keep signing with the keys we have rather than failing requests.
+            self.reload_errors += 1
+            LOG.exception('Failed to load signing keys from %s',
+                    self.directory)
+            return
+
+        self._signature = signature
+        self._install(keys, active_kid)
+        self.reloads += 1
+        LOG.info('Loaded signing keys %s (active %s)',
+                list(self._key_set.keys), self._key_set.active_kid)
+
+    def _install(self, keys, active_kid):
+        now = self._clock()
+        for kid in keys:
+            if kid not in self._published_at:
+                self._published_at[kid] = (now if self._key_set is not None
+                        else now - self.activation_delay)
+        for kid in list(self._published_at):
+            if kid not in keys:
+                del self._published_at[kid]
+
+        previous = self._key_set.active_kid if self._key_set else None
+        self._pending_kid = None
+        if (active_kid != previous and previous in keys
+                and now - self._published_at[active_kid]
+                    < self.activation_delay):
+            LOG.warning('Key %s was published less than %s seconds ago; '
+                    'signing with %s until then.', active_kid,
+                    self.activation_delay, previous)
+            self._pending_kid = active_kid
+            active_kid = previous
+
+        self._key_set = self._build(keys, active_kid)
+
+    def _activate_if_due(self):
+        kid = self._pending_kid
+        if kid is not None and (self._clock() - self._published_at[kid]
+                >= self.activation_delay):
+            self._pending_kid = None
+            self._key_set = self._build(self._key_set.keys, kid)
+            LOG.info('Activated signing key %s', kid)
+
+    def _build(self, keys, active_kid):
+        # Publish the active key first.
+        ordered = collections.OrderedDict([(active_kid, keys[active_kid])])
+        for kid, key in keys.iteritems():
+            if kid != active_kid:
+                ordered[kid] = key
+
+        version = self._key_set.version + 1 if self._key_set else 1
+        return KeySet(version=version, active_kid=active_kid, keys=ordered)
+
+    def _load(self, paths):
+        active_kid = None
+        keys = collections.OrderedDict()
+        for path in paths:
+            with open(path) as f:
+                key = RSA.importKey(f.read())
+            kid = fingerprint(key.publickey())
+
+            if os.path.basename(path) == ACTIVE_KEY_FILENAME:
+                active_kid = kid
+            keys[kid] = key
+
+        if active_kid is None:
+            raise RuntimeError('No %s in %s' % (ACTIVE_KEY_FILENAME,
+                self.directory))
+
+        return keys, active_kid
@@ -1,24 +1,35 @@
+from ..cache import LRUCache
 from .base import Base
+from .redirect_uris import is_valid_redirect_uri, validate_redirect_uri_regex
 from .scopes import Scope
 from .util import generate_id
 from Crypto.PublicKey import RSA
 from ptero_auth.utils import safe_compare
-from sqlalchemy import Column, UniqueConstraint
+from sqlalchemy import Column, Index, UniqueConstraint
 from sqlalchemy import Boolean, Enum, DateTime, ForeignKey, Integer, Text
 from sqlalchemy.orm import backref, relationship
+import collections
 import datetime
-import re
 import time
 
 
 __all__ = [
     'AudienceClaim',
+    'ClientChange',
+    'ClientSnapshot',
     'ConfidentialClient',
     'EncryptionKey',
     'PublicClient',
 ]
 
 
+# Read-only view of a client for caching.  The data dict is shared between
+# readers and must not be modified.
+ClientSnapshot = collections.namedtuple('ClientSnapshot',
+        ['client_pk', 'client_id', 'active', 'allowed_scopes',
+            'default_scopes', 'data'])
+
+
 class ClientInterface(object):
     def is_valid_scope_set(self, scope_set):  # pragma: no cover
         return NotImplemented
@@ -67,6 +78,12 @@ class ConfidentialClient(Base, ClientInterface):
     requires_authentication = True
     requires_id_token_encryption = False
 
+    # Keyset pagination order for client listings.
+    __table_args__ = (
+        Index('ix_confidential_client_created_at_client_pk',
+            'created_at', 'client_pk'),
+    )
+
     def is_valid_scope_set(self, scope_set):
         return scope_set.issubset(self.allowed_scope_set)
 
@@ -103,6 +120,14 @@ class ConfidentialClient(Base, ClientInterface):
 
         return result
 
+    @property
+    def snapshot(self):
+        return ClientSnapshot(client_pk=self.client_pk,
+                client_id=self.client_id, active=self.active,
+                allowed_scopes=frozenset(self.allowed_scope_set),
+                default_scopes=frozenset(self.default_scope_set),
+                data=self.as_dict)
+
     def authenticate(self, client_secret=None):
         return (self.active and safe_compare(self.client_secret, client_secret))
 
@@ -118,7 +143,12 @@ class ConfidentialClient(Base, ClientInterface):
         return response_type == 'code'
 
     def is_valid_redirect_uri(self, redirect_uri):
-        return re.match(self.redirect_uri_regex, redirect_uri)
+        return is_valid_redirect_uri(self.client_pk, self.redirect_uri_regex,
+                redirect_uri)
+
+    @staticmethod
+    def validate_redirect_uri_regex(regex):
+        validate_redirect_uri_regex(regex)
 
     def get_default_redirect_uri(self):
         return self.default_redirect_uri
@@ -139,6 +169,25 @@ class AudienceClaim(Base):
     )
 
 
+# Append-only log of client modifications; its highest pk is the change
+# counter that worker-local client registries poll.
+class ClientChange(Base):
+    __tablename__ = 'client_change'
+
+    change_pk = Column(Integer, primary_key=True)
+    client_pk = Column(Integer, ForeignKey('confidential_client.client_pk'),
+            nullable=False)
+    changed_at = Column(DateTime(timezone=True), nullable=False,
+            default=datetime.datetime.utcnow)
+
+    client = relationship(ConfidentialClient)
+
+
+# kid -> (PEM text, parsed key).  The PEM is compared on every hit, so a key
+# whose text changed is parsed again rather than served stale.
+_PARSED_KEY_CACHE = LRUCache(256)
+
+
 class EncryptionKey(Base):
     __tablename__ = 'encryption_key'
 
@@ -164,23 +213,48 @@ class EncryptionKey(Base):
         }
 
     def jot_encrypt_args(self):
+        return self.encrypt_args(kid=self.kid, key=self.key, alg=self.alg,
+                enc=self.enc)
+
+    @classmethod
+    def encrypt_args(cls, kid, key, alg, enc):
         return {
-            'kid': self.kid,
-            'key': RSA.importKey(self.key),
-            'alg': self.alg,
-            'enc': self.enc,
+            'kid': kid,
+            'key': cls.import_key(kid, key),
+            'alg': alg,
+            'enc': enc,
         }
 
+    @staticmethod
+    def import_key(kid, pem):
+        entry = _PARSED_KEY_CACHE.get(kid)
+        if entry is not None and entry[0] == pem:
+            return entry[1]
+
+        key = RSA.importKey(pem)
+        _PARSED_KEY_CACHE.set(kid, (pem, key))
+        return key
+
+    @staticmethod
+    def invalidate_parsed_key(kid=None):
+        if kid is None:
+            _PARSED_KEY_CACHE.clear()
+        else:
+            _PARSED_KEY_CACHE.invalidate(kid)
+
+
+_NOT_LOADED = object()
+
 
 class PublicClient(ClientInterface):
     requires_authentication = False
     requires_id_token_encryption = True
 
-    def __init__(self, client_id, session, scopes):
+    def __init__(self, client_id, scopes, find_audience_client):
         self.client_id = client_id
-        self.session = session
         self.scopes = scopes
-        self._audience_client = None
+        self._find_audience_client = find_audience_client
+        self._audience_client = _NOT_LOADED
 
     def is_valid_scope_set(self, scope_set):
         if len(scope_set) not in (1, 2):
@@ -196,13 +270,22 @@ class PublicClient(ClientInterface):
         return True
 
     def get_audience_client(self):
-        if not self._audience_client:
-            self._audience_client = self.session.query(ConfidentialClient
-                    ).join(ConfidentialClient.audience_for
-                    ).filter(Scope.value==self._get_audience_scope()
-                    ).first()
+        # A miss is remembered too; validation asks several times per request.
+        if self._audience_client is _NOT_LOADED:
+            scope = self._get_audience_scope()
+            if scope is None:
+                self._audience_client = None
+            else:
+                self._audience_client = self._find_audience_client(scope)
         return self._audience_client
 
+    @staticmethod
+    def query_audience_client(session, scope):
+        return session.query(ConfidentialClient
+                ).join(ConfidentialClient.audience_for
+                ).filter(Scope.value==scope
+                ).first()
+
     def _get_audience_scope(self):
         s = set(self.scopes)
         s.discard('openid')
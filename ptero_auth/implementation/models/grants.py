@@ -5,7 +5,7 @@ from sqlalchemy.orm import relationship
 import datetime
 
 
-__all__ = [ 'AuthorizationCodeGrant'  ]
+__all__ = [ 'AuthorizationCodeGrant', 'RedeemedAuthorizationCode' ]
 
 
 class AuthorizationCodeGrant(Base):
@@ -28,3 +28,12 @@ class AuthorizationCodeGrant(Base):
             default=lambda: generate_id('ac'))
 
     redirect_uri = Column(Text, nullable=False)
+
+
+# The jti of every redeemed stateless authorization code, until it expires.
+# The primary key makes each code single-use across all workers.
+class RedeemedAuthorizationCode(Base):
+    __tablename__ = 'redeemed_authorization_code'
+
+    jti = Column(Text, primary_key=True)
+    expires_at = Column(DateTime(timezone=True), index=True, nullable=False)
@@ -0,0 +1,187 @@
+from ..cache import LRUCache
+from ptero_auth import exceptions
+import logging
+import re
+import sre_constants
+import sre_parse
+import time
+
+
+LOG = logging.getLogger(__name__)
+
+
+__all__ = ['is_valid_redirect_uri', 'validate_redirect_uri_regex']
+
+
+MAX_REDIRECT_URI_LENGTH = 2048
+SLOW_MATCH_THRESHOLD = 0.01
+
+
+_PATTERN_CACHE = LRUCache(1024)
+_REGEX_ERRORS = (sre_constants.error, OverflowError, RuntimeError)
+
+
+def validate_redirect_uri_regex(regex):
+    if not regex:
+        raise exceptions.InvalidClientData('redirect_uri_regex is required')
+
+    if not regex.startswith('^') or not regex.endswith('$') \
+            or regex.endswith('\\$'):
+        raise exceptions.InvalidClientData(
+                'redirect_uri_regex must be anchored with ^ and $')
+
+    try:
+        re.compile(regex)
+        parsed = sre_parse.parse(regex)
+    except _REGEX_ERRORS:
+        raise exceptions.InvalidClientData(
+                'redirect_uri_regex is not a valid regular expression')
+
+    # "^a|b$" is anchored only at the edges of each alternative, so "b"
+    # would match anywhere in the URI.
+    if _has_top_level_branch(parsed):
+        raise exceptions.InvalidClientData('redirect_uri_regex must not '
+                'alternate at the top level; group the alternatives, '
+                'e.g. "^https://(a|b)/cb$"')
+
+    if _has_ambiguous_repeat(parsed):
+        raise exceptions.InvalidClientData('redirect_uri_regex must not '
+                'repeat anything that can match the same text more than one '
+                'way (e.g. "(a+)+", "(a|ab)*" or "(.*a){12}")')
+
+
+def is_valid_redirect_uri(client_pk, regex, redirect_uri):
+    # Python's re module cannot interrupt a match, so the work a single
+    # match can do is bounded by refusing repeats that can backtrack
+    # exponentially, both at registration and for stored patterns, and by
+    # capping the length of the subject here.
+    if len(redirect_uri) > MAX_REDIRECT_URI_LENGTH:
+        return False
+
+    start = time.time()
+    result = _get_pattern(client_pk, regex).match(redirect_uri)
+    elapsed = time.time() - start
+    if elapsed > SLOW_MATCH_THRESHOLD:
+        LOG.warning('redirect_uri_regex for client_pk %s took %.3f seconds '
+                'to match.', client_pk, elapsed)
+
+    return result
+
+
+def _get_pattern(client_pk, regex):
+    key = (client_pk, regex)
+    pattern = _PATTERN_CACHE.get(key)
+    if pattern is None:
+        pattern = _compile_stored(client_pk, regex)
+        _PATTERN_CACHE.set(key, pattern)
+    return pattern
+
+
+# Patterns stored before registration vetted them get the same checks.  Each
+# one is matched as ^(?:...)$, so a top-level alternative must match the
+# whole URI instead of any prefix of it.
+def _compile_stored(client_pk, regex):
+    try:
+        parsed = sre_parse.parse(regex)
+        pattern = re.compile(_anchor(regex))
+    except _REGEX_ERRORS:
+        LOG.warning('redirect_uri_regex for client_pk %s is not a valid '
+                'regular expression; refusing all redirect URIs.', client_pk)
+        return _NEVER
+
+    if _has_ambiguous_repeat(parsed):
+        LOG.warning('redirect_uri_regex for client_pk %s can backtrack '
+                'exponentially; refusing all redirect URIs.', client_pk)
+        return _NEVER
+
+    if _has_top_level_branch(parsed):
+        LOG.warning('redirect_uri_regex for client_pk %s alternates at the '
+                'top level; each alternative must match the whole URI.',
+                client_pk)
+
+    return pattern
+
+
+_NEVER = re.compile(r'(?!)')
+
+
+def _has_top_level_branch(parsed):
+    return any(op == sre_constants.BRANCH for op, av in parsed)
+
+
+# Guards regexes stored before anchoring was enforced.
+def _anchor(regex):
+    if regex.startswith('^'):
+        regex = regex[1:]
+    if regex.endswith('$') and not regex.endswith('\\$'):
+        regex = regex[:-1]
+    return r'^(?:%s)$' % regex
+
+
+# Inside a repeat that can run more than once, a variable-width repeat or an
+# alternation whose alternatives can start with the same character lets the
+# same text be split between iterations in many ways, and a failing match
+# tries all of them.
+_REPEAT_OPS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+def _has_ambiguous_repeat(subpattern, inside_repeat=False):
+    for op, av in subpattern:
+        if op in _REPEAT_OPS:
+            lo, hi, body = av
+            if inside_repeat and lo != hi:
+                return True
+            if _has_ambiguous_repeat(body, inside_repeat or hi > 1):
+                return True
+            continue
+
+        if (op == sre_constants.BRANCH and inside_repeat
+                and _alternatives_overlap(av[1])):
+            return True
+
+        for child in _iter_subpatterns(av):
+            if _has_ambiguous_repeat(child, inside_repeat):
+                return True
+
+    return False
+
+
+def _alternatives_overlap(alternatives):
+    seen = set()
+    for alternative in alternatives:
+        first = _first_characters(alternative)
+        if first is None or not seen.isdisjoint(first):
+            return True
+        seen.update(first)
+    return False
+
+
+# The characters a match of subpattern must start with, or None when they
+# are not a known set of literals (including when it can match nothing).
+def _first_characters(subpattern):
+    for op, av in subpattern:
+        if op == sre_constants.AT:
+            continue
+
+        if op == sre_constants.LITERAL:
+            return frozenset([av])
+
+        if op == sre_constants.IN and all(
+                item_op == sre_constants.LITERAL for item_op, item in av):
+            return frozenset(item for item_op, item in av)
+
+        if op == sre_constants.SUBPATTERN:
+            return _first_characters(av[-1])
+
+        if op in _REPEAT_OPS and av[0] > 0:
+            return _first_characters(av[2])
+
+        return None
+
+
+def _iter_subpatterns(value):
+    if isinstance(value, sre_parse.SubPattern):
+        yield value
+
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            for child in _iter_subpatterns(item):
+                yield child
@@ -3,6 +3,7 @@ from .util import generate_id
 from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, Text
 from sqlalchemy.orm import column_property, relationship
 import datetime
+import hashlib
 
 
 __all__ = [ 'RefreshToken' ]
@@ -13,6 +14,7 @@ class RefreshToken(Base):
 
     refresh_token_pk = Column(Integer, primary_key=True)
 
+    # SHA-256 hex digest of the token; the token itself is never stored.
     token = Column(Text, index=True, nullable=False, unique=True)
 
     created_at = Column(DateTime(timezone=True), index=True, nullable=False,
@@ -32,3 +34,8 @@ class RefreshToken(Base):
 
     scopes = relationship('Scope', secondary='refresh_token_scope_bridge')
 
+    @staticmethod
+    def digest(token):
+        if isinstance(token, unicode):
+            token = token.encode('utf-8')
+        return hashlib.sha256(token).hexdigest()
@@ -1,13 +1,20 @@
+from ..unit_of_work import after_commit, commit
 from .base import Base
-from .util import generate_id
+from .util import generate_id, insert_ignore
 from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, Text
 from sqlalchemy import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import make_transient_to_detached, relationship
+import collections
 import datetime
+import functools
 import sqlalchemy
 
 
-__all__ = ['Key', 'User']
+__all__ = ['Key', 'User', 'UserRecord']
+
+
+UserRecord = collections.namedtuple('UserRecord',
+        ['user_pk', 'name', 'oidc_sub', 'banned'])
 
 
 class User(Base):
@@ -19,16 +26,39 @@ class User(Base):
             default=lambda: generate_id('sub'))
     banned = Column(Boolean, index=True, nullable=False, default=False)
 
+    @property
+    def record(self):
+        return UserRecord(user_pk=self.user_pk, name=self.name,
+                oidc_sub=self.oidc_sub, banned=self.banned)
+
     @classmethod
-    def create_or_get(cls, session, username):
-        user = User(name=username)
-        session.add(user)
-        try:
-            session.commit()
-
-        except sqlalchemy.exc.IntegrityError:
-            session.rollback()
-            user = session.query(User).filter_by(name=username).one()
+    def from_record(cls, session, record):
+        # Attach a cached user to the session without querying for it.
+        user = cls(**record._asdict())
+        make_transient_to_detached(user)
+        return session.merge(user, load=False)
+
+    @classmethod
+    def create_or_get(cls, session, username, cache=None):
+        if cache is not None:
+            record = cache.get(username)
+            if record is not None:
+                return cls.from_record(session, record)
+
+        user = session.query(cls).filter_by(name=username).first()
+        if user is None:
+            insert_ignore(session, cls.__table__, [{
+                'name': username,
+                'oidc_sub': generate_id('sub'),
+                'banned': False,
+            }])
+            commit(session)
+            user = session.query(cls).filter_by(name=username).one()
+
+        if cache is not None:
+            # A new user's pk is only cached once its row is committed.
+            after_commit(session, functools.partial(cache.set, username,
+                user.record))
 
         return user
 
@@ -1,8 +1,39 @@
+from sqlalchemy.dialects import postgresql
+import sqlalchemy.exc
 import uuid
 
 
-__all__ = ['generate_id']
+__all__ = ['generate_id', 'insert_ignore']
 
 
 def generate_id(suffix):
     return '%s-%s' % (uuid.uuid4().hex, suffix)
+
+
+def insert_ignore(session, table, rows):
+    # Multi-row INSERT that skips rows violating a unique constraint, so
+    # concurrent writers of the same values do not abort each other.
+    if not rows:
+        return
+
+    dialect_name = session.get_bind().dialect.name
+    if dialect_name == 'postgresql':
+        statement = postgresql.insert(table).values(rows
+                ).on_conflict_do_nothing()
+
+    elif dialect_name == 'sqlite':
+        statement = table.insert().values(rows).prefix_with('OR IGNORE')
+
+    elif dialect_name == 'mysql':
+        statement = table.insert().values(rows).prefix_with('IGNORE')
+
+    else:
+        for row in rows:
+            try:
+                with session.begin_nested():
+                    session.execute(table.insert().values(row))
+            except sqlalchemy.exc.IntegrityError:
+                pass
+        return
+
+    session.execute(statement)
@@ -0,0 +1,85 @@
+from .cache import LRUCache
+import collections
+import heapq
+import threading
+import time
+
+
+__all__ = ['NegativeCache']
+
+
+# Remembers keys that were looked up and not found, so repeated misses cost a
+# dict lookup instead of a query.  Every lookup of a missing key is also
+# counted per key, in a bounded table, so callers hammering unknown ids show
+# up in the stats.  Keys longer than max_key_length are neither remembered
+# nor counted, only tallied, so callers cannot fill memory with huge ids.
+class NegativeCache(object):
+    def __init__(self, max_size=10000, ttl=10, tracked_keys=1000,
+            report_top=10, max_key_length=256, clock=time.time):
+        self.ttl = ttl
+        self.tracked_keys = tracked_keys
+        self.report_top = report_top
+        self.max_key_length = max_key_length
+        self._clock = clock
+
+        self._misses = LRUCache(max_size, ttl=ttl, clock=clock)
+
+        # key -> [lookups, first_seen]
+        self._counts = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        self.oversized_keys = 0
+
+    def __contains__(self, key):
+        if self._is_oversized(key) or self._misses.get(key) is None:
+            return False
+        self._count(key)
+        return True
+
+    def add(self, key):
+        if self._is_oversized(key):
+            self.oversized_keys += 1
+            return
+        self._misses.set(key, True)
+        self._count(key)
+
+    def invalidate(self, key):
+        self._misses.invalidate(key)
+
+    def clear(self):
+        self._misses.clear()
+
+    @property
+    def stats(self):
+        now = self._clock()
+        with self._lock:
+            top = heapq.nlargest(self.report_top, self._counts.iteritems(),
+                    key=lambda item: item[1][0])
+
+        result = self._misses.stats
+        result['tracked_keys'] = len(self._counts)
+        result['oversized_keys'] = self.oversized_keys
+        result['top'] = [{
+            'key': key,
+            'lookups': lookups,
+            'per_second': lookups / max(now - first_seen, 1.0),
+        } for key, (lookups, first_seen) in top]
+        return result
+
+    def _is_oversized(self, key):
+        return (isinstance(key, basestring)
+                and len(key) > self.max_key_length)
+
+    def _count(self, key):
+        if self.tracked_keys <= 0:
+            return
+
+        with self._lock:
+            entry = self._counts.pop(key, None)
+            if entry is None:
+                entry = [0, self._clock()]
+            entry[0] += 1
+            self._counts[key] = entry
+
+            while len(self._counts) > self.tracked_keys:
+                self._counts.popitem(last=False)
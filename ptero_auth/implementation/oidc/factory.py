@@ -1,4 +1,7 @@
+from ..discovery import ISSUER
+from ..keyring import Keyring
 from .server import OIDCServer
+from .stateless_codes import AuthorizationCodeCodec
 from .token_handler import OIDCTokenHandler
 from .validator import OIDCRequestValidator
 
@@ -6,8 +9,28 @@ from .validator import OIDCRequestValidator
 __all__ = ['create_server']
 
 
-def create_server(db_session, user_info_provider, signature_key):
-    validator = OIDCRequestValidator(db_session)
+def create_server(db_session, user_info_provider, signature_key,
+        audience_cache=None, stateless_codes=False, code_lifetime=600,
+        jwt_access_tokens=False, access_token_lifetime=3600, keyring=None,
+        client_registry=None, unknown_clients=None, unknown_audiences=None,
+        issuer=ISSUER):
+    if keyring is None:
+        keyring = Keyring.from_signature_key(signature_key)
+
+    if stateless_codes:
+        code_codec = AuthorizationCodeCodec(
+                signature_key=signature_key['signature_key'],
+                signature_kid=signature_key['signature_kid'],
+                signature_alg=signature_key['signature_alg'],
+                lifetime=code_lifetime, keyring=keyring)
+    else:
+        code_codec = None
+
+    validator = OIDCRequestValidator(db_session, code_codec=code_codec,
+            client_registry=client_registry, unknown_clients=unknown_clients,
+            unknown_audiences=unknown_audiences)
     token_handler = OIDCTokenHandler(validator, db_session, user_info_provider,
+            audience_cache=audience_cache, jwt_access_tokens=jwt_access_tokens,
+            expires_in=access_token_lifetime, keyring=keyring, issuer=issuer,
             **signature_key)
     return OIDCServer(validator, token_handler)
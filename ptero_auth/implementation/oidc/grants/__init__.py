@@ -1,2 +1,3 @@
 from .authorization_code import OIDCAuthorizationCodeGrant
 from .implicit import OIDCImplicitGrant
+from .refresh_token import OIDCRefreshTokenGrant
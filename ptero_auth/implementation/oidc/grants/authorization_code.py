@@ -6,6 +6,19 @@ class OIDCAuthorizationCodeGrant(AuthorizationCodeGrant):
         AuthorizationCodeGrant.__init__(self, request_validator)
         self._oidc_token_handler = token_handler
 
+    def create_authorization_code(self, request):
+        codec = self.request_validator.code_codec
+        if codec is None:
+            return AuthorizationCodeGrant.create_authorization_code(self,
+                    request)
+
+        grant = {'code': codec.encode(user_pk=request.user.user_pk,
+            client_pk=request.client.client_pk, scopes=request.scopes,
+            redirect_uri=request.redirect_uri)}
+        if request.state:
+            grant['state'] = request.state
+        return grant
+
     def create_token_response(self, request, token_handler):
         return AuthorizationCodeGrant.create_token_response(self,
                 request, self._oidc_token_handler)
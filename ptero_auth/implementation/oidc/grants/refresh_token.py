@@ -0,0 +1,11 @@
+from oauthlib.oauth2.rfc6749.grant_types import RefreshTokenGrant
+
+
+class OIDCRefreshTokenGrant(RefreshTokenGrant):
+    def __init__(self, request_validator, token_handler):
+        RefreshTokenGrant.__init__(self, request_validator)
+        self._oidc_token_handler = token_handler
+
+    def create_token_response(self, request, token_handler):
+        return RefreshTokenGrant.create_token_response(self, request,
+                self._oidc_token_handler)
@@ -1,8 +1,8 @@
 from .grants import OIDCAuthorizationCodeGrant, OIDCImplicitGrant
+from .grants import OIDCRefreshTokenGrant
 from oauthlib.oauth2.rfc6749.endpoints import AuthorizationEndpoint
 from oauthlib.oauth2.rfc6749.endpoints import TokenEndpoint
 from oauthlib.oauth2.rfc6749.grant_types import ImplicitGrant
-from oauthlib.oauth2.rfc6749.grant_types import RefreshTokenGrant
 from oauthlib.oauth2.rfc6749.tokens import BearerToken
 
 
@@ -12,11 +12,12 @@ __all__ = ['OIDCServer']
 class OIDCServer(AuthorizationEndpoint, TokenEndpoint):
     def __init__(self, request_validator, oidc_token_handler):
         implicit_grant = ImplicitGrant(request_validator)
-        refresh_grant = RefreshTokenGrant(request_validator)
         oidc_code_grant = OIDCAuthorizationCodeGrant(request_validator,
                 oidc_token_handler)
         oidc_implicit_grant = OIDCImplicitGrant(request_validator,
                 oidc_token_handler)
+        oidc_refresh_grant = OIDCRefreshTokenGrant(request_validator,
+                oidc_token_handler)
 
         bearer_token_handler = BearerToken(request_validator)
 
@@ -36,5 +37,5 @@ class OIDCServer(AuthorizationEndpoint, TokenEndpoint):
                 default_token_type=bearer_token_handler,
                 grant_types={
                     'authorization_code': oidc_code_grant,
-                    'refresh_token': refresh_grant,
+                    'refresh_token': oidc_refresh_grant,
                 })
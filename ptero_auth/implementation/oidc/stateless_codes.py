@@ -0,0 +1,79 @@
+import jot
+import logging
+import time
+import uuid
+
+
+LOG = logging.getLogger(__name__)
+
+
+__all__ = ['AuthorizationCodeCodec']
+
+
+# Authorization codes that carry their own grant: a JWT signed with the
+# service's key and then encrypted to the service's own public key, so the
+# client can neither read nor forge it.  The validator records each redeemed
+# jti in the database, so a code is single-use across workers.
+class AuthorizationCodeCodec(object):
+    def __init__(self, signature_key, signature_kid, signature_alg='RS256',
+            lifetime=600, keyring=None, clock=time.time):
+        self.signature_key = signature_key
+        self.signature_kid = signature_kid
+        self.signature_alg = signature_alg
+        self.lifetime = lifetime
+        self.keyring = keyring
+        self._clock = clock
+
+    def encode(self, user_pk, client_pk, scopes, redirect_uri):
+        iat = int(self._clock())
+        token = jot.Token(claims={
+            'jti': uuid.uuid4().hex,
+            'iat': iat,
+            'exp': iat + self.lifetime,
+            'user_pk': user_pk,
+            'client_pk': client_pk,
+            'scopes': list(scopes),
+            'redirect_uri': redirect_uri,
+        })
+
+        kid, key = self._signing_key()
+        jws = token.sign_with(key, alg=self.signature_alg, kid=kid)
+        jwe = jws.encrypt_with(kid=kid, key=key.publickey(),
+                alg='RSA1_5', enc='A128CBC-HS256')
+        return jwe.compact_serialize()
+
+    def decode(self, code):
+        # Codes minted just before a key rotation are still redeemable while
+        # the old key is in the keyring.
+        for key in self._verification_keys():
+            claims = self._decode_with(code, key)
+            if claims is not None:
+                break
+        else:
+            return None
+
+        if claims.get('exp', 0) <= self._clock():
+            return None
+
+        return claims
+
+    def _decode_with(self, code, key):
+        try:
+            jws = jot.deserialize(code).verify_and_decrypt_with(key)
+            if not jws.verify_with(key.publickey()):
+                return None
+            return jws.payload.claims
+
+        except Exception:
+            LOG.debug('Could not decode authorization code.', exc_info=True)
+            return None
+
+    def _signing_key(self):
+        if self.keyring is not None:
+            return self.keyring.active
+        return self.signature_kid, self.signature_key
+
+    def _verification_keys(self):
+        if self.keyring is not None:
+            return self.keyring.current().keys.values()
+        return [self.signature_key]
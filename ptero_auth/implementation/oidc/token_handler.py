@@ -1,5 +1,9 @@
 from oauthlib.oauth2.rfc6749.tokens import BearerToken
+from oauthlib.oauth2.rfc6749.tokens import random_token_generator
+from ptero_auth.implementation.discovery import ISSUER
 from ptero_auth.implementation import models
+from sqlalchemy.orm import joinedload
+import collections
 import hashlib
 import jot
 import jot.codec
@@ -14,18 +18,34 @@ _AT_HASH_ALGORITHMS = {
 }
 
 
+Audience = collections.namedtuple('Audience',
+        ['client_id', 'claims', 'public_key'])
+
+
+_NO_AUDIENCE = object()
+
+
 class OIDCTokenHandler(BearerToken):
     def __init__(self, request_validator, db_session, user_info_provider,
             signature_alg='HS256', signature_key=None, signature_kid=None,
             namespace=uuid.UUID('66deca4c-4e8a-44ce-a617-3d37bc0bcfaa'),
-            *args, **kwargs):
+            audience_cache=None, jwt_access_tokens=False, keyring=None,
+            issuer=ISSUER, *args, **kwargs):
+        if jwt_access_tokens:
+            # Refresh tokens stay opaque; only their digest is stored.
+            kwargs['token_generator'] = self.create_access_token
+            kwargs.setdefault('refresh_token_generator',
+                    random_token_generator)
         BearerToken.__init__(self, request_validator, *args, **kwargs)
         self.db_session = db_session
         self.user_info_provider = user_info_provider
+        self.audience_cache = audience_cache
         self.namespace = namespace
         self.signature_alg = signature_alg
         self.signature_key = signature_key
         self.signature_kid = signature_kid
+        self.keyring = keyring
+        self.issuer = issuer
 
     def create_id_token(self, request, bearer_token):
         # NOTE If we're doing implicit, we need to encrypt the token for the
@@ -37,7 +57,7 @@ class OIDCTokenHandler(BearerToken):
         exp = iat + 600
         audiences = self.get_aud(request)
         id_token = jot.Token(claims={
-            'iss': 'https://auth.ptero.gsc.wustl.edu',
+            'iss': self.issuer,
             'sub': request.user.oidc_sub,
             'aud': [a.client_id for a in audiences],
             'exp': exp,
@@ -49,23 +69,53 @@ class OIDCTokenHandler(BearerToken):
         for claim_name, data in claim_data.iteritems():
             id_token.set_claim_in_namespace(self.namespace, claim_name, data)
 
-        jws = id_token.sign_with(self.signature_key, alg=self.signature_alg,
-                kid=self.signature_kid)
+        jws = self._sign(id_token)
 
         if request.client.requires_id_token_encryption:
-            aud_client = request.client.get_audience_client()
-            jwe = jws.encrypt_with(**aud_client.public_key.jot_encrypt_args())
+            jwe = jws.encrypt_with(**self._get_encrypt_args(request,
+                audiences))
             return jwe.compact_serialize()
 
         else:
             return jws.compact_serialize()
 
+    def create_access_token(self, request):
+        iat = int(time.time())
+        access_token = jot.Token(claims={
+            'iss': self.issuer,
+            'sub': request.user.oidc_sub,
+            'aud': [a.client_id for a in self.get_aud(request)],
+            'azp': request.client.client_id,
+            'scope': ' '.join(request.scopes),
+            'exp': iat + request.expires_in,
+            'iat': iat,
+            'jti': uuid.uuid4().hex,
+        })
+
+        return self._sign(access_token).compact_serialize()
+
+    def _sign(self, token):
+        if self.keyring is not None:
+            kid, key = self.keyring.active
+        else:
+            kid, key = self.signature_kid, self.signature_key
+
+        return token.sign_with(key, alg=self.signature_alg, kid=kid)
+
     def create_token(self, request, refresh_token=False):
         token = super(OIDCTokenHandler, self).create_token(request, refresh_token)
         if 'openid' in request.scopes:
             token['id_token'] = self.create_id_token(request, token)
         return token
 
+    def _get_encrypt_args(self, request, audiences):
+        aud_client = request.client.get_audience_client()
+        for a in audiences:
+            if a.client_id == aud_client.client_id and a.public_key:
+                return models.EncryptionKey.encrypt_args(**a.public_key)
+
+        return aud_client.public_key.jot_encrypt_args()
+
     def _at_hash(self, access_token):
         hasher = _AT_HASH_ALGORITHMS[self.signature_alg]
         digest = hasher(access_token)
@@ -73,25 +123,69 @@ class OIDCTokenHandler(BearerToken):
         return jot.codec.base64url_encode(digest[:l])
 
     def get_aud(self, request):
-        result = []
-
-        scope_set = set(request.scopes)
+        # Memoized on the request: the access token and the id_token both
+        # need the audiences.
+        cached = getattr(request, 'audiences', None)
+        if cached is not None and cached[0] == request.scopes:
+            return cached[1]
+
+        audiences = self._get_aud(request.scopes)
+        request.audiences = (request.scopes, audiences)
+        return audiences
+
+    def _get_aud(self, scopes):
+        scope_set = set(scopes)
         scope_set.discard('openid')
+
+        audiences = {}
+        missing = set()
         for scope in scope_set:
-            audience = self._get_aud_client(scope)
-            if audience:
-                result.append(audience)
+            audience = self._get_cached_audience(scope)
+            if audience is None:
+                missing.add(scope)
+            else:
+                audiences[scope] = audience
 
-        return result
+        if missing:
+            audiences.update(self._load_audiences(missing))
+
+        return [a for a in audiences.itervalues() if a is not _NO_AUDIENCE]
+
+    def _get_cached_audience(self, scope):
+        if self.audience_cache is not None:
+            return self.audience_cache.get(scope)
+
+    def _load_audiences(self, scopes):
+        result = dict((s, _NO_AUDIENCE) for s in scopes)
 
-    def _get_aud_client(self, scope):
-        s_obj = self.db_session.query(models.Scope
-                ).filter_by(value=scope).first()
-        return s_obj.audience
+        for s_obj in self.db_session.query(models.Scope
+                ).options(joinedload(models.Scope.audience
+                        ).joinedload(models.ConfidentialClient.audience_claims),
+                    joinedload(models.Scope.audience
+                        ).joinedload(models.ConfidentialClient.public_key)
+                ).filter(models.Scope.value.in_(scopes)):
+            if s_obj.audience:
+                result[s_obj.value] = _make_audience(s_obj.audience)
+
+        if self.audience_cache is not None:
+            for scope, audience in result.iteritems():
+                self.audience_cache.set(scope, audience)
+
+        return result
 
     def _get_claim_data(self, user, audiences):
         claim_names = set()
         for a in audiences:
-            for af in a.audience_claims:
-                claim_names.add(str(af.value))
+            claim_names.update(a.claims)
         return self.user_info_provider.get_user_data(user, claim_names)
+
+
+def _make_audience(client):
+    if client.public_key:
+        public_key = client.public_key.as_dict
+    else:
+        public_key = None
+
+    return Audience(client_id=client.client_id,
+            claims=frozenset(str(af.value) for af in client.audience_claims),
+            public_key=public_key)
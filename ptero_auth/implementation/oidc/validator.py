@@ -1,22 +1,76 @@
 from .. import models
+from ..unit_of_work import commit
 from oauthlib.oauth2 import RequestValidator
 from ptero_auth.utils import safe_compare
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+import collections
+import datetime
+import threading
+
+
+_StatelessGrant = collections.namedtuple('_StatelessGrant',
+        ['code', 'redirect_uri'])
 
 
 class OIDCRequestValidator(RequestValidator):
-    def __init__(self, session):
+    def __init__(self, session, code_codec=None, client_registry=None,
+            unknown_clients=None, unknown_audiences=None):
         self.session = session
+        self.code_codec = code_codec
+        self.client_registry = client_registry
+        self.unknown_clients = unknown_clients
+        self.unknown_audiences = unknown_audiences
+        # confirm_redirect_uri is not given the request, so the grant fetched
+        # by validate_code is also remembered per thread.
+        self._local = threading.local()
 
     def _get_client(self, client_id, request):
         if request.client:
             return request.client
 
-        client = self.session.query(models.ConfidentialClient
-                ).filter_by(client_id=client_id).first()
+        client = self._find_confidential_client(client_id)
         if not client:
             client = models.PublicClient(client_id=client_id,
-                    session=self.session, scopes=request.scopes)
+                    scopes=request.scopes,
+                    find_audience_client=self._find_audience_client)
+
+        return client
+
+    def _find_confidential_client(self, client_id):
+        # Public clients never match, so their ids are remembered as misses.
+        if (self.unknown_clients is not None
+                and client_id in self.unknown_clients):
+            return None
+
+        if self.client_registry is not None:
+            client, checked = self.client_registry.find_client(self.session,
+                    client_id)
+        else:
+            client = self.session.query(models.ConfidentialClient
+                    ).filter_by(client_id=client_id).first()
+            checked = True
+
+        # A miss the registry could not check may be a client registered
+        # moments ago, so it is not remembered.
+        if client is None and checked and self.unknown_clients is not None:
+            self.unknown_clients.add(client_id)
+        return client
+
+    def _find_audience_client(self, scope):
+        if (self.unknown_audiences is not None
+                and scope in self.unknown_audiences):
+            return None
 
+        if self.client_registry is not None:
+            client = self.client_registry.get_audience_client(self.session,
+                    scope)
+        else:
+            client = models.PublicClient.query_audience_client(self.session,
+                    scope)
+
+        if client is None and self.unknown_audiences is not None:
+            self.unknown_audiences.add(scope)
         return client
 
     def validate_client_id(self, client_id, request):
@@ -33,13 +87,17 @@ class OIDCRequestValidator(RequestValidator):
         return client.is_valid_response_type(response_type)
 
     def save_authorization_code(self, client_id, code, request):
+        if self.code_codec is not None:
+            # The code itself carries the grant.
+            return
+
         ac = models.AuthorizationCodeGrant(code=code['code'],
-                user=request.user, client=request.client,
+                user=request.user, client_pk=request.client.client_pk,
                 redirect_uri=request.redirect_uri)
         ac.scopes = self.session.query(models.Scope
                 ).filter(models.Scope.value.in_(request.scopes)).all()
         self.session.add(ac)
-        self.session.commit()
+        commit(self.session)
 
     def client_authentication_required(self, request):
         request.client = self._get_client(self._get_client_id(request), request)
@@ -62,32 +120,144 @@ class OIDCRequestValidator(RequestValidator):
         return client.is_valid_grant_type(grant_type)
 
     def validate_code(self, client_id, code, client, request):
-        ac = self.session.query(models.AuthorizationCodeGrant).filter_by(
-                code=code, client=client).first()
-        if ac:
-            request.user = ac.user
-            request.scopes = [ s.value for s in ac.scopes ]
-            return True
-        else:
+        self._local.grant = None
+        if self.code_codec is not None:
+            return self._validate_stateless_code(code, client, request)
+
+        ac = self._get_authorization_code(code, client)
+        if not ac:
             return False
 
+        # Consume the code as soon as it is known to be redeemable, so that
+        # concurrent requests with the same code cannot both succeed.
+        if ac.redirect_uri == request.redirect_uri:
+            if not self._consume_authorization_code(ac):
+                return False
+
+        request.authorization_code_grant = ac
+        self._local.grant = ac
+
+        request.user = ac.user
+        request.scopes = [ s.value for s in ac.scopes ]
+        return True
+
     def confirm_redirect_uri(self, client_id, code, redirect_uri, client):
-        ac = self.session.query(models.AuthorizationCodeGrant).filter_by(
-                code=code, client=client).first()
+        ac = getattr(self._local, 'grant', None)
+        if ac is None or ac.code != code:
+            if self.code_codec is not None:
+                return False
+            ac = self._get_authorization_code(code, client)
+
         if ac:
             return ac.redirect_uri == redirect_uri
 
+    def _validate_stateless_code(self, code, client, request):
+        claims = self.code_codec.decode(code)
+        if not claims or claims['client_pk'] != getattr(client, 'client_pk',
+                None):
+            return False
+
+        if claims['redirect_uri'] == request.redirect_uri:
+            if not self._consume_stateless_code(claims):
+                return False
+
+        self._local.grant = _StatelessGrant(code=code,
+                redirect_uri=claims['redirect_uri'])
+
+        request.user = self.session.query(models.User).get(claims['user_pk'])
+        request.scopes = claims['scopes']
+        return request.user is not None
+
+    def _get_authorization_code(self, code, client):
+        return self.session.query(models.AuthorizationCodeGrant
+                ).options(joinedload(models.AuthorizationCodeGrant.user),
+                    joinedload(models.AuthorizationCodeGrant.scopes)
+                ).filter_by(code=code,
+                    client_pk=getattr(client, 'client_pk', None)
+                ).first()
+
+    def _consume_authorization_code(self, ac):
+        deleted = self.session.query(models.AuthorizationCodeGrant
+                ).filter_by(grant_pk=ac.grant_pk
+                ).delete(synchronize_session=False)
+        return deleted == 1
+
+    def _consume_stateless_code(self, claims):
+        # Of concurrent redemptions in any worker, only one can insert the
+        # jti; it commits together with the token, like a deleted grant.
+        self.session.add(models.RedeemedAuthorizationCode(jti=claims['jti'],
+            expires_at=datetime.datetime.utcfromtimestamp(claims['exp'])))
+        try:
+            self.session.flush()
+        except IntegrityError:
+            self.session.rollback()
+            return False
+        return True
+
     def save_bearer_token(self, token, request):
         if 'refresh_token' in token:
-            r = models.RefreshToken(token=token.get('refresh_token'),
-                    user=request.user, client=request.client)
+            r = models.RefreshToken(
+                    token=models.RefreshToken.digest(token['refresh_token']),
+                    user=request.user, client_pk=request.client.client_pk,
+                    active=True)
+            r.scopes = self._get_refresh_token_scopes(request)
             self.session.add(r)
-            self.session.commit()
+
+        # Commits the new refresh token together with the deactivation of the
+        # one it replaces (see validate_refresh_token).
+        commit(self.session)
+
+    def _get_refresh_token_scopes(self, request):
+        previous = getattr(request, 'refresh_token_record', None)
+        if previous is not None and set(request.scopes) == set(
+                s.value for s in previous.scopes):
+            return list(previous.scopes)
+
+        ac = getattr(request, 'authorization_code_grant', None)
+        if ac is not None:
+            return list(ac.scopes)
+
+        return self.session.query(models.Scope
+                ).filter(models.Scope.value.in_(request.scopes)).all()
+
+    def validate_refresh_token(self, refresh_token, client, request):
+        rt = self.session.query(models.RefreshToken
+                ).options(joinedload(models.RefreshToken.user),
+                    joinedload(models.RefreshToken.scopes)
+                ).filter(
+                    models.RefreshToken.token ==
+                        models.RefreshToken.digest(refresh_token),
+                    models.RefreshToken.client_pk ==
+                        getattr(client, 'client_pk', None),
+                    models.RefreshToken.active == True,
+                    models.RefreshToken.expires_at >
+                        datetime.datetime.utcnow(),
+                ).first()
+        if not rt:
+            return False
+
+        # Refresh tokens are single use: the conditional update only succeeds
+        # for one of several concurrent requests presenting the same token.
+        deactivated = self.session.query(models.RefreshToken
+                ).filter_by(refresh_token_pk=rt.refresh_token_pk, active=True
+                ).update({'active': False,
+                    'deactivated_at': datetime.datetime.utcnow()},
+                    synchronize_session=False)
+        if deactivated != 1:
+            return False
+
+        request.refresh_token_record = rt
+        request.user = rt.user
+        return True
+
+    def get_original_scopes(self, refresh_token, request):
+        return [ s.value for s in request.refresh_token_record.scopes ]
 
     def invalidate_authorization_code(self, client_id, code, request):
-        self.session.query(models.AuthorizationCodeGrant
-                ).filter_by(code=code).delete()
-        self.session.commit()
+        # The grant row was already deleted by validate_code; this makes the
+        # deletion durable.
+        self._local.grant = None
+        commit(self.session)
 
     def get_default_redirect_uri(self, client_id, request):
         return request.client.get_default_redirect_uri()
@@ -0,0 +1,31 @@
+from ptero_auth import exceptions
+import base64
+import datetime
+import json
+
+
+__all__ = ['decode_cursor', 'encode_cursor']
+
+
+_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+
+# Keyset cursors are opaque to clients: (created_at, pk) of the last row on
+# the previous page.
+def encode_cursor(created_at, pk):
+    if created_at.tzinfo is not None:
+        created_at = (created_at - created_at.utcoffset()).replace(tzinfo=None)
+
+    return base64.urlsafe_b64encode(json.dumps(
+        [created_at.strftime(_TIMESTAMP_FORMAT), pk])).rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, pk = json.loads(base64.urlsafe_b64decode(
+            str(cursor) + '=' * (-len(cursor) % 4)))
+        return (datetime.datetime.strptime(created_at, _TIMESTAMP_FORMAT),
+                int(pk))
+
+    except (TypeError, ValueError):
+        raise exceptions.InvalidPaginationParameter('Invalid cursor')
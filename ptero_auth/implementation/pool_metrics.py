@@ -0,0 +1,75 @@
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+import threading
+import time
+
+
+__all__ = ['MeteredQueuePool', 'PoolMetrics']
+
+
+class PoolMetrics(object):
+    def __init__(self):
+        self._lock = threading.Lock()
+
+        self.checkouts = 0
+        self.checkins = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def attach(self, engine):
+        event.listen(engine.pool, 'checkout', self._on_checkout)
+        event.listen(engine.pool, 'checkin', self._on_checkin)
+        if isinstance(engine.pool, MeteredQueuePool):
+            engine.pool.metrics = self
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'total_checkout_wait': self.total_wait,
+                'max_checkout_wait': self.max_wait,
+                'mean_checkout_wait': (self.total_wait / self.checkouts
+                    if self.checkouts else 0.0),
+            }
+
+    def _on_checkout(self, dbapi_connection, connection_record,
+            connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+            self.in_use -= 1
+
+
+class MeteredQueuePool(QueuePool):
+    metrics = None
+
+    # Pool events only fire once a connection has been handed out, so the
+    # time spent waiting for one is measured around QueuePool._do_get.
+    def _do_get(self):
+        start = time.time()
+        try:
+            return QueuePool._do_get(self)
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.time() - start)
+
+    def recreate(self):
+        pool = QueuePool.recreate(self)
+        pool.metrics = self.metrics
+        return pool
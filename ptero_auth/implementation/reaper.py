@@ -0,0 +1,101 @@
+from . import models
+from .models.scopes import grant_scope_table, refresh_token_scope_table
+from sqlalchemy import and_, select
+import datetime
+import logging
+import time
+
+
+LOG = logging.getLogger(__name__)
+
+
+__all__ = ['Reaper']
+
+
+class Reaper(object):
+    def __init__(self, bind, grant_retention=600, refresh_token_retention=0,
+            batch_size=1000, pause=0.1, now=datetime.datetime.utcnow,
+            sleep=time.sleep):
+        self.bind = bind
+        self.grant_retention = datetime.timedelta(seconds=grant_retention)
+        self.refresh_token_retention = datetime.timedelta(
+                seconds=refresh_token_retention)
+        self.batch_size = batch_size
+        self.pause = pause
+        self._now = now
+        self._sleep = sleep
+
+        self.runs = 0
+        self.last_run = {}
+        self.total_removed = {}
+
+    def run(self):
+        now = self._now()
+        grants = models.AuthorizationCodeGrant.__table__
+        tokens = models.RefreshToken.__table__
+        redeemed = models.RedeemedAuthorizationCode.__table__
+
+        token_cutoff = now - self.refresh_token_retention
+        counts = {
+            'authorization_code_grant': self._reap(grants,
+                grants.c.grant_pk, grants.c.created_at,
+                grants.c.created_at < now - self.grant_retention,
+                grant_scope_table.c.grant_pk),
+
+            'expired_refresh_token': self._reap(tokens,
+                tokens.c.refresh_token_pk, tokens.c.expires_at,
+                tokens.c.expires_at < token_cutoff,
+                refresh_token_scope_table.c.refresh_token_pk),
+
+            'deactivated_refresh_token': self._reap(tokens,
+                tokens.c.refresh_token_pk, tokens.c.deactivated_at,
+                and_(tokens.c.active == False,
+                    tokens.c.deactivated_at < token_cutoff),
+                refresh_token_scope_table.c.refresh_token_pk),
+
+            'redeemed_authorization_code': self._reap(redeemed,
+                redeemed.c.jti, redeemed.c.expires_at,
+                redeemed.c.expires_at < now),
+        }
+
+        self.runs += 1
+        self.last_run = counts
+        for name, count in counts.iteritems():
+            self.total_removed[name] = self.total_removed.get(name, 0) + count
+        LOG.info('Reaper removed %s.', ', '.join('%d %s rows' % (c, n)
+            for n, c in sorted(counts.iteritems())))
+
+        return counts
+
+    @property
+    def stats(self):
+        return {
+            'runs': self.runs,
+            'last_run': dict(self.last_run),
+            'total_removed': dict(self.total_removed),
+        }
+
+    def _reap(self, table, pk_column, index_column, condition,
+            bridge_column=None):
+        removed = 0
+        while True:
+            with self.bind.begin() as connection:
+                pks = [row[0] for row in connection.execute(
+                    select([pk_column]).where(condition
+                        ).order_by(index_column).limit(self.batch_size))]
+                if not pks:
+                    break
+
+                if bridge_column is not None:
+                    connection.execute(bridge_column.table.delete().where(
+                        bridge_column.in_(pks)))
+                connection.execute(table.delete().where(pk_column.in_(pks)))
+
+            removed += len(pks)
+            if len(pks) < self.batch_size:
+                break
+
+            # Give live traffic a chance at the tables between batches.
+            self._sleep(self.pause)
+
+        return removed
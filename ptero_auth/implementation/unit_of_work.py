@@ -0,0 +1,79 @@
+import collections
+import sqlalchemy
+import threading
+
+
+__all__ = ['CommitStats', 'after_commit', 'begin', 'commit', 'finish']
+
+
+# In unit-of-work mode a request's writes are flushed as they happen and
+# committed once, by finish(), before the response is sent.  Work that must
+# only happen after the data is durable (cache updates and invalidations) is
+# deferred with after_commit().  Outside of it both helpers act immediately.
+
+_UNIT_OF_WORK = 'unit_of_work'
+_PENDING_COMMIT = 'pending_commit'
+_AFTER_COMMIT = 'after_commit'
+_ENDPOINT = 'endpoint'
+_BEGAN = 'began'
+
+
+def begin(session, endpoint=None, unit_of_work=False):
+    session.info[_ENDPOINT] = endpoint
+    session.info[_UNIT_OF_WORK] = unit_of_work
+
+
+def commit(session):
+    if session.info.get(_UNIT_OF_WORK):
+        session.flush()
+        session.info[_PENDING_COMMIT] = True
+    else:
+        session.commit()
+
+
+def after_commit(session, callback):
+    if session.info.get(_UNIT_OF_WORK):
+        session.info.setdefault(_AFTER_COMMIT, []).append(callback)
+    else:
+        callback()
+
+
+def finish(session):
+    if session.info.pop(_PENDING_COMMIT, False):
+        session.commit()
+
+    for callback in session.info.pop(_AFTER_COMMIT, []):
+        callback()
+
+
+class CommitStats(object):
+    def __init__(self):
+        self._counts = collections.defaultdict(lambda: [0, 0])
+        self._lock = threading.Lock()
+
+    def attach(self, session_factory):
+        sqlalchemy.event.listen(session_factory, 'after_begin',
+                self._after_begin)
+        sqlalchemy.event.listen(session_factory, 'after_commit',
+                self._after_commit)
+
+    def request(self, endpoint):
+        with self._lock:
+            self._counts[endpoint][0] += 1
+
+    @property
+    def stats(self):
+        with self._lock:
+            return dict((str(endpoint), {
+                'requests': requests,
+                'commits': commits,
+            }) for endpoint, (requests, commits) in self._counts.iteritems())
+
+    def _after_begin(self, session, transaction, connection):
+        # Only transactions that touched the database count as commits.
+        session.info[_BEGAN] = True
+
+    def _after_commit(self, session):
+        if session.info.pop(_BEGAN, False):
+            with self._lock:
+                self._counts[session.info.get(_ENDPOINT)][1] += 1
@@ -0,0 +1,143 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+
+LOG = logging.getLogger(__name__)
+
+
+__all__ = ['AuthenticationPool']
+
+
+class AuthenticationPool(object):
+    def __init__(self, check, size, max_pending=None, timeout=10):
+        self.check = check
+        self.size = size
+        self.max_pending = max_pending if max_pending is not None else size * 4
+        self.timeout = timeout
+
+        self._pool = None
+        self._pid = None
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(self.max_pending, 1))
+
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_wait = 0.0
+
+    # NOTE A slot is held until the worker finishes, not until the caller
+    # gives up waiting, so at most max_pending checks ever run or queue.
+    def check_login(self, username, password):
+        if self.max_pending <= 0 or not self._slots.acquire(False):
+            self._count('rejected')
+            LOG.warning('Authentication pool saturated (%d pending), '
+                    'rejecting login for %s.', self.max_pending, username)
+            return False
+
+        start = time.time()
+        self._enter()
+        try:
+            result = self._get_pool().apply_async(_run_check,
+                    (self.check, username, password), callback=self._finished)
+        except Exception:
+            self._finished(None)
+            self._count('errors')
+            LOG.exception('Error submitting authentication for %s to pool.',
+                    username)
+            return False
+
+        try:
+            verdict, error = result.get(self.timeout)
+
+        except multiprocessing.TimeoutError:
+            self._count('timed_out')
+            LOG.warning('Authentication for %s exceeded %s second deadline.',
+                    username, self.timeout)
+            return False
+
+        finally:
+            self._waited(time.time() - start)
+
+        if error is not None:
+            self._count('errors')
+            LOG.error('Error authenticating username %s in pool: %s',
+                    username, error)
+            return False
+
+        self._count('completed')
+        return verdict
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.terminate()
+                self._pool.join()
+            self._pool = None
+            self._pid = None
+
+        # Callbacks of terminated tasks never run.
+        with self._stats_lock:
+            self._slots = threading.BoundedSemaphore(max(self.max_pending, 1))
+            self.in_flight = 0
+
+    @property
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'size': self.size,
+                'max_pending': self.max_pending,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'errors': self.errors,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'total_wait': self.total_wait,
+            }
+
+    def _get_pool(self):
+        # Lazy initialize to be pre-fork friendly: a pool inherited from a
+        # parent process is unusable, so each process starts its own.
+        with self._pool_lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = multiprocessing.Pool(self.size)
+                self._pid = os.getpid()
+            return self._pool
+
+    def _count(self, name):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _enter(self):
+        with self._stats_lock:
+            self.submitted += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _finished(self, value):
+        # Runs in the pool's result thread once the worker is done.
+        with self._stats_lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _waited(self, wait):
+        with self._stats_lock:
+            self.total_wait += wait
+
+
+def _run_check(check, username, password):
+    # Exceptions are returned rather than raised: apply_async only calls the
+    # callback for tasks that return.
+    try:
+        return check(username, password), None
+    except Exception as e:
+        return False, '%s: %s' % (type(e).__name__, e)
@@ -11,3 +11,7 @@ class BaseUserInfoProvider(object):
     @abc.abstractmethod
     def validate_password(self, user, password):  # pragma: no cover
         return NotImplemented
+
+    @property
+    def stats(self):
+        return {}
@@ -0,0 +1,44 @@
+from ..cache import LRUCache
+from ptero_auth.utils import safe_compare
+import binascii
+import hashlib
+import os
+import time
+
+
+__all__ = ['CredentialCache']
+
+
+# NOTE Only successful verifications are remembered.  Passwords are never kept
+# in the clear, just a PBKDF2 digest made with a per-process random salt.
+#
+# Passwords and accounts are managed by the OS, outside this service, so
+# nothing here can evict an entry: a changed password or a locked account
+# keeps working for up to ttl seconds in each worker.
+class CredentialCache(object):
+    def __init__(self, max_size=1024, ttl=300, iterations=10000,
+            clock=time.time):
+        self._cache = LRUCache(max_size, ttl=ttl, clock=clock)
+        self.iterations = iterations
+        self._salt = os.urandom(16)
+
+    def is_verified(self, username, password):
+        digest = self._cache.get(username)
+        if digest is None:
+            return False
+
+        return safe_compare(digest, self._digest(password))
+
+    def remember(self, username, password):
+        self._cache.set(username, self._digest(password))
+
+    @property
+    def stats(self):
+        return self._cache.stats
+
+    def _digest(self, password):
+        if isinstance(password, unicode):
+            password = password.encode('utf-8')
+
+        return binascii.hexlify(hashlib.pbkdf2_hmac('sha256', password,
+            self._salt, self.iterations))
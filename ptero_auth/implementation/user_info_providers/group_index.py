@@ -0,0 +1,75 @@
+import grp
+import logging
+import threading
+import time
+
+
+LOG = logging.getLogger(__name__)
+
+
+__all__ = ['GroupIndex']
+
+
+class GroupIndex(object):
+    def __init__(self, refresh_interval=300, getgrall=grp.getgrall,
+            clock=time.time):
+        self.refresh_interval = refresh_interval
+        self._getgrall = getgrall
+        self._clock = clock
+
+        # (built_at, {username: (group struct, ...)}) -- replaced as a whole
+        # so readers never see a partially built index.
+        self._snapshot = None
+        self._rebuild_lock = threading.Lock()
+
+        self.rebuilds = 0
+
+    def groups_for(self, username):
+        return self._get_index().get(username, ())
+
+    def refresh(self):
+        with self._rebuild_lock:
+            self._rebuild()
+
+    @property
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'refresh_interval': self.refresh_interval,
+            'rebuilds': self.rebuilds,
+            'users': len(snapshot[1]) if snapshot else 0,
+            'age': self._clock() - snapshot[0] if snapshot else None,
+        }
+
+    def _get_index(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._rebuild_lock:
+                if self._snapshot is None:
+                    self._rebuild()
+                return self._snapshot[1]
+
+        if self._clock() - snapshot[0] >= self.refresh_interval:
+            # Only one thread rebuilds; the others keep using the old index.
+            if self._rebuild_lock.acquire(False):
+                try:
+                    if self._snapshot is snapshot:
+                        self._rebuild()
+                finally:
+                    self._rebuild_lock.release()
+            return self._snapshot[1]
+
+        return snapshot[1]
+
+    def _rebuild(self):
+        start = self._clock()
+        members = {}
+        for group in self._getgrall():
+            for username in group.gr_mem:
+                members.setdefault(username, []).append(group)
+
+        index = dict((u, tuple(gs)) for u, gs in members.iteritems())
+        self._snapshot = (self._clock(), index)
+        self.rebuilds += 1
+        LOG.debug('Rebuilt group index for %d users in %.3f seconds.',
+                len(index), self._clock() - start)
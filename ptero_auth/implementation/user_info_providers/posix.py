@@ -1,6 +1,6 @@
 from .base import BaseUserInfoProvider
+from .group_index import GroupIndex
 from ptero_auth import exceptions
-import grp
 import logging
 import pexpect
 import pwd
@@ -10,9 +10,9 @@ import re
 LOG = logging.getLogger(__name__)
 
 
-def _get_posix(user):
+def _get_posix(user, group_index):
     pw_struct = pwd.getpwnam(user.name)
-    group_structs = _get_group_structs_for(user)
+    group_structs = group_index.groups_for(user.name)
     groups = [pw_struct.pw_gid] + [g.gr_gid for g in group_structs]
 
     return {
@@ -23,8 +23,8 @@ def _get_posix(user):
     }
 
 
-def _get_roles(user):
-    return [g.gr_name for g in _get_group_structs_for(user)]
+def _get_roles(user, group_index):
+    return [g.gr_name for g in group_index.groups_for(user.name)]
 
 
 _FIELD_CONSTRUCTORS = {
@@ -34,6 +34,15 @@ _FIELD_CONSTRUCTORS = {
 
 
 class PosixUserInfoProvider(BaseUserInfoProvider):
+    def __init__(self, credential_cache=None, auth_pool=None,
+            group_index=None):
+        super(PosixUserInfoProvider, self).__init__()
+        self.credential_cache = credential_cache
+        self.auth_pool = auth_pool
+        if group_index is None:
+            group_index = GroupIndex()
+        self.group_index = group_index
+
     def get_user_data(self, user, field_names):
         result = {}
 
@@ -41,19 +50,48 @@ class PosixUserInfoProvider(BaseUserInfoProvider):
             if field_name not in _FIELD_CONSTRUCTORS:
                 raise exceptions.InvalidFieldName(field_name)
 
-            result[field_name] = _FIELD_CONSTRUCTORS[field_name](user)
+            result[field_name] = _FIELD_CONSTRUCTORS[field_name](user,
+                    self.group_index)
 
         return result
 
     def validate_password(self, user, password):
-        return check_login(user.name, password)
+        if self.credential_cache is None:
+            return self._check_login(user.name, password)
+
+        if self.credential_cache.is_verified(user.name, password):
+            return True
+
+        if self._check_login(user.name, password):
+            self.credential_cache.remember(user.name, password)
+            return True
+
+        return False
+
+    def _check_login(self, username, password):
+        if self.auth_pool is None:
+            return check_login(username, password)
+
+        # Checked here too, so invalid names never take a pool slot.
+        if not _check_username(username):
+            return False
+
+        return self.auth_pool.check_login(username, password)
+
+    @property
+    def stats(self):
+        result = {'group_index': self.group_index.stats}
+        if self.credential_cache is not None:
+            result['credential_cache'] = self.credential_cache.stats
+        if self.auth_pool is not None:
+            result['auth_pool'] = self.auth_pool.stats
+        return result
 
 
 # This function is inspired by a StackOverflow answer:
 # http://stackoverflow.com/questions/5286321/pam-authentication-in-python-without-root-privileges
 def check_login(username, password):
-    if not _is_valid_username(username):
-        LOG.debug('Invalid user name (%s) given to check_login.', username)
+    if not _check_username(username):
         return False
 
     try:
@@ -83,5 +121,9 @@ def _is_valid_username(username):
     return _VALID_USERNAME_REGEX.match(username)
 
 
-def _get_group_structs_for(user):
-    return [g for g in grp.getgrall() if user.name in g.gr_mem]
+def _check_username(username):
+    if _is_valid_username(username):
+        return True
+
+    LOG.debug('Invalid user name (%s) given to check_login.', username)
+    return False
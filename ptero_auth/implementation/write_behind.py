@@ -0,0 +1,183 @@
+import abc
+import atexit
+import logging
+import threading
+import time
+
+
+LOG = logging.getLogger(__name__)
+
+
+__all__ = ['WriteBehindBuffer', 'WriteBehindQueue']
+
+
+# Non-critical writes are coalesced by key in memory and written in batches
+# outside of any request's transaction.  Subclasses define how two pending
+# values for one key merge and how a batch is written.
+class WriteBehindBuffer(object):
+    __metaclass__ = abc.ABCMeta
+
+    name = None
+
+    def __init__(self, flush_interval=30, clock=time.time):
+        self.flush_interval = flush_interval
+        self._clock = clock
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = clock()
+
+        self.recorded = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.failed_flushes = 0
+
+    @abc.abstractmethod
+    def merge(self, current, value):  # pragma: no cover
+        return NotImplemented
+
+    @abc.abstractmethod
+    def write(self, connection, pending):  # pragma: no cover
+        return NotImplemented
+
+    def add(self, key, value):
+        with self._lock:
+            current = self._pending.get(key)
+            self._pending[key] = (value if current is None
+                    else self.merge(current, value))
+            self.recorded += 1
+
+    @property
+    def is_due(self):
+        return self._clock() - self._last_flush >= self.flush_interval
+
+    def flush_if_due(self, bind):
+        if self.is_due:
+            return self.flush(bind)
+        return 0
+
+    def flush(self, bind):
+        pending = self.drain()
+        if not pending:
+            return 0
+
+        try:
+            with bind.begin() as connection:
+                self.write(connection, pending)
+
+        except Exception:
+            LOG.exception('Failed to flush %d %s rows.', len(pending),
+                    self.name)
+            self.restore(pending)
+            return 0
+
+        self.flushed(pending)
+        return len(pending)
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = self._clock()
+        return pending
+
+    def restore(self, pending):
+        with self._lock:
+            for key, value in pending.iteritems():
+                current = self._pending.get(key)
+                self._pending[key] = (value if current is None
+                        else self.merge(value, current))
+            self.failed_flushes += 1
+
+    def flushed(self, pending):
+        self.flushes += 1
+        self.rows_flushed += len(pending)
+
+    @property
+    def stats(self):
+        return {
+            'pending': len(self._pending),
+            'recorded': self.recorded,
+            'flushes': self.flushes,
+            'rows_flushed': self.rows_flushed,
+            'failed_flushes': self.failed_flushes,
+        }
+
+
+# Flushes several buffers in one transaction: once any of them is due, all
+# of them are written, so they share the commit.  Once started, a daemon
+# thread checks every check_interval seconds, so no request waits for a
+# flush; whatever is pending at exit is flushed then.
+class WriteBehindQueue(object):
+    def __init__(self, buffers, check_interval=1):
+        self.buffers = list(buffers)
+        self.check_interval = check_interval
+
+        self._thread = None
+        self._stopped = threading.Event()
+
+        self.transactions = 0
+        self.failed_transactions = 0
+
+    def start(self, bind):
+        if self._thread is not None:
+            return
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, args=(bind,),
+                name='write-behind')
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.stop, bind)
+
+    def stop(self, bind):
+        if self._thread is None:
+            return
+
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        self.flush(bind)
+
+    def _run(self, bind):
+        while not self._stopped.wait(self.check_interval):
+            try:
+                self.flush_if_due(bind)
+            except Exception:
+                LOG.exception('Write-behind flush failed.')
+
+    def flush_if_due(self, bind):
+        if any(b.is_due for b in self.buffers):
+            return self.flush(bind)
+        return 0
+
+    def flush(self, bind):
+        batches = [(b, b.drain()) for b in self.buffers]
+        batches = [(b, pending) for b, pending in batches if pending]
+        if not batches:
+            return 0
+
+        try:
+            with bind.begin() as connection:
+                for buffer, pending in batches:
+                    buffer.write(connection, pending)
+
+        except Exception:
+            LOG.exception('Failed to flush write-behind queue.')
+            for buffer, pending in batches:
+                buffer.restore(pending)
+            self.failed_transactions += 1
+            return 0
+
+        self.transactions += 1
+        rows = 0
+        for buffer, pending in batches:
+            buffer.flushed(pending)
+            rows += len(pending)
+        return rows
+
+    @property
+    def stats(self):
+        result = dict((b.name, b.stats) for b in self.buffers)
+        result['transactions'] = self.transactions
+        result['failed_transactions'] = self.failed_transactions
+        return result
@@ -0,0 +1,43 @@
+from ptero_auth.implementation import models
+from ptero_auth.implementation.reaper import Reaper
+import argparse
+import logging
+import os
+import sqlalchemy
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+            description='Delete expired authorization codes and refresh '
+            'tokens.')
+
+    parser.add_argument('--log-level', default='INFO',
+            help='Logging level')
+    parser.add_argument('--interval', type=float, default=None,
+            help='Keep running, reaping every INTERVAL seconds')
+
+    return parser.parse_args()
+
+
+def create_reaper():
+    engine = sqlalchemy.create_engine(os.environ['DATABASE_URL'])
+    models.Base.metadata.create_all(engine)
+
+    return Reaper(engine,
+            grant_retention=int(os.environ.get('REAPER_GRANT_RETENTION', 600)),
+            refresh_token_retention=int(
+                os.environ.get('REAPER_REFRESH_TOKEN_RETENTION', 0)),
+            batch_size=int(os.environ.get('REAPER_BATCH_SIZE', 1000)),
+            pause=float(os.environ.get('REAPER_PAUSE', 0.1)))
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()))
+
+    reaper = create_reaper()
+    reaper.run()
+    while args.interval:
+        time.sleep(args.interval)
+        reaper.run()
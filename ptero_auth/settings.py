@@ -1,5 +1,5 @@
-from Crypto.Hash import SHA256
 from Crypto.PublicKey import RSA
+from .implementation import keyring
 from urlparse import urlparse
 import logging
 import os
@@ -12,7 +12,12 @@ __all__ = ['get_from_env']
 
 
 def _get_signature_key():
-    private_key = RSA.importKey(os.environ['SIGNATURE_KEY'])
+    directory = os.environ.get('SIGNATURE_KEY_DIR')
+    if directory and 'SIGNATURE_KEY' not in os.environ:
+        with open(os.path.join(directory, keyring.ACTIVE_KEY_FILENAME)) as f:
+            private_key = RSA.importKey(f.read())
+    else:
+        private_key = RSA.importKey(os.environ['SIGNATURE_KEY'])
 
     fingerprint = _calculate_fingerprint(private_key.publickey())
     return {
@@ -23,8 +28,18 @@ def _get_signature_key():
 
 
 def _calculate_fingerprint(public_key):
-    return SHA256.new(
-            public_key.exportKey(format='DER', pkcs=8)).hexdigest()[:8]
+    return keyring.fingerprint(public_key)
+
+
+def _get_optional(name, convert):
+    value = os.environ.get(name)
+    if value is None:
+        return None
+    return convert(value)
+
+
+def _to_bool(value):
+    return value.lower() in ('1', 'true', 'yes', 'on')
 
 
 def port(AUTH_URL):
@@ -35,9 +50,106 @@ def get_from_env():
     result = {}
 
     result['signature_key'] = _get_signature_key()
+    result['signature_key_dir'] = os.environ.get('SIGNATURE_KEY_DIR')
+    result['signature_key_reload_interval'] = float(
+            os.environ.get('SIGNATURE_KEY_RELOAD_INTERVAL', 30))
     result['database_url'] = os.environ['DATABASE_URL']
+    result['database_pool_size'] = _get_optional('DATABASE_POOL_SIZE', int)
+    result['database_max_overflow'] = _get_optional('DATABASE_MAX_OVERFLOW',
+            int)
+    result['database_pool_timeout'] = _get_optional('DATABASE_POOL_TIMEOUT',
+            float)
+    result['database_pool_recycle'] = _get_optional('DATABASE_POOL_RECYCLE',
+            int)
+    result['database_pool_pre_ping'] = _get_optional(
+            'DATABASE_POOL_PRE_PING', _to_bool)
     result['auth_url'] = os.environ['AUTH_URL']
     result['port'] = port(result['auth_url'])
+    result['oidc_issuer'] = os.environ.get('OIDC_ISSUER')
     result['admin_role'] = os.environ.get('ADMIN_ROLE', 'pteroadmin')
 
+    result['stateless_authorization_codes'] = _to_bool(
+            os.environ.get('STATELESS_AUTHORIZATION_CODES', 'false'))
+    result['authorization_code_lifetime'] = int(
+            os.environ.get('AUTHORIZATION_CODE_LIFETIME', 600))
+
+    result['jwt_access_tokens'] = _to_bool(
+            os.environ.get('JWT_ACCESS_TOKENS', 'false'))
+    result['access_token_lifetime'] = int(
+            os.environ.get('ACCESS_TOKEN_LIFETIME', 3600))
+
+    result['discovery_max_age'] = int(
+            os.environ.get('DISCOVERY_MAX_AGE', 3600))
+
+    result['introspection_cache_size'] = int(
+            os.environ.get('INTROSPECTION_CACHE_SIZE', 10000))
+    result['introspection_cache_ttl'] = int(
+            os.environ.get('INTROSPECTION_CACHE_TTL', 30))
+    result['introspection_negative_ttl'] = int(
+            os.environ.get('INTROSPECTION_NEGATIVE_TTL', 5))
+    result['introspection_max_batch'] = int(
+            os.environ.get('INTROSPECTION_MAX_BATCH', 100))
+    result['introspection_resource_servers'] = [c for c in os.environ.get(
+        'INTROSPECTION_RESOURCE_SERVERS', '').split(',') if c]
+
+    result['user_cache_size'] = int(os.environ.get('USER_CACHE_SIZE', 10000))
+    result['user_cache_ttl'] = int(os.environ.get('USER_CACHE_TTL', 300))
+
+    result['api_key_cache_size'] = int(
+            os.environ.get('API_KEY_CACHE_SIZE', 10000))
+    result['api_key_cache_ttl'] = int(os.environ.get('API_KEY_CACHE_TTL', 60))
+    result['api_key_usage_flush_interval'] = float(
+            os.environ.get('API_KEY_USAGE_FLUSH_INTERVAL', 30))
+    result['write_behind_check_interval'] = float(
+            os.environ.get('WRITE_BEHIND_CHECK_INTERVAL', 1))
+    result['api_key_revocation_check_interval'] = float(
+            os.environ.get('API_KEY_REVOCATION_CHECK_INTERVAL', 5))
+    result['api_key_revocation_lookback'] = int(
+            os.environ.get('API_KEY_REVOCATION_LOOKBACK', 60))
+
+    result['unit_of_work'] = _to_bool(
+            os.environ.get('UNIT_OF_WORK', 'false'))
+
+    result['audience_cache_size'] = int(
+            os.environ.get('AUDIENCE_CACHE_SIZE', 1024))
+    result['audience_cache_ttl'] = int(
+            os.environ.get('AUDIENCE_CACHE_TTL', 300))
+
+    result['client_cache_size'] = int(
+            os.environ.get('CLIENT_CACHE_SIZE', 1024))
+    result['client_cache_ttl'] = int(os.environ.get('CLIENT_CACHE_TTL', 300))
+    result['client_registry_refresh_interval'] = float(
+            os.environ.get('CLIENT_REGISTRY_REFRESH_INTERVAL', 5))
+    result['client_registry_min_refresh_interval'] = float(
+            os.environ.get('CLIENT_REGISTRY_MIN_REFRESH_INTERVAL', 1))
+    result['client_registry_lookback'] = int(
+            os.environ.get('CLIENT_REGISTRY_LOOKBACK', 100))
+    result['client_registry_full_reload_interval'] = float(
+            os.environ.get('CLIENT_REGISTRY_FULL_RELOAD_INTERVAL', 300))
+
+    result['negative_cache_size'] = int(
+            os.environ.get('NEGATIVE_CACHE_SIZE', 10000))
+    result['negative_cache_ttl'] = int(
+            os.environ.get('NEGATIVE_CACHE_TTL', 10))
+    result['negative_cache_tracked_keys'] = int(
+            os.environ.get('NEGATIVE_CACHE_TRACKED_KEYS', 1000))
+    result['negative_cache_max_key_length'] = int(
+            os.environ.get('NEGATIVE_CACHE_MAX_KEY_LENGTH', 256))
+
+    result['credential_cache_size'] = int(
+            os.environ.get('CREDENTIAL_CACHE_SIZE', 1024))
+    # Also how long a changed OS password or locked account keeps working.
+    result['credential_cache_ttl'] = int(
+            os.environ.get('CREDENTIAL_CACHE_TTL', 300))
+
+    # Opt-in: 0 authenticates in the request thread.
+    result['auth_pool_size'] = int(os.environ.get('AUTH_POOL_SIZE', 0))
+    result['auth_pool_max_pending'] = int(os.environ.get(
+        'AUTH_POOL_MAX_PENDING', 4 * result['auth_pool_size']))
+    result['auth_pool_timeout'] = float(
+            os.environ.get('AUTH_POOL_TIMEOUT', 10))
+
+    result['group_index_refresh_interval'] = float(
+            os.environ.get('GROUP_INDEX_REFRESH_INTERVAL', 300))
+
     return result
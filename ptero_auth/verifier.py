@@ -0,0 +1,275 @@
+from .implementation.cache import LRUCache
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import RSA
+from Crypto.Signature import PKCS1_v1_5
+from multiprocessing.pool import ThreadPool
+import base64
+import hashlib
+import json
+import logging
+import multiprocessing
+import re
+import threading
+import time
+import urllib2
+
+
+LOG = logging.getLogger(__name__)
+
+
+__all__ = ['JwksClient', 'TokenVerifier']
+
+
+# Client side verification of tokens issued by this service, for resource
+# servers.  Only needs pycrypto and the standard library.
+#
+#   verifier = TokenVerifier.from_discovery(
+#           'https://auth.example/.well-known/openid-configuration',
+#           audience='my-client-id')
+#   claims = verifier.verify(token)                  # dict or None
+#   results = verifier.verify_many(tokens)           # in the same order
+
+
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+
+
+class JwksClient(object):
+    def __init__(self, url, default_max_age=300, min_refresh_interval=30,
+            timeout=5, urlopen=urllib2.urlopen, clock=time.time):
+        self.url = url
+        self.default_max_age = default_max_age
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._urlopen = urlopen
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._etag = None
+        self._expires_at = 0
+        self._fetched_at = None
+
+        self.fetches = 0
+        self.not_modified = 0
+        self.errors = 0
+
+    def get_key(self, kid):
+        if self._clock() >= self._expires_at:
+            self._refresh(expired_only=True)
+
+        key = self._keys.get(kid)
+        if key is None:
+            # An unknown kid usually means the service rotated its keys.
+            self._refresh(min_age=self.min_refresh_interval)
+            key = self._keys.get(kid)
+
+        return key
+
+    def refresh(self):
+        self._refresh()
+
+    def _refresh(self, expired_only=False, min_age=None):
+        with self._lock:
+            # Another thread may have refreshed while this one waited.
+            now = self._clock()
+            if expired_only and now < self._expires_at:
+                return
+            if (min_age is not None and self._fetched_at is not None
+                    and now - self._fetched_at < min_age):
+                return
+
+            request = urllib2.Request(self.url)
+            if self._etag:
+                request.add_header('If-None-Match', self._etag)
+
+            try:
+                response = self._urlopen(request, timeout=self.timeout)
+                body = response.read()
+                headers = response.info()
+
+            except urllib2.HTTPError as e:
+                if e.code != 304:
+                    return self._fetch_failed(now)
+                self.not_modified += 1
+                headers = e.info()
+
+            except Exception:
+                return self._fetch_failed(now)
+
+            else:
+                try:
+                    keys = _parse_jwks(body)
+                except Exception:
+                    return self._fetch_failed(now)
+                self.fetches += 1
+                self._keys = keys
+                self._etag = headers.get('ETag')
+
+            self._fetched_at = now
+            self._expires_at = now + self._get_max_age(headers)
+
+    @property
+    def stats(self):
+        return {
+            'keys': len(self._keys),
+            'fetches': self.fetches,
+            'not_modified': self.not_modified,
+            'errors': self.errors,
+        }
+
+    def _fetch_failed(self, now):
+        # Keep the keys we have and retry after the minimum interval.
+        self.errors += 1
+        LOG.warning('Failed to fetch JWKS from %s', self.url, exc_info=True)
+        self._fetched_at = now
+        self._expires_at = now + self.min_refresh_interval
+
+    def _get_max_age(self, headers):
+        match = _MAX_AGE.search(headers.get('Cache-Control') or '')
+        if match:
+            return int(match.group(1))
+        return self.default_max_age
+
+
+# The issuer has no default: it is whatever the service is configured to
+# put in iss, so take it from the discovery document or pass it explicitly
+# (None skips the check).
+class TokenVerifier(object):
+    def __init__(self, jwks, issuer, audience=None, cache_size=10000,
+            leeway=0, workers=None, clock=time.time):
+        self.jwks = jwks
+        self.audience = audience
+        self.issuer = issuer
+        self.leeway = leeway
+        self.workers = workers or multiprocessing.cpu_count()
+        self._clock = clock
+
+        # Verified claims are remembered until the token expires.
+        self.cache = LRUCache(cache_size, clock=clock)
+
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @classmethod
+    def from_discovery(cls, url, timeout=5, urlopen=urllib2.urlopen,
+            **kwargs):
+        response = urlopen(urllib2.Request(url), timeout=timeout)
+        configuration = json.loads(response.read())
+
+        jwks = JwksClient(configuration['jwks_uri'], timeout=timeout,
+                urlopen=urlopen)
+        return cls(jwks, configuration['issuer'], **kwargs)
+
+    def verify(self, token):
+        digest = _digest(token)
+        claims = self.cache.get(digest)
+        if claims is not None:
+            return claims
+
+        claims = self._verify(token)
+        if claims is not None:
+            self.cache.set(digest, claims,
+                    ttl=claims['exp'] + self.leeway - self._clock())
+        return claims
+
+    def verify_many(self, tokens):
+        tokens = list(tokens)
+        results = {}
+        missing = []
+        for token in set(tokens):
+            claims = self.cache.get(_digest(token))
+            if claims is None:
+                missing.append(token)
+            else:
+                results[token] = claims
+
+        if len(missing) > 1:
+            results.update(zip(missing, self._get_pool().map(self.verify,
+                missing)))
+        elif missing:
+            results[missing[0]] = self.verify(missing[0])
+
+        return [results[token] for token in tokens]
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPool(self.workers)
+            return self._pool
+
+    def _verify(self, token):
+        try:
+            encoded_header, encoded_payload, encoded_signature = \
+                    str(token).split('.')
+            header = json.loads(_base64url_decode(encoded_header))
+            if header.get('alg') != 'RS256':
+                return None
+
+            key = self.jwks.get_key(header.get('kid'))
+            if key is None:
+                return None
+
+            digest = SHA256.new('%s.%s' % (encoded_header, encoded_payload))
+            if not key.verify(digest, _base64url_decode(encoded_signature)):
+                return None
+
+            claims = json.loads(_base64url_decode(encoded_payload))
+
+        except Exception:
+            LOG.debug('Could not verify token.', exc_info=True)
+            return None
+
+        if self._claims_are_valid(claims):
+            return claims
+
+    def _claims_are_valid(self, claims):
+        if self.issuer is not None and claims.get('iss') != self.issuer:
+            return False
+
+        if not isinstance(claims.get('exp'), (int, long, float)):
+            return False
+        if claims['exp'] + self.leeway <= self._clock():
+            return False
+
+        if self.audience is not None:
+            aud = claims.get('aud')
+            if not isinstance(aud, list):
+                aud = [aud]
+            if self.audience not in aud:
+                return False
+
+        return True
+
+
+def _digest(token):
+    if isinstance(token, unicode):
+        token = token.encode('utf-8')
+    return hashlib.sha256(token).hexdigest()
+
+
+def _parse_jwks(body):
+    keys = {}
+    for jwk in json.loads(body).get('keys', []):
+        if jwk.get('kty') != 'RSA' or jwk.get('use', 'sig') != 'sig':
+            continue
+
+        public_key = RSA.construct((_base64url_uint(jwk['n']),
+            _base64url_uint(jwk['e'])))
+        keys[jwk.get('kid')] = PKCS1_v1_5.new(public_key)
+
+    return keys
+
+
+def _base64url_decode(value):
+    return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+
+
+def _base64url_uint(value):
+    return long(_base64url_decode(str(value)).encode('hex'), 16)
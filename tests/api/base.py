@@ -23,16 +23,20 @@ class BaseFlaskTest(unittest.TestCase):
             with open(util.get_test_data_path('test_users.yaml')) as f:
                 user_data = yaml.load(f)
 
-        self.app = create_app(user_data=user_data, settings={
-            'signature_key': _SIGNATURE_KEY,
-            'database_url': 'sqlite://',
-            'admin_role': os.environ.get('TEST_ADMIN_ROLE', 'pteroadmin'),
-        })
+        self.app = create_app(user_data=user_data,
+                settings=self.get_settings())
         self.app.config['TESTING'] = True
         self.client = self.app.test_client()
 
         self.public_key = rsa_key.AUTH_PUBLIC_KEY
 
+    def get_settings(self):
+        return {
+            'signature_key': _SIGNATURE_KEY,
+            'database_url': 'sqlite://',
+            'admin_role': os.environ.get('TEST_ADMIN_ROLE', 'pteroadmin'),
+        }
+
     def basic_auth_header(self, username, password):
         return requests.auth._basic_auth_str(username, password)
 
@@ -14,7 +14,7 @@ class GetAuthorizeBase(BaseFlaskTest):
         'name': 'widget maker v1.1',
         'redirect_uri_regex': '^http://localhost:'
             + str(CONFIDENTIAL_CLIENT_PORT)
-            + r'/(resource1)|(resource2)/?(\?.+)?$',
+            + r'/(resource1|resource2)(/[^?]*)?(\?.+)?$',
         'default_redirect_uri': 'http://localhost:'
             + str(CONFIDENTIAL_CLIENT_PORT)
             + '/resource1/12345',
@@ -12,7 +12,7 @@ class PostClientsList(BaseFlaskTest):
         'name': 'widget maker v1.1',
         'redirect_uri_regex': '^http://localhost:'
             + str(CONFIDENTIAL_CLIENT_PORT)
-            + r'/(resource1)|(resource2)/?(\?.+)?$',
+            + r'/(resource1|resource2)(/[^?]*)?(\?.+)?$',
         'default_redirect_uri': 'http://localhost:'
             + str(CONFIDENTIAL_CLIENT_PORT)
             + '/resource1/12345',
@@ -82,6 +82,16 @@ class PostClientsList(BaseFlaskTest):
 
         self.compare_client_data(response_data, self.VALID_CONFIDENTIAL_CLIENT)
 
+    def test_should_return_400_with_unanchored_redirect_uri_regex(self):
+        data = dict(self.VALID_CONFIDENTIAL_CLIENT)
+        data['redirect_uri_regex'] = 'http://localhost:8008/.*'
+        response = self.client.post('/v1/clients', data=json.dumps(data),
+                headers={
+                    'Authorization': self.basic_auth_header('alice', 'apass'),
+                })
+
+        self.assertEqual(response.status_code, 400)
+
     CLIENT_DATA_COMPARISON_WRAPPERS = {
         'type': lambda x: x,
         'name': lambda x: x,
@@ -97,3 +107,84 @@ class PostClientsList(BaseFlaskTest):
         for posted_key, posted_value in expected.iteritems():
             wrapper = self.CLIENT_DATA_COMPARISON_WRAPPERS[posted_key]
             self.assertEqual(wrapper(actual[posted_key]), wrapper(posted_value))
+
+
+class GetClientsList(BaseFlaskTest):
+    CLIENT_DATA = {
+        'name': 'widget maker v1.1',
+        'redirect_uri_regex': r'^http://localhost:8008/resource1/?(\?.+)?$',
+        'default_redirect_uri': 'http://localhost:8008/resource1/12345',
+        'allowed_scopes': ['foo', 'bar', 'baz'],
+        'default_scopes': ['bar', 'baz'],
+    }
+
+    def setUp(self):
+        super(GetClientsList, self).setUp()
+        for _ in range(3):
+            self.register_client('alice', 'apass', **self.CLIENT_DATA)
+
+    def _get_clients(self, query='', username='alice', password='apass'):
+        return self.client.get('/v1/clients' + query, headers={
+            'Authorization': self.basic_auth_header(username, password),
+        })
+
+    def test_should_return_403_for_non_admin_user(self):
+        response = self._get_clients(username='bob', password='foobob')
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_should_return_clients(self):
+        response = self._get_clients()
+        self.assertEqual(response.status_code, 200)
+
+        data = json.loads(response.data)
+        self.assertEqual(len(data['clients']), 3)
+        self.assertIsNone(data['next'])
+        self.assertEqual(set(data['clients'][0]['allowed_scopes']),
+                set(self.CLIENT_DATA['allowed_scopes']))
+
+    def test_should_link_to_next_page(self):
+        response = self._get_clients('?limit=2')
+
+        data = json.loads(response.data)
+        self.assertEqual(len(data['clients']), 2)
+        self.assertIn('rel="next"', response.headers['Link'])
+
+        next_page = json.loads(self._get_clients(
+            data['next'][len('http://localhost/v1/clients'):]).data)
+        self.assertEqual(len(next_page['clients']), 1)
+
+    def test_should_return_400_with_invalid_limit(self):
+        response = self._get_clients('?limit=0')
+
+        self.assertEqual(response.status_code, 400)
+
+
+class PatchClient(BaseFlaskTest):
+    def setUp(self):
+        super(PatchClient, self).setUp()
+        self.client_id = self.register_client('alice', 'apass',
+                **GetClientsList.CLIENT_DATA)['client_id']
+
+    def _patch(self, client_id, username='alice', password='apass'):
+        return self.client.patch('/v1/clients/' + client_id, headers={
+            'Authorization': self.basic_auth_header(username, password),
+        })
+
+    def test_should_return_403_for_non_admin_user(self):
+        response = self._patch(self.client_id, 'bob', 'foobob')
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_should_return_404_for_unknown_client(self):
+        response = self._patch('nonsense')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_should_deactivate_client(self):
+        self.client.get('/v1/clients/' + self.client_id)
+        response = self._patch(self.client_id)
+        self.assertEqual(response.status_code, 200)
+
+        get_response = self.client.get('/v1/clients/' + self.client_id)
+        self.assertFalse(json.loads(get_response.data)['active'])
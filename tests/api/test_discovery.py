@@ -0,0 +1,65 @@
+from .base import BaseFlaskTest
+from ptero_auth.implementation.discovery import ISSUER
+import json
+
+
+class GetJwks(BaseFlaskTest):
+    def test_should_return_signing_key(self):
+        response = self.client.get('/v1/jwks')
+
+        self.assertEqual(response.status_code, 200)
+        keys = json.loads(response.data)['keys']
+        self.assertEqual(keys[0]['kid'], 'testing-key')
+
+    def test_should_set_cache_headers(self):
+        response = self.client.get('/v1/jwks')
+
+        self.assertTrue(response.headers['ETag'])
+        self.assertIn('max-age', response.headers['Cache-Control'])
+
+    def test_should_return_304_with_matching_etag(self):
+        etag = self.client.get('/v1/jwks').headers['ETag']
+        response = self.client.get('/v1/jwks',
+                headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, '')
+
+
+class GetOpenIDConfiguration(BaseFlaskTest):
+    URL = 'http://localhost/.well-known/openid-configuration'
+
+    def get_settings(self):
+        settings = super(GetOpenIDConfiguration, self).get_settings()
+        settings['auth_url'] = 'http://localhost'
+        settings['oidc_issuer'] = 'http://localhost'
+        return settings
+
+    def test_should_return_jwks_uri(self):
+        response = self.client.get(self.URL)
+
+        self.assertEqual(response.status_code, 200)
+        config = json.loads(response.data)
+        self.assertEqual(config['jwks_uri'], 'http://localhost/v1/jwks')
+
+    def test_issuer_should_match_served_url(self):
+        config = json.loads(self.client.get(self.URL).data)
+
+        self.assertEqual(
+                config['issuer'] + '/.well-known/openid-configuration',
+                self.URL)
+
+
+class GetOpenIDConfigurationWithDefaultIssuer(BaseFlaskTest):
+    def get_settings(self):
+        settings = super(GetOpenIDConfigurationWithDefaultIssuer,
+                self).get_settings()
+        settings['auth_url'] = 'http://localhost'
+        return settings
+
+    def test_should_keep_default_issuer(self):
+        config = json.loads(self.client.get(
+            '/.well-known/openid-configuration').data)
+
+        self.assertEqual(config['issuer'], ISSUER)
+        self.assertEqual(config['jwks_uri'], 'http://localhost/v1/jwks')
@@ -0,0 +1,25 @@
+from .base import BaseFlaskTest
+import json
+
+
+class GetStats(BaseFlaskTest):
+    def get_stats(self, username=None, password=None):
+        headers = {}
+        if username:
+            headers['Authorization'] = self.basic_auth_header(username,
+                    password)
+        return self.client.get('/v1/stats', headers=headers)
+
+    def test_should_return_401_without_authorization(self):
+        self.assertEqual(self.get_stats().status_code, 401)
+
+    def test_should_return_403_for_non_admin(self):
+        self.assertEqual(self.get_stats('bob', 'foobob').status_code, 403)
+
+    def test_should_return_stats_for_admin(self):
+        response = self.get_stats('alice', 'apass')
+
+        self.assertEqual(response.status_code, 200)
+        stats = json.loads(response.data)
+        self.assertIn('database_pool', stats)
+        self.assertIn('api_key_usage', stats)
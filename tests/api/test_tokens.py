@@ -1,4 +1,6 @@
+from ..test_verifier import FakeResponse
 from .base import BaseFlaskTest
+from ptero_auth.verifier import TokenVerifier
 import jot
 import json
 import urllib
@@ -13,8 +15,8 @@ class PostTokens(BaseFlaskTest):
     VALID_CONFIDENTIAL_CLIENTS = [
         {
             'name': 'widget maker v1.1',
-            'redirect_uri_regex':
-                r'^http://localhost:8008/(resource1)|(resource2)/?(\?.+)?$',
+            'redirect_uri_regex': r'^http://localhost:8008'
+                + r'/(resource1|resource2)(/[^?]*)?(\?.+)?$',
             'default_redirect_uri':
                 r'^http://localhost:8008/resource1/12345',
             'allowed_scopes': ['foo', 'bar', 'baz', 'openid'],
@@ -188,3 +190,133 @@ class PostTokens(BaseFlaskTest):
                     'Contet-Type': 'application/x-www-form-urlencoded',
                 })
         self.assertEqual(response2.status_code, 401)
+
+    def _refresh(self, refresh_token):
+        return self.client.post('/v1/tokens',
+                data=urllib.urlencode({
+                    'grant_type': 'refresh_token',
+                    'refresh_token': refresh_token,
+                }),
+                headers={
+                    'Authorization': self.basic_auth_header(self.client_id,
+                        self.client_secret),
+                    'Contet-Type': 'application/x-www-form-urlencoded',
+                })
+
+    def test_should_refresh_access_token(self):
+        data = self._get_response_data(self._post_with_typical_params())
+
+        response = self._refresh(data['refresh_token'])
+        self.assertEqual(response.status_code, 200)
+
+        refreshed = self._get_response_data(response)
+        self.assertNotEqual(refreshed['access_token'], data['access_token'])
+        self.assertNotEqual(refreshed['refresh_token'], data['refresh_token'])
+
+    def test_should_return_401_with_reused_refresh_token(self):
+        data = self._get_response_data(self._post_with_typical_params())
+
+        self._refresh(data['refresh_token'])
+        response = self._refresh(data['refresh_token'])
+        self.assertEqual(response.status_code, 401)
+
+
+class PostTokensWithJWTAccessTokens(PostTokens):
+    def get_settings(self):
+        settings = super(PostTokensWithJWTAccessTokens, self).get_settings()
+        settings['jwt_access_tokens'] = True
+        return settings
+
+    def test_should_return_signed_access_token(self):
+        response = self._post_with_typical_params(scopes=['bar', 'openid'])
+
+        data = self._get_response_data(response)
+        access_token_jws = jot.deserialize(data['access_token'])
+        self.assertTrue(access_token_jws.verify_with(self.public_key))
+
+        access_token = access_token_jws.payload
+        self.assertTrue(access_token.is_valid)
+        self.assertTrue(access_token.has_audience(self.client_id))
+        self.assertEqual(access_token.claims['scope'], 'bar openid')
+        self.assertIn('jti', access_token.claims)
+        self.assertNotEqual(data['refresh_token'].count('.'), 2)
+
+    def _urlopen(self, request, timeout=None):
+        response = self.client.get(
+                urlparse.urlparse(request.get_full_url()).path)
+        return FakeResponse(response.data, response.headers)
+
+    def test_access_token_should_verify_with_discovered_issuer(self):
+        data = self._get_response_data(self._post_with_typical_params())
+
+        verifier = TokenVerifier.from_discovery(
+                'http://localhost/.well-known/openid-configuration',
+                urlopen=self._urlopen)
+        try:
+            claims = verifier.verify(data['access_token'])
+        finally:
+            verifier.close()
+
+        self.assertEqual(claims['azp'], self.client_id)
+
+
+class PostTokensInUnitOfWork(PostTokens):
+    def get_settings(self):
+        settings = super(PostTokensInUnitOfWork, self).get_settings()
+        settings['unit_of_work'] = True
+        return settings
+
+    def _get_commit_stats(self):
+        response = self.client.get('/v1/stats', headers={
+            'Authorization': self.basic_auth_header('alice', 'apass'),
+        })
+        return json.loads(response.data)['commits']
+
+    def test_each_request_commits_once(self):
+        response = self._post_with_typical_params()
+        self.assertEqual(response.status_code, 200)
+
+        stats = self._get_commit_stats()
+        self.assertEqual(stats['authorize'], {'requests': 1, 'commits': 1})
+        self.assertEqual(stats['tokens'], {'requests': 1, 'commits': 1})
+
+    def test_failed_request_does_not_commit(self):
+        response = self._post_with_typical_params(secret='invalid-secret')
+        self.assertEqual(response.status_code, 401)
+
+        self.assertEqual(self._get_commit_stats()['tokens'],
+                {'requests': 1, 'commits': 0})
+
+
+class PostIntrospect(PostTokensWithJWTAccessTokens):
+    def _introspect(self, data, secret=None):
+        return self.client.post('/v1/introspect', data=data,
+                headers={
+                    'Authorization': self.basic_auth_header(self.client_id,
+                        secret or self.client_secret),
+                })
+
+    def test_should_return_401_without_client_credentials(self):
+        response = self._introspect({'token': 'foo'}, secret='invalid')
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_should_introspect_single_token(self):
+        data = self._get_response_data(self._post_with_typical_params())
+
+        response = self._introspect({'token': data['access_token']})
+        self.assertEqual(response.status_code, 200)
+
+        result = self._get_response_data(response)
+        self.assertTrue(result['active'])
+        self.assertEqual(result['client_id'], self.client_id)
+
+    def test_should_introspect_batch(self):
+        data = self._get_response_data(self._post_with_typical_params())
+
+        response = self._introspect(json.dumps({'tokens': [
+            data['refresh_token'], 'invalid', self.bob_key]}))
+        self.assertEqual(response.status_code, 200)
+
+        results = self._get_response_data(response)['results']
+        self.assertEqual([r['active'] for r in results], [True, False, False])
@@ -0,0 +1,22 @@
+from ptero_auth.implementation.models import Base
+import sqlalchemy
+import unittest
+
+
+# An in-memory database with every table created.  Each statement sent to it
+# is recorded in self.statements so tests can count round trips.
+class DatabaseTestCase(unittest.TestCase):
+    def setUp(self):
+        self.engine = sqlalchemy.create_engine('sqlite://')
+        Base.metadata.create_all(self.engine)
+
+        self.statements = []
+        sqlalchemy.event.listen(self.engine, 'before_cursor_execute',
+                self._record_statement)
+
+    def _record_statement(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def count_statements(self, prefix):
+        return len([s for s in self.statements
+            if s.lstrip().upper().startswith(prefix)])
@@ -0,0 +1,39 @@
+from ... import rsa_key
+from ptero_auth.implementation import models
+import unittest
+
+
+class EncryptionKeyTest(unittest.TestCase):
+    def setUp(self):
+        models.EncryptionKey.invalidate_parsed_key()
+        self.pem = rsa_key.RESOURCE_PUBLIC_KEY.exportKey()
+
+    def test_import_key_parses_pem(self):
+        key = models.EncryptionKey.import_key('kid', self.pem)
+
+        self.assertEqual(key.n, rsa_key.RESOURCE_PUBLIC_KEY.n)
+
+    def test_import_key_reuses_parsed_key(self):
+        first = models.EncryptionKey.import_key('kid', self.pem)
+        second = models.EncryptionKey.import_key('kid', self.pem)
+
+        self.assertIs(first, second)
+
+    def test_changed_pem_is_parsed_again(self):
+        models.EncryptionKey.import_key('kid', self.pem)
+        other_pem = rsa_key.AUTH_PUBLIC_KEY.exportKey()
+
+        key = models.EncryptionKey.import_key('kid', other_pem)
+
+        self.assertEqual(key.n, rsa_key.AUTH_PUBLIC_KEY.n)
+
+    def test_jot_encrypt_args(self):
+        enc_key = models.EncryptionKey(kid='kid', key=self.pem,
+                alg='RSA1_5', enc='A128CBC-HS256')
+
+        args = enc_key.jot_encrypt_args()
+
+        self.assertEqual(args['kid'], 'kid')
+        self.assertEqual(args['alg'], 'RSA1_5')
+        self.assertEqual(args['enc'], 'A128CBC-HS256')
+        self.assertEqual(args['key'].n, rsa_key.RESOURCE_PUBLIC_KEY.n)
@@ -0,0 +1,92 @@
+from ptero_auth import exceptions
+from ptero_auth.implementation.models import redirect_uris
+import unittest
+
+
+class ValidateRedirectUriRegexTest(unittest.TestCase):
+    VALID_REGEXES = [
+        r'^http://localhost:8008/(resource1|resource2)/?(\?.+)?$',
+        r'^http://localhost:5005/gidget/.+(\?.+)?$',
+        r'^https://example\.com/cb$',
+        r'^https://example\.com/(foo|bar)*$',
+        r'^https://example\.com/(ab){3}(/[^?]*)?$',
+    ]
+
+    INVALID_REGEXES = [
+        None,
+        '',
+        r'http://localhost:8008/cb$',
+        r'^http://localhost:8008/cb',
+        r'^http://localhost:8008/cb\$',
+        r'^http://localhost:8008/(cb$',
+        r'^http://localhost:8008/(a+)+$',
+        r'^http://localhost:8008/(?:.*x)*$',
+        r'^https://good\.com/cb|.*$',
+        r'^http://localhost:8008/(resource1)|(resource2)/?(\?.+)?$',
+        r'^(a|a)*b$',
+        r'^(a|ab)*c$',
+        r'^http://x/(\w|\d)*$',
+        r'^http://x/(.*a){12}$',
+        r'^http://x/(/[^/]+)*$',
+    ]
+
+    def test_accepts_valid_regexes(self):
+        for regex in self.VALID_REGEXES:
+            redirect_uris.validate_redirect_uri_regex(regex)
+
+    def test_rejects_invalid_regexes(self):
+        for regex in self.INVALID_REGEXES:
+            self.assertRaises(exceptions.InvalidClientData,
+                    redirect_uris.validate_redirect_uri_regex, regex)
+
+
+class IsValidRedirectUriTest(unittest.TestCase):
+    REGEX = r'^http://localhost:5005/gidget/.+(\?.+)?$'
+
+    def test_matches_registered_uri(self):
+        self.assertTrue(redirect_uris.is_valid_redirect_uri(1, self.REGEX,
+            'http://localhost:5005/gidget/12345'))
+
+    def test_rejects_other_uri(self):
+        self.assertFalse(redirect_uris.is_valid_redirect_uri(1, self.REGEX,
+            'http://localhost:5005/widget/12345'))
+
+    def test_rejects_overlong_uri(self):
+        self.assertFalse(redirect_uris.is_valid_redirect_uri(1, self.REGEX,
+            'http://localhost:5005/gidget/' + 'x'
+                * redirect_uris.MAX_REDIRECT_URI_LENGTH))
+
+    def test_stored_top_level_alternatives_match_whole_uri(self):
+        regex = r'^https://good\.com/cb|https://good\.com/other$'
+
+        self.assertTrue(redirect_uris.is_valid_redirect_uri(2, regex,
+            'https://good.com/cb'))
+        self.assertTrue(redirect_uris.is_valid_redirect_uri(2, regex,
+            'https://good.com/other'))
+        self.assertFalse(redirect_uris.is_valid_redirect_uri(2, regex,
+            'https://good.com/cb.evil.com'))
+
+    def test_stored_legacy_fixture_form_still_matches(self):
+        regex = r'^http://localhost:8008/(resource1)|(resource2)/?(\?.+)?$'
+
+        self.assertTrue(redirect_uris.is_valid_redirect_uri(5, regex,
+            'http://localhost:8008/resource1'))
+
+    def test_stored_invalid_regex_matches_nothing(self):
+        self.assertFalse(redirect_uris.is_valid_redirect_uri(3,
+            r'^http://localhost:8008/(cb$', 'http://localhost:8008/(cb'))
+
+    def test_stored_ambiguous_regex_matches_nothing(self):
+        self.assertFalse(redirect_uris.is_valid_redirect_uri(4,
+            r'^(a|a)*b$', 'a' * 24 + 'c'))
+        self.assertFalse(redirect_uris.is_valid_redirect_uri(4,
+            r'^(a|a)*b$', 'ab'))
+
+    def test_reuses_compiled_pattern(self):
+        redirect_uris.is_valid_redirect_uri(1, self.REGEX,
+                'http://localhost:5005/gidget/1')
+        first = redirect_uris._get_pattern(1, self.REGEX)
+        redirect_uris.is_valid_redirect_uri(1, self.REGEX,
+                'http://localhost:5005/gidget/2')
+
+        self.assertIs(redirect_uris._get_pattern(1, self.REGEX), first)
@@ -0,0 +1,57 @@
+from .. import DatabaseTestCase
+from ptero_auth.implementation import models
+from ptero_auth.implementation.cache import LRUCache
+import sqlalchemy
+
+
+class UserCreateOrGetTest(DatabaseTestCase):
+    def setUp(self):
+        super(UserCreateOrGetTest, self).setUp()
+        self.Session = sqlalchemy.orm.sessionmaker(bind=self.engine)
+        self.cache = LRUCache(10)
+
+    def test_creates_user_on_first_sight(self):
+        session = self.Session()
+        user = models.User.create_or_get(session, 'alice', cache=self.cache)
+
+        self.assertIsNotNone(user.user_pk)
+        self.assertEqual(session.query(models.User).count(), 1)
+
+    def test_returns_existing_user(self):
+        first = models.User.create_or_get(self.Session(), 'alice')
+        second = models.User.create_or_get(self.Session(), 'alice')
+
+        self.assertEqual(first.user_pk, second.user_pk)
+        self.assertEqual(first.oidc_sub, second.oidc_sub)
+
+    def test_does_not_insert_known_user(self):
+        models.User.create_or_get(self.Session(), 'alice')
+        del self.statements[:]
+
+        models.User.create_or_get(self.Session(), 'alice')
+
+        self.assertFalse([s for s in self.statements if 'INSERT' in s])
+
+    def test_cached_user_needs_no_queries(self):
+        first = models.User.create_or_get(self.Session(), 'alice',
+                cache=self.cache)
+        del self.statements[:]
+
+        session = self.Session()
+        user = models.User.create_or_get(session, 'alice', cache=self.cache)
+
+        self.assertEqual(self.statements, [])
+        self.assertEqual(user.user_pk, first.user_pk)
+        self.assertEqual(user.oidc_sub, first.oidc_sub)
+        self.assertIn(user, session)
+
+    def test_cached_user_can_be_referenced(self):
+        models.User.create_or_get(self.Session(), 'alice', cache=self.cache)
+
+        session = self.Session()
+        user = models.User.create_or_get(session, 'alice', cache=self.cache)
+        session.add(models.Key(user=user))
+        session.commit()
+
+        self.assertEqual(session.query(models.User).count(), 1)
+        self.assertEqual(session.query(models.Key).one().user_pk, user.user_pk)
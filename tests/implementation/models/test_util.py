@@ -0,0 +1,34 @@
+from ptero_auth.implementation import models
+from ptero_auth.implementation.models.util import insert_ignore
+import sqlalchemy
+import unittest
+
+
+class InsertIgnoreTest(unittest.TestCase):
+    def setUp(self):
+        engine = sqlalchemy.create_engine('sqlite://')
+        models.Base.metadata.create_all(engine)
+        self.session = sqlalchemy.orm.sessionmaker(bind=engine)()
+
+    def scope_values(self):
+        return sorted(s.value for s in self.session.query(models.Scope))
+
+    def test_inserts_all_rows(self):
+        insert_ignore(self.session, models.Scope.__table__,
+                [{'value': 'foo'}, {'value': 'bar'}])
+
+        self.assertEqual(self.scope_values(), ['bar', 'foo'])
+
+    def test_skips_existing_rows(self):
+        self.session.add(models.Scope(value='foo'))
+        self.session.commit()
+
+        insert_ignore(self.session, models.Scope.__table__,
+                [{'value': 'foo'}, {'value': 'bar'}])
+
+        self.assertEqual(self.scope_values(), ['bar', 'foo'])
+
+    def test_does_nothing_without_rows(self):
+        insert_ignore(self.session, models.Scope.__table__, [])
+
+        self.assertEqual(self.scope_values(), [])
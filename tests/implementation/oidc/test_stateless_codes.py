@@ -0,0 +1,74 @@
+from ... import rsa_key
+from ..test_backend import BackendTestBase
+from ptero_auth.implementation import models
+from ptero_auth.implementation.oidc.stateless_codes import \
+        AuthorizationCodeCodec
+from ptero_auth.implementation.oidc.validator import OIDCRequestValidator
+import unittest
+
+
+class AuthorizationCodeCodecTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000000000.0
+        self.codec = AuthorizationCodeCodec(rsa_key.AUTH_PRIVATE_KEY,
+                'testing-key', lifetime=600, clock=lambda: self.now)
+
+    def encode(self):
+        return self.codec.encode(user_pk=3, client_pk=7,
+                scopes=['openid', 'bar'],
+                redirect_uri='http://localhost:8008/resource1/asdf')
+
+    def test_round_trip(self):
+        claims = self.codec.decode(self.encode())
+
+        self.assertEqual(claims['user_pk'], 3)
+        self.assertEqual(claims['client_pk'], 7)
+        self.assertEqual(claims['scopes'], ['openid', 'bar'])
+        self.assertEqual(claims['redirect_uri'],
+                'http://localhost:8008/resource1/asdf')
+
+    def test_expired_code_is_rejected(self):
+        code = self.encode()
+        self.now += 600
+
+        self.assertIsNone(self.codec.decode(code))
+
+    def test_garbage_is_rejected(self):
+        self.assertIsNone(self.codec.decode('not-a-code'))
+
+
+class FakeRequest(object):
+    def __init__(self, redirect_uri):
+        self.redirect_uri = redirect_uri
+
+
+class RedeemStatelessCodeTest(BackendTestBase):
+    def setUp(self):
+        super(RedeemStatelessCodeTest, self).setUp()
+        self.user = models.User(name='alice')
+        self.client = models.ConfidentialClient(client_name='c',
+                created_by=self.user, redirect_uri_regex='^x$',
+                default_redirect_uri='x')
+        self.Session.add(self.client)
+        self.Session.commit()
+
+    def create_validator(self):
+        # Each validator stands in for a separate worker process.
+        return OIDCRequestValidator(self.Session,
+                code_codec=AuthorizationCodeCodec(rsa_key.AUTH_PRIVATE_KEY,
+                    'testing-key'))
+
+    def redeem(self, validator, code):
+        result = validator.validate_code(self.client.client_id, code,
+                self.client, FakeRequest('x'))
+        self.Session.commit()
+        return result
+
+    def test_code_is_single_use_across_workers(self):
+        code = self.create_validator().code_codec.encode(self.user.user_pk,
+                self.client.client_pk, ['openid'], 'x')
+
+        self.assertTrue(self.redeem(self.create_validator(), code))
+        self.assertFalse(self.redeem(self.create_validator(), code))
+        self.assertEqual(self.Session.query(
+            models.RedeemedAuthorizationCode).count(), 1)
@@ -0,0 +1,150 @@
+from .. import DatabaseTestCase
+from ... import rsa_key
+from Crypto.PublicKey import RSA
+from ptero_auth.implementation import models
+from ptero_auth.implementation.backend import Backend
+from ptero_auth.implementation.cache import LRUCache
+from ptero_auth.implementation.discovery import Discovery
+from ptero_auth.implementation.keyring import Keyring, fingerprint
+from ptero_auth.implementation.oidc.token_handler import OIDCTokenHandler
+from ptero_auth.verifier import JwksClient, TokenVerifier
+import base64
+import jot
+import json
+import os
+import shutil
+import sqlalchemy
+import tempfile
+import time
+import unittest
+
+
+class FakeResponse(object):
+    def __init__(self, body):
+        self.body = body
+
+    def read(self):
+        return self.body
+
+    def info(self):
+        return {}
+
+
+class FakeRequest(object):
+    def __init__(self, scopes):
+        self.scopes = scopes
+
+
+class AudienceCacheTest(DatabaseTestCase):
+    CLIENT_DATA = {
+        'name': 'widget',
+        'redirect_uri_regex': r'^http://localhost/widget$',
+        'default_redirect_uri': 'http://localhost/widget',
+        'allowed_scopes': ['foo', 'bar'],
+        'default_scopes': ['foo'],
+        'audience_for': 'bar',
+    }
+
+    def setUp(self):
+        super(AudienceCacheTest, self).setUp()
+        self.Session = sqlalchemy.orm.scoped_session(
+                sqlalchemy.orm.sessionmaker(bind=self.engine))
+
+        self.audience_cache = LRUCache(10)
+        self.backend = Backend(self.Session, oidc_server=None,
+                user_info_provider=None, admin_role='pteroadmin',
+                audience_cache=self.audience_cache)
+        self.handler = OIDCTokenHandler(None, self.Session, None,
+                audience_cache=self.audience_cache)
+
+        self.user = models.User(name='alice')
+        self.Session.add(self.user)
+        self.Session.commit()
+
+    def tearDown(self):
+        self.backend.cleanup()
+
+    def register_client(self):
+        return self.backend.register_client(self.user,
+                self.CLIENT_DATA)['client_id']
+
+    def get_aud(self, *scopes):
+        self.Session.remove()
+        del self.statements[:]
+        return [a.client_id for a in
+                self.handler.get_aud(FakeRequest(list(scopes)))]
+
+    def test_cached_audience_needs_no_queries(self):
+        client_id = self.register_client()
+        self.assertEqual(self.get_aud('openid', 'bar'), [client_id])
+
+        self.assertEqual(self.get_aud('openid', 'bar'), [client_id])
+        self.assertEqual(self.statements, [])
+
+    def test_missing_audience_is_cached(self):
+        self.assertEqual(self.get_aud('foo'), [])
+
+        self.assertEqual(self.get_aud('foo'), [])
+        self.assertEqual(self.statements, [])
+
+    def test_register_client_invalidates_cache(self):
+        self.assertEqual(self.get_aud('bar'), [])
+
+        client_id = self.register_client()
+
+        self.assertEqual(self.get_aud('bar'), [client_id])
+
+
+class SigningAfterRotationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.now = time.time()
+        self.new_key = RSA.generate(1024)
+
+        self.write_key('active.pem', rsa_key.AUTH_PRIVATE_KEY)
+        self.keyring = Keyring(directory=self.directory, reload_interval=0,
+                clock=lambda: self.now)
+        self.discovery = Discovery(self.keyring, 'https://auth.example')
+        self.handler = OIDCTokenHandler(None, None, None,
+                signature_alg='RS256', keyring=self.keyring)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_key(self, filename, key):
+        with open(os.path.join(self.directory, filename), 'w') as f:
+            f.write(key.exportKey())
+
+    def rotate(self):
+        os.rename(os.path.join(self.directory, 'active.pem'),
+                os.path.join(self.directory, 'retiring.pem'))
+        self.write_key('active.pem', self.new_key)
+        self.now += 1
+
+    def verifier(self):
+        body = self.discovery.jwks.body
+        return TokenVerifier(JwksClient('https://auth.example/v1/jwks',
+            urlopen=lambda request, timeout: FakeResponse(body)), None)
+
+    def sign(self):
+        return self.handler._sign(jot.Token(claims={
+            'sub': 'bob', 'exp': int(time.time()) + 60})).compact_serialize()
+
+    def get_kid(self, token):
+        header = str(token.split('.')[0])
+        return json.loads(base64.urlsafe_b64decode(
+            header + '=' * (-len(header) % 4)))['kid']
+
+    def test_token_signed_after_rotation_uses_new_key(self):
+        self.rotate()
+        token = self.sign()
+
+        self.assertEqual(self.get_kid(token),
+                fingerprint(self.new_key.publickey()))
+        self.assertEqual(self.verifier().verify(token)['sub'], 'bob')
+
+    def test_token_signed_before_rotation_still_verifies(self):
+        token = self.sign()
+        self.rotate()
+
+        self.assertEqual(self.verifier().verify(token)['sub'], 'bob')
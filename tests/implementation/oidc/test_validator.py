@@ -0,0 +1,71 @@
+from ptero_auth.implementation import models
+from ptero_auth.implementation.client_registry import ClientRegistry
+from ptero_auth.implementation.negative_cache import NegativeCache
+from ptero_auth.implementation.oidc.validator import OIDCRequestValidator
+from ..test_backend import BackendTestBase
+
+
+class FakeRequest(object):
+    def __init__(self, scopes):
+        self.client = None
+        self.scopes = scopes
+
+
+class UnknownClientTest(BackendTestBase):
+    def setUp(self):
+        super(UnknownClientTest, self).setUp()
+        self.unknown_clients = NegativeCache()
+        self.validator = OIDCRequestValidator(self.Session,
+                unknown_clients=self.unknown_clients,
+                unknown_audiences=NegativeCache())
+
+    def validate(self, client_id):
+        request = FakeRequest(['openid', 'nope'])
+        self.validator.validate_client_id(client_id, request)
+        request.client.is_valid_scope_set(set(request.scopes))
+        request.client.is_valid_redirect_uri('http://localhost/')
+        request.client.get_default_redirect_uri()
+        return request.client
+
+    def test_unknown_client_is_a_public_client(self):
+        self.assertIsInstance(self.validate('ci_unknown'), models.PublicClient)
+
+    def test_missing_audience_is_looked_up_once_per_request(self):
+        self.validate('ci_unknown')
+
+        self.assertEqual(self.count_statements('SELECT'), 2)
+
+    def test_repeated_misses_need_no_queries(self):
+        self.validate('ci_unknown')
+        del self.statements[:]
+
+        self.validate('ci_unknown')
+
+        self.assertEqual(self.statements, [])
+        self.assertEqual(self.unknown_clients.stats['top'][0]['lookups'], 2)
+
+
+class UnknownClientWithRegistryTest(BackendTestBase):
+    def setUp(self):
+        super(UnknownClientWithRegistryTest, self).setUp()
+        self.now = 0
+        self.unknown_clients = NegativeCache()
+        self.validator = OIDCRequestValidator(self.Session,
+                client_registry=ClientRegistry(clock=lambda: self.now),
+                unknown_clients=self.unknown_clients)
+
+    def validate(self, client_id):
+        request = FakeRequest(['openid'])
+        self.validator.validate_client_id(client_id, request)
+        return request.client
+
+    def test_throttled_miss_is_not_remembered(self):
+        self.validate('ci_first')
+        self.validate('ci_unknown')
+
+        self.assertNotIn('ci_unknown', self.unknown_clients)
+
+        self.now += 1
+        self.validate('ci_unknown')
+
+        self.assertIn('ci_unknown', self.unknown_clients)
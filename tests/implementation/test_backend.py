@@ -0,0 +1,213 @@
+from . import DatabaseTestCase
+from ptero_auth import exceptions
+from ptero_auth.implementation import models
+from ptero_auth.implementation.backend import Backend
+from ptero_auth.implementation.cache import LRUCache
+from ptero_auth.implementation.key_usage import KeyUsageTracker
+import sqlalchemy
+
+
+class BackendTestBase(DatabaseTestCase):
+    def setUp(self):
+        super(BackendTestBase, self).setUp()
+        self.Session = sqlalchemy.orm.scoped_session(
+                sqlalchemy.orm.sessionmaker(bind=self.engine))
+
+        self.backend = Backend(self.Session, oidc_server=None,
+                user_info_provider=None, admin_role='pteroadmin')
+
+    def tearDown(self):
+        self.backend.cleanup()
+
+
+class CreateOrGetScopesTest(BackendTestBase):
+    def test_creates_missing_scopes(self):
+        result = self.backend._create_or_get_scopes(['foo', 'bar'])
+
+        self.assertEqual(sorted(result), ['bar', 'foo'])
+        self.assertEqual(result['foo'].value, 'foo')
+
+    def test_reuses_existing_scopes(self):
+        existing = models.Scope(value='foo')
+        self.Session.add(existing)
+        self.Session.commit()
+
+        result = self.backend._create_or_get_scopes(['foo', 'bar'])
+
+        self.assertEqual(result['foo'].scope_pk, existing.scope_pk)
+        self.assertEqual(self.Session.query(models.Scope).count(), 2)
+
+    def test_uses_constant_number_of_statements(self):
+        self.backend._create_or_get_scopes(['s%d' % i for i in range(30)])
+
+        self.assertEqual(self.count_statements('INSERT'), 1)
+        self.assertEqual(self.count_statements('SELECT'), 2)
+
+
+class RegisterClientTest(BackendTestBase):
+    CLIENT_DATA = {
+        'name': 'widget maker v1.1',
+        'redirect_uri_regex': r'^http://localhost:8008/resource1/?(\?.+)?$',
+        'default_redirect_uri': 'http://localhost:8008/resource1/12345',
+        'allowed_scopes': ['foo', 'bar', 'baz'],
+        'default_scopes': ['bar', 'baz'],
+        'audience_for': 'bar',
+    }
+
+    def setUp(self):
+        super(RegisterClientTest, self).setUp()
+        self.user = models.User(name='alice')
+        self.Session.add(self.user)
+        self.Session.commit()
+
+        self.commits = []
+        sqlalchemy.event.listen(self.Session(), 'after_commit',
+                self._record_commit)
+
+    def _record_commit(self, session):
+        self.commits.append(session)
+
+    def test_commits_once(self):
+        self.backend.register_client(self.user, self.CLIENT_DATA)
+
+        self.assertEqual(len(self.commits), 1)
+
+    def test_returns_client_data(self):
+        result = self.backend.register_client(self.user, self.CLIENT_DATA)
+
+        self.assertEqual(result['allowed_scopes'], ['bar', 'baz', 'foo'])
+        self.assertEqual(result['audience_for'], 'bar')
+        self.assertIn('client_secret', result)
+
+
+class ListClientsTest(BackendTestBase):
+    def setUp(self):
+        super(ListClientsTest, self).setUp()
+        self.user = models.User(name='alice')
+        self.Session.add(self.user)
+        self.Session.commit()
+
+        for i in range(5):
+            data = dict(RegisterClientTest.CLIENT_DATA,
+                    name='client %d' % (i % 2), audience_for='aud%d' % i)
+            self.backend.register_client(self.user, data)
+
+    def test_pages_cover_all_clients_once(self):
+        first, cursor = self.backend.list_clients(2)
+        second, cursor = self.backend.list_clients(2, after=cursor)
+        third, cursor = self.backend.list_clients(2, after=cursor)
+
+        self.assertEqual(len(first + second + third), 5)
+        self.assertEqual(len(set(c['client_id']
+            for c in first + second + third)), 5)
+        self.assertIsNone(cursor)
+
+    def test_filters_by_name_and_active(self):
+        clients, _ = self.backend.list_clients(10, name='client 1')
+        self.assertEqual(len(clients), 2)
+
+        clients, _ = self.backend.list_clients(10, active=False)
+        self.assertEqual(clients, [])
+
+    def test_uses_constant_number_of_queries(self):
+        self.Session.remove()
+        del self.statements[:]
+
+        self.backend.list_clients(10)
+
+        self.assertEqual(self.count_statements('SELECT'), 4)
+
+    def test_rejects_invalid_cursor(self):
+        with self.assertRaises(exceptions.InvalidPaginationParameter):
+            self.backend.list_clients(10, after='garbage')
+
+
+class GetClientTest(BackendTestBase):
+    def setUp(self):
+        super(GetClientTest, self).setUp()
+        self.backend.client_cache = LRUCache(10)
+
+        self.user = models.User(name='alice')
+        self.Session.add(self.user)
+        self.Session.commit()
+
+        self.client_id = self.backend.register_client(self.user,
+                RegisterClientTest.CLIENT_DATA)['client_id']
+
+    def test_returns_client_data(self):
+        data = self.backend.get_client(self.client_id)
+
+        self.assertEqual(data['allowed_scopes'], ['bar', 'baz', 'foo'])
+        self.assertEqual(data['created_by'], 'alice')
+
+    def test_cached_client_needs_no_queries(self):
+        self.backend.get_client(self.client_id)
+        self.Session.remove()
+        del self.statements[:]
+
+        self.assertEqual(self.backend.get_default_scopes(self.client_id),
+                ['bar', 'baz'])
+        self.assertEqual(self.statements, [])
+
+    def test_unknown_client(self):
+        self.assertIsNone(self.backend.get_client('nonsense'))
+        self.assertEqual(self.backend.get_default_scopes('nonsense'), [])
+
+    def test_deactivation_invalidates_cache(self):
+        self.backend.get_client(self.client_id)
+        self.backend.deactivate_client(self.user, self.client_id)
+
+        self.assertFalse(self.backend.get_client(self.client_id)['active'])
+
+    def test_deactivation_invalidates_audience_cache(self):
+        self.backend.audience_cache = LRUCache(10)
+        self.backend.audience_cache.set('bar', self.client_id)
+
+        self.backend.deactivate_client(self.user, self.client_id)
+
+        self.assertEqual(len(self.backend.audience_cache), 0)
+
+
+class GetUserFromApiKeyTest(BackendTestBase):
+    def setUp(self):
+        super(GetUserFromApiKeyTest, self).setUp()
+        self.backend.api_key_cache = LRUCache(10)
+        self.backend.key_usage = KeyUsageTracker()
+
+        self.user = models.User(name='alice')
+        self.key = models.Key(user=self.user)
+        self.Session.add(self.key)
+        self.Session.commit()
+        self.api_key = self.key.key
+
+    def test_returns_key_owner(self):
+        user = self.backend.get_user_from_api_key(self.api_key)
+
+        self.assertEqual(user.name, 'alice')
+
+    def test_returns_nothing_for_unknown_key(self):
+        self.assertIsNone(self.backend.get_user_from_api_key('nonsense'))
+
+    def test_cached_key_needs_no_queries(self):
+        self.backend.get_user_from_api_key(self.api_key)
+        self.Session.remove()
+        del self.statements[:]
+
+        user = self.backend.get_user_from_api_key(self.api_key)
+
+        self.assertEqual(user.name, 'alice')
+        self.assertEqual(self.statements, [])
+
+    def test_deactivated_key_is_rejected(self):
+        self.backend.get_user_from_api_key(self.api_key)
+        self.backend.deactivate_api_key(self.key)
+
+        self.assertIsNone(self.backend.get_user_from_api_key(self.api_key))
+
+    def test_records_usage(self):
+        self.backend.get_user_from_api_key(self.api_key)
+        self.backend.get_user_from_api_key(self.api_key)
+        self.backend.key_usage.flush(self.engine)
+
+        self.Session.expire_all()
+        self.assertEqual(self.Session.query(models.Key).one().usage_count, 2)
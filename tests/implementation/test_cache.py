@@ -0,0 +1,62 @@
+from ptero_auth.implementation.cache import LRUCache
+import unittest
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class LRUCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = LRUCache(2, ttl=10, clock=self.clock)
+
+    def test_get_returns_stored_value(self):
+        self.cache.set('a', 1)
+        self.assertEqual(self.cache.get('a'), 1)
+
+    def test_get_returns_default_when_missing(self):
+        self.assertEqual(self.cache.get('a', 'default'), 'default')
+
+    def test_entries_expire_after_ttl(self):
+        self.cache.set('a', 1)
+        self.clock.now += 10
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_per_entry_ttl_overrides_default(self):
+        self.cache.set('a', 1, ttl=100)
+        self.clock.now += 50
+        self.assertEqual(self.cache.get('a'), 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('c'), 3)
+        self.assertEqual(self.cache.stats['evictions'], 1)
+
+    def test_invalidate_removes_entry(self):
+        self.cache.set('a', 1)
+        self.cache.invalidate('a')
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_counts_hits_and_misses(self):
+        self.cache.set('a', 1)
+        self.cache.get('a')
+        self.cache.get('b')
+
+        self.assertEqual(self.cache.stats['hits'], 1)
+        self.assertEqual(self.cache.stats['misses'], 1)
+
+    def test_zero_size_cache_stores_nothing(self):
+        cache = LRUCache(0)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
@@ -0,0 +1,132 @@
+from ptero_auth.implementation import models
+from ptero_auth.implementation.client_registry import ClientRegistry
+from .test_backend import BackendTestBase, RegisterClientTest
+
+
+class ClientRegistryTest(BackendTestBase):
+    def setUp(self):
+        super(ClientRegistryTest, self).setUp()
+        self.now = 0
+        self.registry = ClientRegistry(refresh_interval=5,
+                clock=lambda: self.now)
+
+        self.user = models.User(name='alice')
+        self.Session.add(self.user)
+        self.Session.commit()
+
+        self.client_id = self.register(audience_for='bar')
+
+    def register(self, **kwargs):
+        data = dict(RegisterClientTest.CLIENT_DATA)
+        data.pop('audience_for')
+        data.update(kwargs)
+        return self.backend.register_client(self.user, data)['client_id']
+
+    def get_client(self, client_id):
+        return self.registry.get_client(self.Session, client_id)
+
+    def test_get_client(self):
+        client = self.get_client(self.client_id)
+
+        self.assertEqual(client.client_id, self.client_id)
+        self.assertTrue(client.is_valid_scope_set(set(['foo', 'bar'])))
+        self.assertFalse(client.is_valid_scope_set(set(['qux'])))
+        self.assertTrue(client.is_valid_grant_type('refresh_token'))
+        self.assertTrue(client.is_valid_redirect_uri(
+            'http://localhost:8008/resource1?a=b'))
+
+    def test_steady_state_needs_no_queries(self):
+        self.get_client(self.client_id)
+        del self.statements[:]
+
+        self.get_client(self.client_id)
+        self.registry.get_audience_client(self.Session, 'bar')
+
+        self.assertEqual(self.statements, [])
+
+    def test_audience_client(self):
+        client = self.registry.get_audience_client(self.Session, 'bar')
+
+        self.assertEqual(client.client_id, self.client_id)
+
+    def test_new_client_is_loaded_incrementally(self):
+        self.get_client(self.client_id)
+        other_id = self.register(name='other')
+        self.now += 1
+
+        self.assertEqual(self.get_client(other_id).client_id, other_id)
+        self.assertEqual(self.registry.stats['full_loads'], 1)
+        self.assertEqual(self.registry.stats['incremental_loads'], 1)
+        self.assertEqual(self.registry.stats['clients'], 2)
+
+    def test_deactivation_is_picked_up_after_interval(self):
+        self.assertTrue(self.get_client(self.client_id).active)
+        self.backend.deactivate_client(self.user, self.client_id)
+
+        self.assertTrue(self.get_client(self.client_id).active)
+        self.now += 5
+        self.assertFalse(self.get_client(self.client_id).active)
+
+    def test_misses_are_rate_limited(self):
+        self.get_client(self.client_id)
+        del self.statements[:]
+
+        self.assertIsNone(self.get_client('ci_unknown'))
+        self.assertIsNone(self.get_client('ci_other'))
+        self.assertEqual(len(self.statements), 0)
+
+        self.now += 1
+        self.get_client('ci_unknown')
+        self.assertEqual(len(self.statements), 1)
+
+    def test_throttled_miss_is_not_checked(self):
+        self.get_client(self.client_id)
+
+        self.assertEqual(self.registry.find_client(self.Session, 'ci_unknown'),
+                (None, False))
+
+        self.now += 1
+        self.assertEqual(self.registry.find_client(self.Session, 'ci_unknown'),
+                (None, True))
+
+    def commit_change(self, client_id, change_pk):
+        client = self.Session.query(models.ConfidentialClient
+                ).filter_by(client_id=client_id).one()
+        self.Session.add(models.ClientChange(change_pk=change_pk,
+            client=client))
+        self.Session.commit()
+
+    def test_changes_committed_out_of_order_are_loaded(self):
+        self.get_client(self.client_id)
+        self.commit_change(self.client_id, 10)
+        self.now += 5
+        self.get_client(self.client_id)
+        self.assertEqual(self.registry.stats['version'], 10)
+
+        # A change with a lower pk than the last one seen commits late.
+        late_id = self.register(name='late')
+        self.Session.query(models.ClientChange).filter_by(change_pk=11
+                ).update({'change_pk': 5})
+        self.Session.commit()
+        self.now += 5
+
+        self.assertEqual(self.get_client(late_id).client_id, late_id)
+        self.assertEqual(self.registry.stats['full_loads'], 1)
+
+    def test_periodic_full_reload(self):
+        self.registry.lookback = 0
+        self.get_client(self.client_id)
+        self.commit_change(self.client_id, 10)
+        self.now += 5
+        self.get_client(self.client_id)
+
+        late_id = self.register(name='late')
+        self.Session.query(models.ClientChange).filter_by(change_pk=11
+                ).update({'change_pk': 5})
+        self.Session.commit()
+        self.now += 5
+        self.assertIsNone(self.get_client(late_id))
+
+        self.now = self.registry.full_reload_interval
+        self.assertEqual(self.get_client(late_id).client_id, late_id)
+        self.assertEqual(self.registry.stats['full_loads'], 2)
@@ -0,0 +1,55 @@
+from ptero_auth.implementation.discovery import Discovery, ISSUER
+from ptero_auth.implementation.keyring import Keyring
+from .. import rsa_key
+import json
+import unittest
+
+
+class DiscoveryTest(unittest.TestCase):
+    def setUp(self):
+        self.keyring = _keyring('kid1')
+        self.discovery = Discovery(self.keyring,
+                base_url='http://localhost:8000/')
+
+    def test_jwks_contains_only_public_parameters(self):
+        keys = json.loads(self.discovery.jwks.body)['keys']
+
+        self.assertEqual(len(keys), 1)
+        self.assertEqual(keys[0]['kid'], 'kid1')
+        self.assertEqual(keys[0]['kty'], 'RSA')
+        self.assertEqual(keys[0]['e'], 'AQAB')
+        self.assertEqual(set(keys[0]),
+                set(['kty', 'use', 'alg', 'kid', 'n', 'e']))
+
+    def test_openid_configuration_urls(self):
+        config = json.loads(self.discovery.openid_configuration.body)
+
+        self.assertEqual(config['issuer'], ISSUER)
+        self.assertEqual(config['jwks_uri'], 'http://localhost:8000/v1/jwks')
+        self.assertEqual(config['token_endpoint'],
+                'http://localhost:8000/v1/tokens')
+
+    def test_etag_depends_on_keys(self):
+        other = Discovery(_keyring('kid2'), base_url='http://localhost:8000/')
+
+        self.assertNotEqual(self.discovery.jwks.etag, other.jwks.etag)
+        self.assertEqual(self.discovery.jwks.etag, Discovery(_keyring('kid1'),
+            base_url='http://localhost:8000/').jwks.etag)
+
+    def test_jwks_rebuilt_when_keyring_changes(self):
+        before = self.discovery.jwks
+        self.assertIs(before, self.discovery.jwks)
+
+        self.keyring._key_set = _keyring('kid2').current()._replace(version=2)
+
+        after = self.discovery.jwks
+        self.assertNotEqual(before.etag, after.etag)
+        self.assertEqual(json.loads(after.body)['keys'][0]['kid'], 'kid2')
+
+
+def _keyring(kid):
+    return Keyring.from_signature_key({
+        'signature_alg': 'RS256',
+        'signature_key': rsa_key.AUTH_PRIVATE_KEY,
+        'signature_kid': kid,
+    })
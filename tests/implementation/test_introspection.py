@@ -0,0 +1,161 @@
+from ptero_auth.implementation import models
+from ptero_auth.implementation.cache import LRUCache
+from ptero_auth.implementation.introspection import TokenIntrospector
+from ptero_auth.implementation.keyring import Keyring
+from .. import rsa_key
+from .test_backend import BackendTestBase
+import sqlalchemy
+import unittest
+
+
+class TokenIntrospectorTest(unittest.TestCase):
+    def setUp(self):
+        engine = sqlalchemy.create_engine('sqlite://')
+        models.Base.metadata.create_all(engine)
+        self.session = sqlalchemy.orm.sessionmaker(bind=engine)()
+
+        self.user = models.User(name='bob')
+        self.key = models.Key(user=self.user)
+        self.client = models.ConfidentialClient(client_name='widget',
+                created_by=self.user, redirect_uri_regex='^x$',
+                default_redirect_uri='x')
+        self.refresh_token = models.RefreshToken(
+                token=models.RefreshToken.digest('rt-secret'),
+                user=self.user, client=self.client, active=True,
+                scopes=[models.Scope(value='foo')])
+        self.session.add_all([self.key, self.refresh_token])
+        self.session.commit()
+
+        self.now = 1000
+        self.cache = LRUCache(100, clock=lambda: self.now)
+        self.introspector = TokenIntrospector(
+                Keyring.from_signature_key({
+                    'signature_alg': 'RS256',
+                    'signature_key': rsa_key.AUTH_PRIVATE_KEY,
+                    'signature_kid': 'testing-key',
+                }),
+                cache=self.cache, ttl=30, negative_ttl=5,
+                resource_servers=['resource-server'],
+                clock=lambda: self.now)
+        self.client_id = self.client.client_id
+
+    def _introspect(self, tokens, client_id=None):
+        return self.introspector.introspect(self.session,
+                client_id or self.client_id, tokens)
+
+    def _claims(self, **claims):
+        result = {'iss': self.introspector.issuer, 'exp': self.now + 60}
+        result.update(claims)
+        return result
+
+    def test_batch_preserves_order(self):
+        results = self._introspect(['unknown', 'rt-secret', 'unknown'])
+
+        self.assertEqual([r['active'] for r in results], [False, True, False])
+        self.assertEqual(results[1]['token_type'], 'refresh_token')
+        self.assertEqual(results[1]['scope'], 'foo')
+        self.assertEqual(results[1]['client_id'], self.client_id)
+
+    def test_inactive_refresh_token(self):
+        self.refresh_token.active = False
+        self.session.commit()
+
+        result, = self._introspect(['rt-secret'])
+        self.assertFalse(result['active'])
+
+    def test_other_clients_refresh_token_is_inactive(self):
+        result, = self._introspect(['rt-secret'], client_id='other-client')
+
+        self.assertEqual(result, {'active': False})
+
+    def test_resource_server_sees_every_token(self):
+        result, = self._introspect(['rt-secret'], client_id='resource-server')
+
+        self.assertTrue(result['active'])
+        self.assertEqual(result['client_id'], self.client_id)
+
+    def test_api_key_is_visible_to_resource_server(self):
+        result, = self._introspect([self.key.key], client_id='resource-server')
+
+        self.assertTrue(result['active'])
+        self.assertEqual(result['token_type'], 'api_key')
+        self.assertEqual(result['username'], 'bob')
+
+    def test_api_key_is_inactive_for_other_clients(self):
+        result, = self._introspect([self.key.key])
+
+        self.assertEqual(result, {'active': False})
+
+    def test_resource_server_results_are_cached_apart(self):
+        self._introspect([self.key.key])
+        result, = self._introspect([self.key.key], client_id='resource-server')
+
+        self.assertTrue(result['active'])
+
+    def test_access_token_is_visible_to_its_audience(self):
+        self.introspector._verify = lambda token: self._claims(
+                scope='foo', azp='other-client', aud=[self.client_id])
+
+        result, = self._introspect(['a.b.c'])
+        self.assertTrue(result['active'])
+        self.assertEqual(result['token_type'], 'access_token')
+
+        result, = self._introspect(['a.b.c'], client_id='third-client')
+        self.assertEqual(result, {'active': False})
+
+    def test_id_token_is_inactive(self):
+        self.introspector._verify = lambda token: self._claims(
+                azp=self.client_id, aud=self.client_id)
+
+        result, = self._introspect(['a.b.c'])
+        self.assertEqual(result, {'active': False})
+
+    def test_cache_is_keyed_by_digest(self):
+        self._introspect(['rt-secret'])
+
+        self.assertIsNone(self.cache.get(('rt-secret', False)))
+        self.assertTrue(self.cache.get(
+            (models.RefreshToken.digest('rt-secret'), False))['active'])
+
+    def test_negative_results_expire_sooner(self):
+        self._introspect(['unknown', 'rt-secret'])
+        self.now += 10
+
+        self.assertIsNone(self.cache.get(
+            (models.RefreshToken.digest('unknown'), False)))
+        self.assertIsNotNone(self.cache.get(
+            (models.RefreshToken.digest('rt-secret'), False)))
+
+    def test_invalidate(self):
+        self._introspect(['rt-secret'])
+        self._introspect(['rt-secret'], client_id='resource-server')
+        self.introspector.invalidate('rt-secret')
+
+        self.assertEqual(len(self.cache), 0)
+
+    def test_malformed_jwt_is_inactive(self):
+        result, = self._introspect(['a.b.c'])
+
+        self.assertFalse(result['active'])
+
+
+class DeactivateApiKeyTest(BackendTestBase):
+    def setUp(self):
+        super(DeactivateApiKeyTest, self).setUp()
+        self.backend.introspector = TokenIntrospector(None,
+                cache=LRUCache(10), resource_servers=['resource-server'])
+        self.client = models.ConfidentialClient(client_id='resource-server')
+
+        self.key = models.Key(user=models.User(name='alice'))
+        self.Session.add(self.key)
+        self.Session.commit()
+
+    def introspect(self):
+        return self.backend.introspect_tokens(self.client, [self.key.key])[0]
+
+    def test_deactivation_invalidates_cached_result(self):
+        self.assertTrue(self.introspect()['active'])
+
+        self.backend.deactivate_api_key(self.key)
+
+        self.assertFalse(self.introspect()['active'])
@@ -0,0 +1,48 @@
+from ptero_auth.implementation import models
+from ptero_auth.implementation.cache import LRUCache
+from ptero_auth.implementation.key_revocations import KeyRevocations
+from .test_backend import BackendTestBase
+import datetime
+import time
+
+
+class KeyRevocationsTest(BackendTestBase):
+    def setUp(self):
+        super(KeyRevocationsTest, self).setUp()
+        self.now = time.time()
+        self.backend.api_key_cache = LRUCache(10)
+        self.backend.key_revocations = KeyRevocations(
+                [self.backend.api_key_cache.invalidate], check_interval=5,
+                clock=lambda: self.now)
+
+        self.key = models.Key(user=models.User(name='alice'))
+        self.Session.add(self.key)
+        self.Session.commit()
+        self.api_key = self.key.key
+
+    def deactivate_in_other_worker(self):
+        self.Session.query(models.Key).filter_by(key=self.api_key).update({
+            'active': False,
+            'deactivated_at': datetime.datetime.utcfromtimestamp(self.now),
+        })
+        self.Session.commit()
+
+    def test_other_workers_deactivation_is_picked_up_after_interval(self):
+        self.assertIsNotNone(self.backend.get_user_from_api_key(self.api_key))
+        self.deactivate_in_other_worker()
+        self.assertIsNotNone(self.backend.get_user_from_api_key(self.api_key))
+
+        self.now += 5
+
+        self.assertIsNone(self.backend.get_user_from_api_key(self.api_key))
+        self.assertEqual(self.backend.key_revocations.stats['revocations'], 1)
+
+    def test_checks_at_most_once_per_interval(self):
+        self.now += 5
+        self.backend.get_user_from_api_key(self.api_key)
+        del self.statements[:]
+
+        self.backend.get_user_from_api_key(self.api_key)
+
+        self.assertEqual(self.statements, [])
+        self.assertEqual(self.backend.key_revocations.stats['checks'], 1)
@@ -0,0 +1,54 @@
+from ptero_auth.implementation import models
+from ptero_auth.implementation.key_usage import KeyUsageTracker
+import datetime
+import sqlalchemy
+import unittest
+
+
+class KeyUsageTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = sqlalchemy.create_engine('sqlite://')
+        models.Base.metadata.create_all(self.engine)
+        self.session = sqlalchemy.orm.sessionmaker(bind=self.engine)()
+
+        user = models.User(name='alice')
+        self.keys = [models.Key(user=user), models.Key(user=user)]
+        self.session.add_all(self.keys)
+        self.session.commit()
+
+        self.now = 1000.0
+        self.tracker = KeyUsageTracker(flush_interval=30,
+                clock=lambda: self.now)
+
+    def reload(self, key):
+        self.session.expire_all()
+        return self.session.query(models.Key).get(key.key_id)
+
+    def test_flush_accumulates_counts(self):
+        first = datetime.datetime(2015, 1, 1)
+        last = datetime.datetime(2015, 1, 2)
+        self.tracker.record(self.keys[0].key_id, when=last)
+        self.tracker.record(self.keys[0].key_id, when=first)
+        self.tracker.record(self.keys[1].key_id, when=first)
+
+        self.assertEqual(self.tracker.flush(self.engine), 2)
+
+        key = self.reload(self.keys[0])
+        self.assertEqual(key.usage_count, 2)
+        self.assertEqual(key.last_used, last)
+        self.assertEqual(self.reload(self.keys[1]).usage_count, 1)
+
+    def test_repeated_flushes_add_up(self):
+        self.tracker.record(self.keys[0].key_id)
+        self.tracker.flush(self.engine)
+        self.tracker.record(self.keys[0].key_id)
+        self.tracker.flush(self.engine)
+
+        self.assertEqual(self.reload(self.keys[0]).usage_count, 2)
+
+    def test_flush_if_due_waits_for_interval(self):
+        self.tracker.record(self.keys[0].key_id)
+
+        self.assertEqual(self.tracker.flush_if_due(self.engine), 0)
+        self.now += 30
+        self.assertEqual(self.tracker.flush_if_due(self.engine), 1)
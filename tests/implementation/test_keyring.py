@@ -0,0 +1,117 @@
+from Crypto.PublicKey import RSA
+from ptero_auth.implementation.keyring import Keyring, fingerprint
+from .. import rsa_key
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class KeyringTestBase(unittest.TestCase):
+    ACTIVATION_DELAY = 0
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.now = 0
+        self.old_key = rsa_key.AUTH_PRIVATE_KEY
+        self.new_key = RSA.generate(1024)
+
+        self.write_key('active.pem', self.old_key)
+        self.keyring = Keyring(directory=self.directory, reload_interval=30,
+                activation_delay=self.ACTIVATION_DELAY, clock=lambda: self.now)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_key(self, filename, key):
+        with open(os.path.join(self.directory, filename), 'w') as f:
+            f.write(key.exportKey())
+
+    def rotate(self):
+        os.rename(os.path.join(self.directory, 'active.pem'),
+                os.path.join(self.directory, 'retiring.pem'))
+        self.write_key('active.pem', self.new_key)
+        self.now += 30
+
+
+class KeyringTest(KeyringTestBase):
+    def test_active_key_is_keyed_by_fingerprint(self):
+        kid, key = self.keyring.active
+
+        self.assertEqual(kid, fingerprint(self.old_key.publickey()))
+        self.assertEqual(len(kid), 8)
+
+    def test_rotation_publishes_retiring_key(self):
+        self.rotate()
+
+        key_set = self.keyring.current()
+        self.assertEqual(key_set.version, 2)
+        self.assertEqual(key_set.active_kid,
+                fingerprint(self.new_key.publickey()))
+        self.assertEqual(list(key_set.keys), [
+            fingerprint(self.new_key.publickey()),
+            fingerprint(self.old_key.publickey()),
+        ])
+
+    def test_directory_is_not_rechecked_before_interval(self):
+        self.rotate()
+        self.now -= 1
+
+        self.assertEqual(self.keyring.version, 1)
+
+    def test_unchanged_directory_keeps_version(self):
+        self.now += 30
+
+        self.assertEqual(self.keyring.version, 1)
+        self.assertEqual(self.keyring.stats['reloads'], 1)
+
+    def test_broken_directory_keeps_previous_keys(self):
+        os.remove(os.path.join(self.directory, 'active.pem'))
+        self.write_key('other.pem', self.new_key)
+        self.now += 30
+
+        self.assertEqual(self.keyring.active[0],
+                fingerprint(self.old_key.publickey()))
+        self.assertEqual(self.keyring.stats['reload_errors'], 1)
+
+    def test_missing_active_key_fails_at_startup(self):
+        empty = tempfile.mkdtemp()
+        try:
+            with self.assertRaises(RuntimeError):
+                Keyring(directory=empty)
+        finally:
+            shutil.rmtree(empty)
+
+
+class StagedRotationTest(KeyringTestBase):
+    ACTIVATION_DELAY = 3600
+
+    def test_unpublished_key_does_not_sign(self):
+        self.rotate()
+
+        key_set = self.keyring.current()
+        self.assertEqual(key_set.active_kid,
+                fingerprint(self.old_key.publickey()))
+        self.assertIn(fingerprint(self.new_key.publickey()), key_set.keys)
+        self.assertEqual(self.keyring.stats['pending_kid'],
+                fingerprint(self.new_key.publickey()))
+
+    def test_key_signs_once_published_long_enough(self):
+        self.rotate()
+        self.keyring.current()
+        self.now += 3600
+
+        self.assertEqual(self.keyring.active[0],
+                fingerprint(self.new_key.publickey()))
+
+    def test_key_published_in_advance_signs_immediately(self):
+        self.write_key('next.pem', self.new_key)
+        self.now += 30
+        self.keyring.current()
+        self.now += 3600
+
+        os.remove(os.path.join(self.directory, 'next.pem'))
+        self.rotate()
+
+        self.assertEqual(self.keyring.active[0],
+                fingerprint(self.new_key.publickey()))
@@ -0,0 +1,51 @@
+from ptero_auth.implementation.negative_cache import NegativeCache
+import unittest
+
+
+class NegativeCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = NegativeCache(max_size=2, ttl=10, tracked_keys=2,
+                report_top=1, clock=lambda: self.now)
+
+    def test_remembers_misses(self):
+        self.assertNotIn('a', self.cache)
+        self.cache.add('a')
+
+        self.assertIn('a', self.cache)
+
+    def test_misses_expire(self):
+        self.cache.add('a')
+        self.now += 10
+
+        self.assertNotIn('a', self.cache)
+
+    def test_clear(self):
+        self.cache.add('a')
+        self.cache.clear()
+
+        self.assertNotIn('a', self.cache)
+
+    def test_counts_lookups_per_key(self):
+        self.cache.add('a')
+        'a' in self.cache
+        'a' in self.cache
+        self.cache.add('b')
+        self.now += 2
+
+        self.assertEqual(self.cache.stats['top'], [
+            {'key': 'a', 'lookups': 3, 'per_second': 1.5}])
+
+    def test_tracked_keys_are_bounded(self):
+        for key in ('a', 'b', 'c'):
+            self.cache.add(key)
+
+        self.assertEqual(self.cache.stats['tracked_keys'], 2)
+
+    def test_oversized_keys_are_not_remembered(self):
+        self.cache.max_key_length = 3
+        self.cache.add('abcd')
+
+        self.assertNotIn('abcd', self.cache)
+        self.assertEqual(self.cache.stats['tracked_keys'], 0)
+        self.assertEqual(self.cache.stats['oversized_keys'], 1)
@@ -0,0 +1,51 @@
+from ptero_auth.implementation.pool_metrics import MeteredQueuePool, \
+        PoolMetrics
+import os
+import shutil
+import sqlalchemy
+import tempfile
+import unittest
+
+
+class PoolMetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.engine = sqlalchemy.create_engine(
+                'sqlite:///' + os.path.join(self.tempdir, 'test.db'),
+                poolclass=MeteredQueuePool, pool_size=2)
+        self.metrics = PoolMetrics()
+        self.metrics.attach(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.tempdir)
+
+    def test_counts_connections_in_use(self):
+        connection = self.engine.connect()
+        self.assertEqual(self.metrics.stats['in_use'], 1)
+
+        connection.close()
+        self.assertEqual(self.metrics.stats['in_use'], 0)
+        self.assertEqual(self.metrics.stats['checkouts'], 1)
+        self.assertEqual(self.metrics.stats['checkins'], 1)
+
+    def test_tracks_peak_usage(self):
+        connections = [self.engine.connect() for _ in range(2)]
+        for connection in connections:
+            connection.close()
+
+        self.assertEqual(self.metrics.stats['peak_in_use'], 2)
+
+    def test_records_checkout_wait(self):
+        self.metrics.record_wait(0.5)
+        self.metrics.record_wait(0.25)
+
+        self.assertEqual(self.metrics.stats['max_checkout_wait'], 0.5)
+        self.assertEqual(self.metrics.stats['total_checkout_wait'], 0.75)
+
+    def test_metrics_survive_pool_recreation(self):
+        self.engine.dispose()
+        self.engine.connect().close()
+
+        self.assertIs(self.engine.pool.metrics, self.metrics)
+        self.assertEqual(self.metrics.stats['checkouts'], 1)
@@ -0,0 +1,105 @@
+from ptero_auth.implementation import models
+from ptero_auth.implementation.models.scopes import grant_scope_table
+from ptero_auth.implementation.reaper import Reaper
+import datetime
+import sqlalchemy
+import unittest
+
+
+NOW = datetime.datetime(2015, 6, 1, 12, 0, 0)
+
+
+class ReaperTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = sqlalchemy.create_engine('sqlite://')
+        models.Base.metadata.create_all(self.engine)
+        self.session = sqlalchemy.orm.sessionmaker(bind=self.engine)()
+
+        self.user = models.User(name='alice')
+        self.scope = models.Scope(value='foo')
+        self.client = models.ConfidentialClient(client_name='c',
+                created_by=self.user, redirect_uri_regex='^x$',
+                default_redirect_uri='x')
+        self.session.add_all([self.user, self.scope, self.client])
+        self.session.commit()
+
+        self.sleeps = []
+        self.reaper = Reaper(self.engine, grant_retention=600,
+                refresh_token_retention=0, batch_size=2,
+                now=lambda: NOW, sleep=self.sleeps.append)
+
+    def add_grant(self, age):
+        self.session.add(models.AuthorizationCodeGrant(user=self.user,
+            client=self.client, redirect_uri='x', scopes=[self.scope],
+            created_at=NOW - datetime.timedelta(seconds=age)))
+        self.session.commit()
+
+    def add_refresh_token(self, token, expires_in, active=True,
+            deactivated_ago=None):
+        deactivated_at = None
+        if deactivated_ago is not None:
+            deactivated_at = NOW - datetime.timedelta(seconds=deactivated_ago)
+
+        self.session.add(models.RefreshToken(token=token, user=self.user,
+            client=self.client, active=active, deactivated_at=deactivated_at,
+            expires_at=NOW + datetime.timedelta(seconds=expires_in)))
+        self.session.commit()
+
+    def count(self, model):
+        return self.session.query(model).count()
+
+    def test_removes_old_grants_and_their_scopes(self):
+        for age in (0, 599, 601, 700, 800):
+            self.add_grant(age)
+
+        counts = self.reaper.run()
+
+        self.assertEqual(counts['authorization_code_grant'], 3)
+        self.assertEqual(self.count(models.AuthorizationCodeGrant), 2)
+        self.assertEqual(self.session.execute(sqlalchemy.select(
+            [sqlalchemy.func.count()]).select_from(grant_scope_table)
+            ).scalar(), 2)
+
+    def test_pauses_between_full_batches(self):
+        for age in (601, 700, 800):
+            self.add_grant(age)
+
+        self.reaper.run()
+
+        self.assertEqual(self.sleeps, [self.reaper.pause])
+
+    def test_removes_expired_and_deactivated_refresh_tokens(self):
+        self.add_refresh_token('live', 100)
+        self.add_refresh_token('expired', -100)
+        self.add_refresh_token('deactivated', 100, active=False,
+                deactivated_ago=100)
+
+        counts = self.reaper.run()
+
+        self.assertEqual(counts['expired_refresh_token'], 1)
+        self.assertEqual(counts['deactivated_refresh_token'], 1)
+        self.assertEqual([t.token for t in
+            self.session.query(models.RefreshToken)], ['live'])
+
+    def test_removes_expired_redeemed_codes(self):
+        for jti, expires_in in (('live', 100), ('expired', -100)):
+            self.session.add(models.RedeemedAuthorizationCode(jti=jti,
+                expires_at=NOW + datetime.timedelta(seconds=expires_in)))
+        self.session.commit()
+
+        counts = self.reaper.run()
+
+        self.assertEqual(counts['redeemed_authorization_code'], 1)
+        self.assertEqual([r.jti for r in
+            self.session.query(models.RedeemedAuthorizationCode)], ['live'])
+
+    def test_keeps_running_totals(self):
+        self.add_grant(700)
+        self.reaper.run()
+        self.add_grant(700)
+        self.reaper.run()
+
+        self.assertEqual(self.reaper.stats['runs'], 2)
+        self.assertEqual(
+                self.reaper.stats['total_removed']['authorization_code_grant'],
+                2)
@@ -0,0 +1,73 @@
+from ptero_auth.implementation import models
+from ptero_auth.implementation import unit_of_work
+import sqlalchemy
+import unittest
+
+
+class UnitOfWorkTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = sqlalchemy.create_engine('sqlite://')
+        models.Base.metadata.create_all(self.engine)
+        session_factory = sqlalchemy.orm.sessionmaker(bind=self.engine)
+        self.commit_stats = unit_of_work.CommitStats()
+        self.commit_stats.attach(session_factory)
+        self.Session = sqlalchemy.orm.scoped_session(session_factory)
+
+        self.callbacks = []
+
+    def tearDown(self):
+        self.Session.remove()
+
+    def begin(self, enabled):
+        unit_of_work.begin(self.Session, endpoint='test',
+                unit_of_work=enabled)
+        self.commit_stats.request('test')
+
+    def add_user(self, name):
+        self.Session.add(models.User(name=name))
+        unit_of_work.commit(self.Session)
+        unit_of_work.after_commit(self.Session,
+                lambda: self.callbacks.append(name))
+
+    def count_users(self):
+        self.Session.remove()
+        return self.Session.query(models.User).count()
+
+    def test_commits_once_per_unit_of_work(self):
+        self.begin(True)
+        self.add_user('alice')
+        self.add_user('bob')
+        self.assertEqual(self.callbacks, [])
+
+        unit_of_work.finish(self.Session)
+
+        self.assertEqual(self.callbacks, ['alice', 'bob'])
+        self.assertEqual(self.commit_stats.stats['test'],
+                {'requests': 1, 'commits': 1})
+        self.assertEqual(self.count_users(), 2)
+
+    def test_unfinished_unit_of_work_is_discarded(self):
+        self.begin(True)
+        self.add_user('alice')
+
+        self.assertEqual(self.count_users(), 0)
+        self.assertEqual(self.callbacks, [])
+
+    def test_commits_immediately_without_unit_of_work(self):
+        self.begin(False)
+        self.add_user('alice')
+        self.assertEqual(self.callbacks, ['alice'])
+        self.add_user('bob')
+
+        unit_of_work.finish(self.Session)
+
+        self.assertEqual(self.commit_stats.stats['test'],
+                {'requests': 1, 'commits': 2})
+
+    def test_read_only_requests_do_not_count_as_commits(self):
+        self.begin(True)
+        self.Session.query(models.User).all()
+        unit_of_work.finish(self.Session)
+
+        self.assertEqual(self.commit_stats.stats['test'],
+                {'requests': 1, 'commits': 0})
@@ -0,0 +1,109 @@
+from ptero_auth.implementation import models
+from ptero_auth.implementation.key_usage import KeyUsageTracker
+from ptero_auth.implementation.write_behind import WriteBehindBuffer, \
+        WriteBehindQueue
+import sqlalchemy
+import time
+import unittest
+
+
+class RecordingBuffer(WriteBehindBuffer):
+    name = 'recording'
+
+    def __init__(self, *args, **kwargs):
+        super(RecordingBuffer, self).__init__(*args, **kwargs)
+        self.written = []
+
+    def merge(self, current, value):
+        return current + value
+
+    def write(self, connection, pending):
+        self.written.append(pending)
+
+
+class FailingBuffer(WriteBehindBuffer):
+    name = 'failing'
+
+    def merge(self, current, value):
+        return value
+
+    def write(self, connection, pending):
+        raise RuntimeError('write failed')
+
+
+class WriteBehindQueueTest(unittest.TestCase):
+    def setUp(self):
+        # One connection for every thread, so the flusher sees the tables.
+        self.engine = sqlalchemy.create_engine('sqlite://',
+                poolclass=sqlalchemy.pool.StaticPool,
+                connect_args={'check_same_thread': False})
+        models.Base.metadata.create_all(self.engine)
+        self.session = sqlalchemy.orm.sessionmaker(bind=self.engine)()
+
+        self.key = models.Key(user=models.User(name='alice'))
+        self.session.add(self.key)
+        self.session.commit()
+
+        self.now = 1000.0
+        self.key_usage = KeyUsageTracker(flush_interval=30,
+                clock=lambda: self.now)
+        self.other = FailingBuffer(flush_interval=300, clock=lambda: self.now)
+
+    def usage_count(self):
+        self.session.expire_all()
+        return self.session.query(models.Key).get(self.key.key_id).usage_count
+
+    def test_flushes_all_buffers_once_any_is_due(self):
+        recording = RecordingBuffer(flush_interval=300, clock=lambda: self.now)
+        queue = WriteBehindQueue([self.key_usage, recording])
+        self.key_usage.record(self.key.key_id)
+        self.key_usage.record(self.key.key_id)
+        recording.add('a', 1)
+        recording.add('a', 2)
+
+        self.assertEqual(queue.flush_if_due(self.engine), 0)
+        self.now += 30
+        self.assertFalse(recording.is_due)
+        self.assertEqual(queue.flush_if_due(self.engine), 2)
+
+        self.assertEqual(self.usage_count(), 2)
+        self.assertEqual(recording.written, [{'a': 3}])
+        self.assertEqual(queue.stats['transactions'], 1)
+        self.assertEqual(queue.stats['api_key_usage']['rows_flushed'], 1)
+        self.assertEqual(queue.stats['recording']['rows_flushed'], 1)
+
+    def test_failed_flush_restores_every_buffer(self):
+        queue = WriteBehindQueue([self.key_usage, self.other])
+        self.key_usage.record(self.key.key_id)
+        self.other.add('a', 1)
+
+        self.assertEqual(queue.flush(self.engine), 0)
+
+        self.assertEqual(self.usage_count(), 0)
+        self.assertEqual(queue.stats['failed_transactions'], 1)
+        self.assertEqual(queue.stats['api_key_usage']['pending'], 1)
+        self.assertEqual(queue.stats['failing']['pending'], 1)
+
+    def test_started_queue_flushes_in_background(self):
+        queue = WriteBehindQueue([self.key_usage], check_interval=0.01)
+        self.key_usage.flush_interval = 0
+        self.key_usage.record(self.key.key_id)
+
+        queue.start(self.engine)
+        try:
+            deadline = time.time() + 5
+            while queue.transactions == 0 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            queue.stop(self.engine)
+
+        self.assertEqual(self.usage_count(), 1)
+
+    def test_stop_flushes_pending_rows(self):
+        queue = WriteBehindQueue([self.key_usage], check_interval=60)
+        queue.start(self.engine)
+        self.key_usage.record(self.key.key_id)
+
+        queue.stop(self.engine)
+
+        self.assertEqual(self.usage_count(), 1)
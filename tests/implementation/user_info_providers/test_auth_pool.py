@@ -0,0 +1,62 @@
+from ptero_auth.implementation.user_info_providers.auth_pool import \
+        AuthenticationPool
+import time
+import unittest
+
+
+def _check_password_is_username(username, password):
+    return username == password
+
+
+def _check_slowly(username, password):
+    time.sleep(1)
+    return True
+
+
+def _check_raises(username, password):
+    raise RuntimeError('PAM exploded')
+
+
+class AuthenticationPoolTest(unittest.TestCase):
+    def tearDown(self):
+        self.pool.close()
+
+    def test_returns_verdict_from_worker(self):
+        self.pool = AuthenticationPool(_check_password_is_username, 1)
+
+        self.assertTrue(self.pool.check_login('alice', 'alice'))
+        self.assertFalse(self.pool.check_login('alice', 'nogood'))
+        self.assertEqual(self.pool.stats['completed'], 2)
+
+    def test_rejects_when_queue_is_full(self):
+        self.pool = AuthenticationPool(_check_password_is_username, 1,
+                max_pending=0)
+
+        self.assertFalse(self.pool.check_login('alice', 'alice'))
+        self.assertEqual(self.pool.stats['rejected'], 1)
+
+    def test_fails_requests_past_deadline(self):
+        self.pool = AuthenticationPool(_check_slowly, 1, timeout=0.1)
+
+        self.assertFalse(self.pool.check_login('alice', 'alice'))
+        self.assertEqual(self.pool.stats['timed_out'], 1)
+
+    def test_timed_out_check_keeps_its_slot_until_done(self):
+        self.pool = AuthenticationPool(_check_slowly, 1, max_pending=1,
+                timeout=0.1)
+
+        self.assertFalse(self.pool.check_login('alice', 'alice'))
+        self.assertEqual(self.pool.stats['in_flight'], 1)
+        self.assertFalse(self.pool.check_login('bob', 'bob'))
+        self.assertEqual(self.pool.stats['rejected'], 1)
+
+        time.sleep(1.5)
+        self.assertEqual(self.pool.stats['in_flight'], 0)
+
+    def test_counts_errors_raised_in_worker(self):
+        self.pool = AuthenticationPool(_check_raises, 1, max_pending=1)
+
+        self.assertFalse(self.pool.check_login('alice', 'alice'))
+        self.assertFalse(self.pool.check_login('alice', 'alice'))
+        self.assertEqual(self.pool.stats['errors'], 2)
+        self.assertEqual(self.pool.stats['rejected'], 0)
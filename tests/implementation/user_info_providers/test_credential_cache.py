@@ -0,0 +1,32 @@
+from ptero_auth.implementation.user_info_providers.credential_cache import \
+        CredentialCache
+import unittest
+
+
+class CredentialCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = CredentialCache(max_size=10, iterations=1)
+
+    def test_unknown_user_is_not_verified(self):
+        self.assertFalse(self.cache.is_verified('alice', 'apass'))
+
+    def test_remembered_password_is_verified(self):
+        self.cache.remember('alice', 'apass')
+        self.assertTrue(self.cache.is_verified('alice', 'apass'))
+
+    def test_wrong_password_is_not_verified(self):
+        self.cache.remember('alice', 'apass')
+        self.assertFalse(self.cache.is_verified('alice', 'nogood'))
+
+    def test_remembered_password_expires(self):
+        now = [100]
+        cache = CredentialCache(max_size=10, ttl=5, iterations=1,
+                clock=lambda: now[0])
+        cache.remember('alice', 'apass')
+        now[0] += 6
+
+        self.assertFalse(cache.is_verified('alice', 'apass'))
+
+    def test_does_not_store_password_in_clear(self):
+        self.cache.remember('alice', 'apass')
+        self.assertNotEqual(self.cache._cache.get('alice'), 'apass')
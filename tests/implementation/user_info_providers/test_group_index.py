@@ -0,0 +1,48 @@
+from ptero_auth.implementation.user_info_providers.group_index import \
+        GroupIndex
+import collections
+import unittest
+
+
+FakeGroup = collections.namedtuple('FakeGroup', ['gr_name', 'gr_gid', 'gr_mem'])
+
+
+class GroupIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.groups = [
+            FakeGroup('a', 20001, ['bob', 'charlie']),
+            FakeGroup('b', 20002, ['bob']),
+            FakeGroup('pteroadmin', 20000, ['alice']),
+        ]
+        self.getgrall_calls = 0
+        self.index = GroupIndex(refresh_interval=60,
+                getgrall=self._getgrall, clock=lambda: self.now)
+
+    def _getgrall(self):
+        self.getgrall_calls += 1
+        return list(self.groups)
+
+    def test_groups_for_member(self):
+        self.assertEqual([g.gr_name for g in self.index.groups_for('bob')],
+                ['a', 'b'])
+
+    def test_groups_for_unknown_user(self):
+        self.assertEqual(self.index.groups_for('nobody'), ())
+
+    def test_reuses_index_within_refresh_interval(self):
+        self.index.groups_for('bob')
+        self.index.groups_for('alice')
+        self.now += 59
+
+        self.index.groups_for('charlie')
+        self.assertEqual(self.getgrall_calls, 1)
+
+    def test_rebuilds_after_refresh_interval(self):
+        self.index.groups_for('bob')
+        self.groups.append(FakeGroup('c', 20003, ['alice']))
+        self.now += 60
+
+        self.assertEqual([g.gr_name for g in self.index.groups_for('alice')],
+                ['pteroadmin', 'c'])
+        self.assertEqual(self.getgrall_calls, 2)
@@ -10,6 +10,8 @@ class SettingsTest (unittest.TestCase):
         'AUTH_URL': 'http://localhost:8000/',
         'ADMIN_ROLE': 'foo2',
         'SIGNATURE_KEY': rsa_key.AUTH_PRIVATE_KEY.exportKey(),
+        'DATABASE_POOL_SIZE': '7',
+        'DATABASE_POOL_PRE_PING': 'true',
     }
 
     def setUp(self):
@@ -30,3 +32,6 @@ class SettingsTest (unittest.TestCase):
         self.assertEqual(result['auth_url'], self.env_to_set['AUTH_URL'])
         self.assertEqual(result['admin_role'], self.env_to_set['ADMIN_ROLE'])
         self.assertIn('signature_key', result)
+        self.assertEqual(result['database_pool_size'], 7)
+        self.assertEqual(result['database_pool_pre_ping'], True)
+        self.assertIsNone(result['database_pool_recycle'])
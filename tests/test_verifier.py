@@ -0,0 +1,166 @@
+from Crypto.Hash import SHA256
+from Crypto.Signature import PKCS1_v1_5
+from ptero_auth.implementation.discovery import Discovery, ISSUER
+from ptero_auth.implementation.keyring import Keyring
+from ptero_auth.verifier import JwksClient, TokenVerifier
+from . import rsa_key
+import base64
+import json
+import unittest
+import urllib2
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip('=')
+
+
+def make_token(claims, kid='kid1', key=rsa_key.AUTH_PRIVATE_KEY):
+    signing_input = '%s.%s' % (
+            _b64(json.dumps({'alg': 'RS256', 'kid': kid})),
+            _b64(json.dumps(claims)))
+    signature = PKCS1_v1_5.new(key).sign(SHA256.new(signing_input))
+    return '%s.%s' % (signing_input, _b64(signature))
+
+
+class FakeResponse(object):
+    def __init__(self, body, headers):
+        self.body = body
+        self.headers = headers
+
+    def read(self):
+        return self.body
+
+    def info(self):
+        return self.headers
+
+
+class FakeJwksServer(object):
+    def __init__(self, kid='kid1'):
+        self.set_kid(kid)
+        self.requests = []
+
+    def set_kid(self, kid):
+        self.document = Discovery(Keyring.from_signature_key({
+            'signature_alg': 'RS256',
+            'signature_key': rsa_key.AUTH_PRIVATE_KEY,
+            'signature_kid': kid,
+        }), base_url='http://localhost').jwks
+
+    def __call__(self, request, timeout=None):
+        self.requests.append(request)
+        headers = {'ETag': self.document.etag,
+                'Cache-Control': 'public, max-age=60'}
+        if request.get_header('If-none-match') == self.document.etag:
+            raise urllib2.HTTPError(request.get_full_url(), 304,
+                    'Not Modified', headers, None)
+        return FakeResponse(self.document.body, headers)
+
+
+class VerifierTestBase(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000
+        self.server = FakeJwksServer()
+        self.jwks = JwksClient('http://localhost/v1/jwks',
+                urlopen=self.server, clock=lambda: self.now)
+        self.verifier = TokenVerifier(self.jwks, ISSUER, audience='client1',
+                workers=2, clock=lambda: self.now)
+
+    def tearDown(self):
+        self.verifier.close()
+
+    def claims(self, **kwargs):
+        result = {'iss': ISSUER, 'sub': 'bob', 'aud': ['client1'],
+                'exp': self.now + 600}
+        result.update(kwargs)
+        return result
+
+
+class JwksClientTest(VerifierTestBase):
+    def test_revalidates_with_etag(self):
+        self.assertIsNotNone(self.jwks.get_key('kid1'))
+        self.now += 60
+        self.assertIsNotNone(self.jwks.get_key('kid1'))
+
+        self.assertEqual(self.jwks.stats['fetches'], 1)
+        self.assertEqual(self.jwks.stats['not_modified'], 1)
+
+    def test_refetches_for_unknown_kid(self):
+        self.jwks.get_key('kid1')
+        self.server.set_kid('kid2')
+        self.now += self.jwks.min_refresh_interval
+
+        self.assertIsNotNone(self.jwks.get_key('kid2'))
+
+    def test_unknown_kid_refetch_is_rate_limited(self):
+        self.jwks.get_key('kid1')
+        self.jwks.get_key('bogus')
+        self.jwks.get_key('bogus')
+
+        self.assertEqual(len(self.server.requests), 1)
+
+
+class TokenVerifierTest(VerifierTestBase):
+    def test_verifies_valid_token(self):
+        claims = self.verifier.verify(make_token(self.claims()))
+
+        self.assertEqual(claims['sub'], 'bob')
+
+    def test_rejects_tampered_token(self):
+        header, payload, signature = make_token(self.claims()).split('.')
+        payload = _b64(json.dumps(self.claims(sub='mallory')))
+
+        self.assertIsNone(self.verifier.verify(
+            '.'.join([header, payload, signature])))
+
+    def test_rejects_expired_token(self):
+        self.assertIsNone(self.verifier.verify(
+            make_token(self.claims(exp=self.now))))
+
+    def test_rejects_other_audience(self):
+        self.assertIsNone(self.verifier.verify(
+            make_token(self.claims(aud='client2'))))
+
+    def test_memoizes_until_exp(self):
+        token = make_token(self.claims(exp=self.now + 10))
+        self.verifier.verify(token)
+        self.assertEqual(len(self.verifier.cache), 1)
+
+        self.now += 10
+        self.assertIsNone(self.verifier.verify(token))
+
+    def test_verify_many_preserves_order(self):
+        good = make_token(self.claims())
+        results = self.verifier.verify_many([good, 'garbage', good,
+            make_token(self.claims(sub='alice'))])
+
+        self.assertEqual([r and r['sub'] for r in results],
+                ['bob', None, 'bob', 'alice'])
+
+
+class FromDiscoveryTest(unittest.TestCase):
+    def setUp(self):
+        self.jwks = FakeJwksServer()
+        self.configuration = Discovery(Keyring.from_signature_key({
+            'signature_alg': 'RS256',
+            'signature_key': rsa_key.AUTH_PRIVATE_KEY,
+            'signature_kid': 'kid1',
+        }), base_url='http://localhost',
+            issuer='https://issuer.example').openid_configuration
+
+    def urlopen(self, request, timeout=None):
+        if request.get_full_url().endswith('/openid-configuration'):
+            return FakeResponse(self.configuration.body, {})
+        return self.jwks(request, timeout=timeout)
+
+    def test_uses_discovered_issuer_and_jwks_uri(self):
+        verifier = TokenVerifier.from_discovery(
+                'http://localhost/.well-known/openid-configuration',
+                urlopen=self.urlopen)
+        exp = 2 ** 31
+
+        self.assertEqual(verifier.verify(make_token({'sub': 'bob',
+            'iss': 'https://issuer.example', 'exp': exp}))['sub'], 'bob')
+        self.assertIsNone(verifier.verify(make_token({'sub': 'bob',
+            'iss': ISSUER, 'exp': exp})))
+        self.assertEqual(self.jwks.requests[0].get_full_url(),
+                'http://localhost/v1/jwks')